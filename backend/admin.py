@@ -0,0 +1,494 @@
+"""
+Blueprint quản trị: dashboard, ngành / khoa / hồ sơ / người dùng, cài đặt liên hệ, kiểm tra email, xuất CSV.
+"""
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from .extensions import admin_required, perf, send_email
+from .models import db, User, Department, Program, Applicant, Application, SiteSetting
+
+admin_bp = Blueprint('admin', __name__)
+
+# Admin routes
+@admin_bp.route('/admin')
+@admin_required
+def admin_dashboard():
+    return render_template('admin/dashboard.html')
+
+@admin_bp.route('/admin/dashboard')
+@login_required
+def admin_dashboard_stats():
+    if not current_user.role == 'admin':
+        flash('Unauthorized access', 'error')
+        return redirect(url_for('main.index'))
+    stats = {
+        'total_applications': Application.query.count(),
+        'total_programs': Program.query.count(),
+        'total_departments': Department.query.count(),
+        'recent_applications': Application.query.order_by(Application.application_date.desc()).limit(5).all()
+    }
+    return render_template('admin/dashboard.html', stats=stats)
+
+@admin_bp.route('/admin/contact', methods=['GET', 'POST'])
+@admin_required
+def admin_contact():
+    def get_setting(key, default=''):
+        item = SiteSetting.query.filter_by(key=key).first()
+        return item.value if item and item.value is not None else default
+    if request.method == 'POST':
+        updates = {
+            'contact_address': request.form.get('address', ''),
+            'contact_email': request.form.get('email', ''),
+            'contact_hotline': request.form.get('hotline', ''),
+        }
+        for k, v in updates.items():
+            setting = SiteSetting.query.filter_by(key=k).first()
+            if not setting:
+                setting = SiteSetting(key=k, value=v)
+                db.session.add(setting)
+            else:
+                setting.value = v
+        db.session.commit()
+        flash('Cập nhật thông tin liên hệ thành công!', 'success')
+        return redirect(url_for('admin.admin_contact'))
+    # GET
+    form_data = {
+        'address': get_setting('contact_address'),
+        'email': get_setting('contact_email'),
+        'hotline': get_setting('contact_hotline'),
+    }
+    return render_template('admin/contact_settings.html', form_data=form_data)
+
+# Admin: Email test
+@admin_bp.route('/admin/email-test', methods=['GET', 'POST'])
+@admin_required
+def admin_email_test():
+    if request.method == 'POST':
+        to = request.form.get('to') or current_user.email
+        subject = request.form.get('subject') or 'Test SMTP from Admission System'
+        body = request.form.get('body') or '<p>Đây là email kiểm tra cấu hình SMTP.</p>'
+        ok = send_email(subject, [to], body)
+        if ok:
+            flash(f'Đã gửi email kiểm tra tới {to}.', 'success')
+        else:
+            flash('Không gửi được email. Kiểm tra cấu hình SMTP trong .env và thử lại.', 'danger')
+        return redirect(url_for('admin.admin_email_test'))
+    return render_template('admin/email_test.html')
+
+# Lightweight JSON mail test for quick verification
+@admin_bp.route('/admin/mail-test')
+@admin_required
+def admin_mail_test():
+    to = request.args.get('to') or (current_user.email if current_user.is_authenticated else None)
+    subject = request.args.get('subject') or 'SMTP quick test'
+    body = request.args.get('body') or '<p>This is a quick SMTP test from Admission System.</p>'
+    if not to:
+        return jsonify({'ok': False, 'error': 'missing to parameter'}), 400
+    ok = send_email(subject, [to], body)
+    return jsonify({'ok': bool(ok), 'to': to})
+
+# Public (token-protected) mail test API
+@admin_bp.route('/api/mail-test', methods=['GET', 'POST'])
+def api_mail_test():
+    """Send a quick test email without requiring admin login.
+    Security: requires MAIL_TEST_TOKEN via query (?token=...), header (X-Mail-Test-Token), or JSON body {token: ...}.
+    Params: to, subject, body (via query or JSON). Returns JSON {ok: bool, to, error?}.
+    """
+    expected = os.getenv('MAIL_TEST_TOKEN')
+    token = (
+        request.args.get('token')
+        or request.headers.get('X-Mail-Test-Token')
+        or ((request.get_json(silent=True) or {}).get('token') if request.is_json else None)
+    )
+    if not expected or token != expected:
+        return jsonify({'ok': False, 'error': 'unauthorized'}), 401
+
+    if request.method == 'POST' and request.is_json:
+        data = request.get_json(silent=True) or {}
+        to = data.get('to') or request.args.get('to')
+        subject = data.get('subject') or 'SMTP API test'
+        body = data.get('body') or '<p>This is a quick SMTP test from Admission System.</p>'
+    else:
+        to = request.args.get('to')
+        subject = request.args.get('subject') or 'SMTP API test'
+        body = request.args.get('body') or '<p>This is a quick SMTP test from Admission System.</p>'
+
+    if not to:
+        return jsonify({'ok': False, 'error': 'missing to parameter'}), 400
+
+    ok = send_email(subject, [to], body)
+    return jsonify({'ok': bool(ok), 'to': to})
+
+# Admin: Export CSV of core tables into data/
+@admin_bp.route('/admin/export-csv')
+@admin_required
+def admin_export_csv():
+    import csv, os
+    base_dir = os.path.join(current_app.root_path, '..', 'data')
+    os.makedirs(base_dir, exist_ok=True)
+    def write_csv(filename, headers, rows):
+        path = os.path.join(base_dir, filename)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(rows)
+    # Users
+    users = User.query.all()
+    write_csv('users.csv', ['id','username','email','role','created_at'],
+              [[u.id, u.username, u.email, u.role, u.created_at] for u in users])
+    # Departments
+    depts = Department.query.all()
+    write_csv('departments.csv', ['id','name','description','head','contact_email'],
+              [[d.id, d.name, d.description, d.head, d.contact_email] for d in depts])
+    # Programs
+    progs = Program.query.all()
+    write_csv('programs.csv', ['id','name','code','department_id','description','duration','requirements','career_prospects','tuition_fee'],
+              [[p.id, p.name, p.code, p.department_id, p.description, p.duration, p.requirements, p.career_prospects, p.tuition_fee] for p in progs])
+    # Applicants
+    appls = Applicant.query.all()
+    write_csv('applicants.csv', ['id','full_name','email','phone','date_of_birth','address','high_school','registration_date'],
+              [[a.id, a.full_name, a.email, a.phone, a.date_of_birth, a.address, a.high_school, a.registration_date] for a in appls])
+    # Applications (wishes)
+    apps = Application.query.all()
+    write_csv('applications.csv', ['id','applicant_id','program_id','application_date','status'],
+              [[ap.id, ap.applicant_id, ap.program_id, ap.application_date, ap.status] for ap in apps])
+    # Settings
+    settings = SiteSetting.query.all()
+    write_csv('settings.csv', ['id','key','value'],
+              [[s.id, s.key, s.value] for s in settings])
+    flash('Đã xuất dữ liệu CSV vào thư mục data/.', 'success')
+    return redirect(url_for('admin.admin_dashboard'))
+
+@admin_bp.route('/admin/programs')
+@admin_required
+def admin_programs():
+    programs = Program.query.all()
+    departments = Department.query.all()
+    return render_template('admin/programs.html', programs=programs, departments=departments)
+
+@admin_bp.route('/admin/programs/add', methods=['GET', 'POST'])
+@admin_required
+def admin_add_program():
+    departments = Department.query.all()
+    if request.method == 'POST':
+        name = request.form.get('name')
+        code = request.form.get('code')
+        department_id = request.form.get('department_id')
+        description = request.form.get('description')
+        duration = request.form.get('duration')
+        requirements = request.form.get('requirements')
+        career_prospects = request.form.get('career_prospects')
+        tuition_fee = request.form.get('tuition_fee')
+        if not name or not code or not department_id:
+            flash('Vui lòng nhập đầy đủ thông tin!', 'danger')
+            return render_template('admin/add_program.html', departments=departments)
+        program = Program(
+            name=name, code=code, department_id=department_id, description=description,
+            duration=duration, requirements=requirements, career_prospects=career_prospects, tuition_fee=tuition_fee
+        )
+        db.session.add(program)
+        db.session.commit()
+        flash('Thêm ngành thành công!', 'success')
+        return redirect(url_for('admin.admin_programs'))
+    return render_template('admin/add_program.html', departments=departments)
+
+@admin_bp.route('/admin/programs/edit/<int:program_id>', methods=['GET','POST'])
+@admin_required
+def admin_edit_program(program_id):
+    program = Program.query.get_or_404(program_id)
+    departments = Department.query.all()
+    if request.method == 'POST':
+        program.name = request.form.get('name')
+        program.code = request.form.get('code')
+        program.department_id = request.form.get('department_id')
+        program.description = request.form.get('description')
+        program.duration = request.form.get('duration')
+        program.requirements = request.form.get('requirements')
+        program.career_prospects = request.form.get('career_prospects')
+        tuition = request.form.get('tuition_fee')
+        program.tuition_fee = float(tuition) if tuition else None
+        db.session.commit()
+        flash('Đã cập nhật ngành!', 'success')
+        return redirect(url_for('admin.admin_programs'))
+    return render_template('admin/edit_program.html', program=program, departments=departments)
+
+@admin_bp.route('/admin/programs/delete/<int:program_id>', methods=['POST'])
+@admin_required
+def admin_delete_program(program_id):
+    program = Program.query.get(program_id)
+    if program:
+        db.session.delete(program)
+        db.session.commit()
+        flash('Đã xóa ngành!', 'success')
+    return redirect(url_for('admin.admin_programs'))
+
+@admin_bp.route('/admin/departments')
+@admin_required
+def admin_departments():
+    departments = Department.query.all()
+    return render_template('admin/departments.html', departments=departments)
+
+@admin_bp.route('/admin/departments/add', methods=['GET', 'POST'])
+@admin_required
+def admin_add_department():
+    if request.method == 'POST':
+        name = request.form.get('name')
+        description = request.form.get('description')
+        head = request.form.get('head')
+        contact_email = request.form.get('contact_email')
+        if not name:
+            flash('Vui lòng nhập tên khoa/viện!', 'danger')
+            return render_template('admin/add_department.html')
+        department = Department(
+            name=name, description=description, head=head, contact_email=contact_email
+        )
+        db.session.add(department)
+        db.session.commit()
+        flash('Thêm khoa/viện thành công!', 'success')
+        return redirect(url_for('admin.admin_departments'))
+    return render_template('admin/add_department.html')
+
+@admin_bp.route('/admin/departments/edit/<int:dept_id>', methods=['GET','POST'])
+@admin_required
+def admin_edit_department(dept_id):
+    department = Department.query.get_or_404(dept_id)
+    if request.method == 'POST':
+        department.name = request.form.get('name')
+        department.description = request.form.get('description')
+        department.head = request.form.get('head')
+        department.contact_email = request.form.get('contact_email')
+        db.session.commit()
+        flash('Đã cập nhật khoa/viện!', 'success')
+        return redirect(url_for('admin.admin_departments'))
+    return render_template('admin/edit_department.html', dept=department)
+@admin_bp.route('/admin/departments/delete/<int:dept_id>', methods=['POST'])
+@admin_required
+def admin_delete_department(dept_id):
+    department = Department.query.get(dept_id)
+    if department:
+        db.session.delete(department)
+        db.session.commit()
+        flash('Đã xóa khoa/viện!', 'success')
+    return redirect(url_for('admin.admin_departments'))
+
+@admin_bp.route('/admin/applications')
+@admin_required
+def admin_applications():
+    applications = Application.query.order_by(Application.application_date.desc()).all()
+    return render_template('admin/applications.html', applications=applications)
+
+
+@admin_bp.route('/admin/applications/approve/<int:app_id>', methods=['POST'])
+@admin_required
+def admin_approve_application(app_id):
+    application = Application.query.get(app_id)
+    if application:
+        application.status = 'Accepted'
+        db.session.commit()
+        flash('Đã duyệt hồ sơ (Đỗ)!', 'success')
+    return redirect(url_for('admin.admin_applications'))
+
+@admin_bp.route('/admin/applications/reject/<int:app_id>', methods=['POST'])
+@admin_required
+def admin_reject_application(app_id):
+    application = Application.query.get(app_id)
+    if application:
+        application.status = 'Rejected'
+        db.session.commit()
+        flash('Đã từ chối hồ sơ (Trượt)!', 'warning')
+    return redirect(url_for('admin.admin_applications'))
+
+@admin_bp.route('/admin/perf')
+@admin_required
+def admin_perf():
+    """Số câu SQL, thời gian DB và câu chậm nhất theo endpoint (worker hiện tại)"""
+    # ?route=<endpoint> để chỉ xem một endpoint
+    stats = perf.snapshot(request.args.get('route') or None)
+    enabled = bool(current_app.config.get('PERF_INSTRUMENTATION'))
+    if request.args.get('format') == 'json':
+        return jsonify({'enabled': enabled, 'pid': os.getpid(), 'since': perf.started_at, 'endpoints': stats})
+    return render_template('admin/perf.html', stats=stats, enabled=enabled, pid=os.getpid(),
+                           since=datetime.fromtimestamp(perf.started_at))
+
+@admin_bp.route('/admin/perf/reset', methods=['POST'])
+@admin_required
+def admin_perf_reset():
+    perf.reset()
+    flash('Đã xoá số liệu hiệu năng.', 'success')
+    return redirect(url_for('admin.admin_perf'))
+
+@admin_bp.route('/admin/statistics')
+@admin_required
+def admin_statistics():
+    total_applicants = Applicant.query.count()
+    total_applications = Application.query.count()
+    total_accepted = Application.query.filter_by(status='Accepted').count()
+    total_rejected = Application.query.filter_by(status='Rejected').count()
+    # Thống kê theo ngành
+    from sqlalchemy import func, case
+    stats_by_program = db.session.query(
+        Program.name,
+        func.count(Application.id),
+        func.sum(case((Application.status == 'Accepted', 1), else_=0)),
+        func.sum(case((Application.status == 'Rejected', 1), else_=0))
+    ).join(Application, Application.program_id == Program.id, isouter=True)
+    stats_by_program = stats_by_program.group_by(Program.id).all()
+    return render_template('admin/statistics.html',
+        total_applicants=total_applicants,
+        total_applications=total_applications,
+        total_accepted=total_accepted,
+        total_rejected=total_rejected,
+        stats_by_program=stats_by_program)
+
+# ============================================================================
+# ADMIN USER MANAGEMENT ROUTES
+# ============================================================================
+
+@admin_bp.route('/admin/users')
+@admin_required
+def admin_users():
+    """Quản lý tài khoản người dùng"""
+    search = request.args.get('search', '')
+    role_filter = request.args.get('role', '')
+    
+    query = User.query
+    
+    if search:
+        query = query.filter(
+            (User.username.contains(search)) | 
+            (User.email.contains(search))
+        )
+    
+    if role_filter:
+        query = query.filter_by(role=role_filter)
+    
+    users = query.order_by(User.created_at.desc()).all()
+    
+    return render_template('admin/users.html', 
+                         users=users, 
+                         search=search, 
+                         role_filter=role_filter)
+
+@admin_bp.route('/admin/users/add', methods=['GET', 'POST'])
+@admin_required
+def admin_add_user():
+    """Thêm tài khoản mới"""
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        role = request.form.get('role', 'user')
+        email_verified = request.form.get('email_verified') == 'on'
+        
+        # Validate
+        if User.query.filter_by(username=username).first():
+            flash('Tên đăng nhập đã tồn tại!', 'danger')
+            return render_template('admin/add_user.html')
+        
+        if User.query.filter_by(email=email).first():
+            flash('Email đã được sử dụng!', 'danger')
+            return render_template('admin/add_user.html')
+        
+        # Create user
+        user = User(
+            username=username,
+            email=email,
+            role=role,
+            email_verified=email_verified
+        )
+        user.set_password(password)
+        
+        if email_verified:
+            user.email_verified_at = datetime.utcnow()
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        flash(f'Đã tạo tài khoản {username} thành công!', 'success')
+        return redirect(url_for('admin.admin_users'))
+    
+    return render_template('admin/add_user.html')
+
+@admin_bp.route('/admin/users/edit/<int:user_id>', methods=['GET', 'POST'])
+@admin_required
+def admin_edit_user(user_id):
+    """Chỉnh sửa tài khoản"""
+    user = User.query.get_or_404(user_id)
+    
+    # Không cho phép admin tự sửa role của chính mình
+    if user.id == current_user.id and request.method == 'POST':
+        new_role = request.form.get('role')
+        if new_role != user.role:
+            flash('Bạn không thể thay đổi role của chính mình!', 'warning')
+            return redirect(url_for('admin.admin_users'))
+    
+    if request.method == 'POST':
+        user.username = request.form.get('username')
+        user.email = request.form.get('email')
+        user.role = request.form.get('role', 'user')
+        
+        # Update email verification
+        email_verified = request.form.get('email_verified') == 'on'
+        if email_verified and not user.email_verified:
+            user.email_verified = True
+            user.email_verified_at = datetime.utcnow()
+        elif not email_verified and user.email_verified:
+            user.email_verified = False
+            user.email_verified_at = None
+        
+        # Update password if provided
+        new_password = request.form.get('password')
+        if new_password:
+            user.set_password(new_password)
+        
+        db.session.commit()
+        flash(f'Đã cập nhật tài khoản {user.username}!', 'success')
+        return redirect(url_for('admin.admin_users'))
+    
+    return render_template('admin/edit_user.html', user=user)
+
+@admin_bp.route('/admin/users/delete/<int:user_id>', methods=['POST'])
+@admin_required
+def admin_delete_user(user_id):
+    """Xóa tài khoản"""
+    user = User.query.get_or_404(user_id)
+    
+    # Không cho phép xóa chính mình
+    if user.id == current_user.id:
+        flash('Bạn không thể xóa tài khoản của chính mình!', 'danger')
+        return redirect(url_for('admin.admin_users'))
+    
+    # Không cho phép xóa admin cuối cùng
+    if user.role == 'admin':
+        admin_count = User.query.filter_by(role='admin').count()
+        if admin_count <= 1:
+            flash('Không thể xóa admin duy nhất trong hệ thống!', 'danger')
+            return redirect(url_for('admin.admin_users'))
+    
+    username = user.username
+    db.session.delete(user)
+    db.session.commit()
+    
+    flash(f'Đã xóa tài khoản {username}!', 'success')
+    return redirect(url_for('admin.admin_users'))
+
+@admin_bp.route('/admin/users/toggle-status/<int:user_id>', methods=['POST'])
+@admin_required
+def admin_toggle_user_status(user_id):
+    """Bật/tắt xác thực email"""
+    user = User.query.get_or_404(user_id)
+    
+    user.email_verified = not user.email_verified
+    if user.email_verified:
+        user.email_verified_at = datetime.utcnow()
+    else:
+        user.email_verified_at = None
+    
+    db.session.commit()
+    
+    status = "đã xác thực" if user.email_verified else "chưa xác thực"
+    flash(f'Tài khoản {user.username} {status}!', 'success')
+    return redirect(url_for('admin.admin_users'))
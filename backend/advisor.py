@@ -0,0 +1,162 @@
+"""
+Blueprint tư vấn ngành học: trang /advisor, gợi ý ngành theo điểm, thống kê điểm chuẩn, đọc CV.
+"""
+import math
+import re
+
+from flask import Blueprint, jsonify, render_template, request
+from flask_login import login_required
+from werkzeug.utils import secure_filename
+
+from .catalogue import catalogue
+from .extensions import allowed_doc
+from .models import Program, AdmissionQuota
+
+advisor_bp = Blueprint('advisor', __name__)
+
+@advisor_bp.route('/api/cv_parse', methods=['POST'])
+@login_required
+def api_cv_parse():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['file']
+    filename = secure_filename(file.filename)
+    if not allowed_doc(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    # Đọc nội dung file (giả lập, chỉ đọc text)
+    try:
+        content = file.read().decode('utf-8', errors='ignore')
+    except Exception:
+        content = ''
+    # Trích xuất mẫu (mock): họ tên, email, kỹ năng, học vấn, kinh nghiệm
+    # Limit captures to the end of line to avoid spanning into next fields
+    name = re.search(r'(?i)ho ten[:\s]*([^\r\n]+)', content)
+    email = re.search(r'(?i)email[:\s]*([^\s]+@[\w\.-]+)', content)
+    skills = re.findall(r'(?i)ky nang[:\s]*([^\r\n]+)', content)
+    education = re.findall(r'(?i)hoc van[:\s]*([^\r\n]+)', content)
+    exp = re.findall(r'(?i)kinh nghiem[:\s]*([^\r\n]+)', content)
+    result = {
+        'name': name.group(1).strip() if name else '',
+        # Return only the email value (captured group), not the entire matched expression
+        'email': email.group(1) if email else '',
+        'skills': skills,
+        'education': education,
+        'experience': exp
+    }
+    return jsonify({'parsed': result})
+# ============================================================================
+# AI ADVISOR ROUTES - Tư vấn ngành học thông minh
+# ============================================================================
+
+@advisor_bp.route('/api/suggest-programs', methods=['POST'])
+def suggest_programs():
+    """
+    API tư vấn ngành học phù hợp dựa trên điểm số
+    Input: {
+        "scores": {
+            "toan": 8.5,
+            "van": 7.5,
+            "ngoai_ngu": 8.0,
+            "ly": 9.0,
+            "hoa": 8.5,
+            "sinh": 7.0
+        },
+        "method": "thpt" | "hoc_ba" | "dgnl" | "tuyen_thang"
+    }
+    Output: List of suggested programs with admission probability
+    """
+    # NumPy chỉ nạp khi có request đầu tiên (import app không kéo theo thư viện nặng)
+    from .scoring import best_combinations, combination_scores, cutoff_scorer
+
+    try:
+        data = request.get_json()
+        scores = data.get('scores', {})
+        method = data.get('method', 'thpt')
+        
+        # Tính điểm các khối xét tuyển (một lần cho học sinh, không lặp lại trong từng ngành)
+        columns, totals = combination_scores([scores], method)
+        combinations = {name: float(v) for name, v in zip(columns, totals[0]) if not math.isnan(v)}
+        best, best_names = best_combinations(columns, totals)
+        
+        # So sánh với điểm chuẩn năm gần nhất của mọi ngành trong một phép tính vector
+        # (danh mục + mảng điểm chuẩn dựng sẵn từ snapshot trong bộ nhớ, không query DB)
+        scorer = cutoff_scorer(catalogue.get())
+        suggestions = scorer.suggest(best[0], best_names[0], k=10)
+        
+        # Trả về top 10
+        return jsonify({
+            'success': True,
+            'suggestions': suggestions,
+            'total': len(scorer),
+            'method': method,
+            'combinations': {k: round(v, 2) for k, v in combinations.items()}
+        })
+    
+    except Exception as e:
+        print(f"[suggest_programs] Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@advisor_bp.route('/advisor', endpoint='advisor_page')
+def advisor():
+    """Trang tư vấn ngành học"""
+    return render_template('advisor.html')
+
+
+@advisor_bp.route('/api/admission-statistics', methods=['GET'])
+def admission_statistics():
+    """API thống kê điểm chuẩn các năm"""
+    try:
+        program_id = request.args.get('program_id', type=int)
+        
+        if program_id:
+            # Lấy điểm chuẩn của một ngành qua các năm
+            quotas = AdmissionQuota.query.filter_by(
+                program_id=program_id
+            ).order_by(AdmissionQuota.year).all()
+            
+            program = Program.query.get(program_id)
+            
+            return jsonify({
+                'success': True,
+                'program': {
+                    'id': program.id,
+                    'name': program.name,
+                    'code': program.code
+                } if program else None,
+                'history': [{
+                    'year': q.year,
+                    'minimum_score': q.minimum_score,
+                    'quota': q.quota,
+                    'actual_intake': q.actual_intake
+                } for q in quotas]
+            })
+        else:
+            # Lấy tổng quan tất cả các ngành (snapshot danh mục, không query DB)
+            overview = []
+            
+            for program in catalogue.get().with_quota():
+                latest = program['latest_quota']
+                overview.append({
+                    'id': program['id'],
+                    'name': program['name'],
+                    'code': program['code'],
+                    'department': program['department'],
+                    'latest_year': latest['year'],
+                    'minimum_score': latest['minimum_score'],
+                    'quota': latest['quota']
+                })
+            
+            return jsonify({
+                'success': True,
+                'programs': overview
+            })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
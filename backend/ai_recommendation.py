@@ -1,8 +1,10 @@
 """
 API endpoints cho tính năng gợi ý ngành học dựa trên điểm và sở thích
 """
-from flask import Blueprint, request, jsonify
-from .models import db, Program, AdmissionScore, AdmissionMethod, StudentPreference
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .extensions import rate_limit
+from sqlalchemy.orm import joinedload
+from .models import db, AdmissionScore, AdmissionMethod, StudentPreference
 from datetime import datetime
 import json
 
@@ -120,6 +122,9 @@ def recommend_programs():
         "career_goals": "Trở thành kỹ sư phần mềm"
     }
     """
+    # NumPy chỉ nạp khi có request đầu tiên (import app không kéo theo thư viện nặng)
+    from .scoring import MatchScorer, probability_labels, top_k
+
     try:
         data = request.get_json()
         
@@ -158,54 +163,41 @@ def recommend_programs():
         # Tìm các ngành phù hợp với điểm số
         current_year = datetime.now().year
         
-        # Lấy điểm chuẩn năm gần nhất
-        scores_query = AdmissionScore.query.filter(
+        # Lấy điểm chuẩn năm gần nhất + ngành trong MỘT câu query (LEFT JOIN program, không query theo từng dòng)
+        scores_query = AdmissionScore.query.options(joinedload(AdmissionScore.program)).filter(
             AdmissionScore.admission_score <= total_score,
             AdmissionScore.year.in_([current_year, current_year - 1, current_year - 2])
-        ).order_by(AdmissionScore.admission_score.desc()).all()
+        ).order_by(AdmissionScore.admission_score.desc(), AdmissionScore.id).all()
         
-        recommendations = []
+        # Chấm điểm mọi ngành trong một phép tính vector, chỉ dựng JSON cho top 10
+        scorer = MatchScorer([score.program_name for score in scores_query],
+                             [score.admission_score for score in scores_query])
+        match_scores = scorer.score(total_score, interests, skills)
+        top = top_k(match_scores, 10)
+        labels = probability_labels(total_score - scorer.cutoffs[top])
         
-        for score in scores_query:
-            # Tính điểm phù hợp
-            match_score = calculate_match_score(score, total_score, interests, skills)
-            
-            # Lấy thông tin chương trình nếu có
-            program_info = None
-            if score.program_id:
-                program = Program.query.get(score.program_id)
-                if program:
-                    program_info = {
-                        'name': program.name,
-                        'code': program.code,
-                        'description': program.description,
-                        'career_prospects': program.career_prospects,
-                        'tuition_fee': program.tuition_fee
-                    }
+        top_recommendations = []
+        
+        for i, probability in zip(top, labels):
+            score = scores_query[i]
             
-            recommendations.append({
+            top_recommendations.append({
                 'program_name': score.program_name,
                 'admission_score': score.admission_score,
                 'year': score.year,
                 'notes': score.notes,
-                'match_score': match_score,
+                'match_score': float(match_scores[i]),
                 'score_difference': total_score - score.admission_score,
-                'probability': get_admission_probability(total_score, score.admission_score),
-                'program_info': program_info
+                'probability': str(probability),
+                'program_info': program_info(score.program)
             })
         
-        # Sắp xếp theo độ phù hợp
-        recommendations.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        # Lấy top 10
-        top_recommendations = recommendations[:10]
-        
         return jsonify({
             'success': True,
             'data': {
                 'total_score': total_score,
                 'recommendations': top_recommendations,
-                'total_matches': len(recommendations)
+                'total_matches': len(scorer)
             }
         })
     
@@ -215,86 +207,64 @@ def recommend_programs():
             'error': str(e)
         }), 500
 
+def program_info(program):
+    """Thông tin ngành kèm theo mỗi gợi ý (None nếu điểm chuẩn chưa gắn với ngành nào)"""
+    if program is None:
+        return None
+    return {
+        'name': program.name,
+        'code': program.code,
+        'description': program.description,
+        'career_prospects': program.career_prospects,
+        'tuition_fee': program.tuition_fee
+    }
+
+@ai_recommendation_bp.route('/api/recommend-programs/batch', methods=['POST'])
+@rate_limit("30/hour")
+def recommend_programs_batch():
+    """
+    Gợi ý ngành cho cả lớp (giáo viên tư vấn tải lên), trả về NDJSON.
+    Body: file CSV (multipart 'file' hoặc Content-Type text/csv) với cột
+        student_id, name, total_score, interests, skills   (interests / skills cách nhau bởi ';')
+    hoặc JSON {"students": [{"student_id": "...", "total_score": 21.5, "interests": [...], ...}], "k": 10}
+    Mỗi dòng: {"row", "student_id", "name", "total_score", "recommendations", "total_matches"}
+    (recommendations cùng định dạng /api/recommend-programs), hoặc {"row", "error"};
+    dòng cuối: {"summary": {"students", "scored", "errors", "seconds", "students_per_second", ...}}
+    """
+    from .recommend_batch import BatchError, load_candidates, parse_students, stream_recommendations
+
+    try:
+        students = parse_students(request)
+    except BatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status
+    data = request.get_json(silent=True) if request.is_json else None
+    k = request.args.get('k') or (data.get('k') if isinstance(data, dict) else None) or 10
+    try:
+        k = max(1, min(int(k), 50))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Tham số k phải là số nguyên'}), 400
+    # Nạp điểm chuẩn + ngành trước khi stream (generator không dùng DB)
+    candidates = load_candidates()
+    return Response(stream_with_context(stream_recommendations(candidates, students, k=k)),
+                    mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
 def calculate_match_score(score, total_score, interests, skills):
     """
-    Tính điểm phù hợp dựa trên nhiều yếu tố
+    Tính điểm phù hợp dựa trên nhiều yếu tố (một ngành; xem backend/scoring.py)
     Score: 0-100
     """
-    match_score = 0.0
-    
-    # 40% dựa trên điểm số
-    score_diff = total_score - score.admission_score
-    if score_diff >= 3:
-        match_score += 40  # Rất an toàn
-    elif score_diff >= 1.5:
-        match_score += 35  # An toàn
-    elif score_diff >= 0.5:
-        match_score += 30  # Trúng tuyển khả thi
-    elif score_diff >= 0:
-        match_score += 25  # Nguy hiểm
-    else:
-        match_score += 10  # Rất khó
-    
-    # 30% dựa trên sở thích
-    program_name_lower = score.program_name.lower()
-    interest_keywords = {
-        'công nghệ': ['công nghệ', 'kỹ thuật', 'máy tính', 'phần mềm', 'mạng', 'an ninh'],
-        'kinh doanh': ['kinh doanh', 'quản trị', 'marketing', 'thương mại'],
-        'thiết kế': ['thiết kế', 'đồ họa', 'truyền thông', 'nghệ thuật'],
-        'tài chính': ['tài chính', 'ngân hàng', 'kế toán'],
-        'AI': ['AI', 'trí tuệ', 'máy học', 'dữ liệu'],
-        'tự động': ['tự động', 'robot', 'điện tử', 'cơ điện']
-    }
-    
-    interest_match = 0
-    for interest in interests:
-        interest_lower = interest.lower()
-        if interest_lower in interest_keywords:
-            for keyword in interest_keywords[interest_lower]:
-                if keyword in program_name_lower:
-                    interest_match += 10
-                    break
-    
-    match_score += min(interest_match, 30)
-    
-    # 30% dựa trên kỹ năng
-    skill_keywords = {
-        'lập trình': ['phần mềm', 'công nghệ thông tin', 'máy tính'],
-        'logic': ['máy tính', 'toán', 'AI'],
-        'sáng tạo': ['thiết kế', 'đồ họa', 'nghệ thuật', 'truyền thông'],
-        'giao tiếp': ['marketing', 'quản trị', 'kinh doanh'],
-        'kỹ thuật': ['kỹ thuật', 'điện', 'tự động', 'ô tô']
-    }
-    
-    skill_match = 0
-    for skill in skills:
-        skill_lower = skill.lower()
-        if skill_lower in skill_keywords:
-            for keyword in skill_keywords[skill_lower]:
-                if keyword in program_name_lower:
-                    skill_match += 10
-                    break
-    
-    match_score += min(skill_match, 30)
-    
-    return round(match_score, 2)
+    from .scoring import MatchScorer
+
+    scorer = MatchScorer([score.program_name], [score.admission_score])
+    return round(float(scorer.score(total_score, interests, skills)[0]), 2)
 
 def get_admission_probability(total_score, admission_score):
     """
     Tính xác suất trúng tuyển
     """
-    diff = total_score - admission_score
-    
-    if diff >= 3:
-        return "Rất cao (95-100%)"
-    elif diff >= 1.5:
-        return "Cao (80-95%)"
-    elif diff >= 0.5:
-        return "Trung bình (60-80%)"
-    elif diff >= 0:
-        return "Thấp (40-60%)"
-    else:
-        return "Rất thấp (<40%)"
+    from .scoring import probability_labels
+
+    return str(probability_labels(total_score - admission_score))
 
 @ai_recommendation_bp.route('/api/statistics/admission-scores', methods=['GET'])
 def get_admission_statistics():
@@ -0,0 +1,170 @@
+"""
+Blueprint xác thực: đăng nhập / đăng ký / đăng xuất, quên & đặt lại mật khẩu, xác thực email.
+"""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+from itsdangerous import BadSignature, SignatureExpired
+
+from .extensions import get_serializer, rate_limit, send_email, verify_recaptcha
+from .models import db, User
+
+auth_bp = Blueprint('auth', __name__)
+
+@auth_bp.route('/forgot-password')
+def forgot_password():
+    # Minimal page kept for GET compatibility
+    return render_template('forgot_password.html')
+
+@auth_bp.route('/resend-verification')
+@login_required
+def resend_verification():
+    if getattr(current_user, 'email_verified', False):
+        flash('Tài khoản của bạn đã được xác thực.', 'info')
+        return redirect(url_for('main.index'))
+    try:
+        token = get_serializer().dumps({'uid': current_user.id, 'email': current_user.email}, salt='verify-email')
+        verify_link = url_for('auth.verify_email', token=token, _external=True)
+        html = render_template('emails/verify_email.html', username=current_user.username, verify_link=verify_link)
+        sent = send_email('Xác thực email tài khoản', [current_user.email], html)
+        if sent:
+            flash('Đã gửi lại email xác thực. Vui lòng kiểm tra hộp thư.', 'success')
+        else:
+            flash('Không gửi được email xác thực. Vui lòng thử lại sau.', 'danger')
+    except Exception as e:
+        print(f"[verify-email] resend failed: {e}")
+        flash('Không gửi được email xác thực. Vui lòng thử lại sau.', 'danger')
+    return redirect(url_for('main.index'))
+
+# Forgot password (POST) and reset password
+@auth_bp.route('/forgot-password', methods=['POST'])
+@rate_limit("3/minute")
+def forgot_password_post():
+    token = request.form.get('g-recaptcha-response')
+    if not verify_recaptcha(token):
+        flash('Vui lòng xác nhận bạn không phải robot (reCAPTCHA)!', 'danger')
+        return render_template('forgot_password.html')
+    email = request.form.get('email')
+    user = User.query.filter_by(email=email).first()
+    # Avoid user enumeration
+    if user:
+        token = get_serializer().dumps({'uid': user.id, 'email': user.email}, salt='reset-password')
+        reset_link = url_for('auth.reset_password', token=token, _external=True)
+        html = render_template('emails/reset_password.html', username=user.username, reset_link=reset_link)
+        send_email('Đặt lại mật khẩu', [user.email], html)
+    flash('Nếu email tồn tại, liên kết đặt lại mật khẩu đã được gửi.', 'info')
+    return redirect(url_for('auth.login'))
+
+@auth_bp.route('/reset-password/<token>', methods=['GET', 'POST'])
+def reset_password(token):
+    try:
+        data = get_serializer().loads(token, salt='reset-password', max_age=3600)
+        user = User.query.get(data['uid'])
+        if not user or user.email != data.get('email'):
+            raise BadSignature('Invalid user')
+    except (SignatureExpired, BadSignature):
+        flash('Link đặt lại mật khẩu không hợp lệ hoặc đã hết hạn.', 'danger')
+        return redirect(url_for('auth.forgot_password'))
+    if request.method == 'POST':
+        new_password = request.form.get('password')
+        confirm = request.form.get('confirm_password')
+        if not new_password or len(new_password) < 6:
+            flash('Mật khẩu phải có ít nhất 6 ký tự.', 'danger')
+            return render_template('reset_password.html')
+        if new_password != confirm:
+            flash('Mật khẩu nhập lại không khớp.', 'danger')
+            return render_template('reset_password.html')
+        user.set_password(new_password)
+        db.session.commit()
+        flash('Đổi mật khẩu thành công. Vui lòng đăng nhập.', 'success')
+        return redirect(url_for('auth.login'))
+    return render_template('reset_password.html')
+
+# Email verification flow
+@auth_bp.route('/verify-email/<token>')
+def verify_email(token):
+    try:
+        data = get_serializer().loads(token, salt='verify-email', max_age=86400)
+        user = User.query.get(data['uid'])
+        if not user or user.email != data.get('email'):
+            raise BadSignature('Invalid user')
+        if not getattr(user, 'email_verified', False):
+            user.email_verified = True
+            user.email_verified_at = datetime.utcnow()
+            db.session.commit()
+        flash('Xác thực email thành công. Bạn có thể sử dụng đầy đủ chức năng.', 'success')
+        return redirect(url_for('auth.login'))
+    except (SignatureExpired, BadSignature):
+        flash('Link xác thực không hợp lệ hoặc đã hết hạn.', 'danger')
+        return redirect(url_for('main.index'))
+
+# ============================================================================
+# END ADMIN USER MANAGEMENT ROUTES
+# ============================================================================
+
+# Authentication routes
+@auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit("5/minute")
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    if request.method == 'POST':
+        token = request.form.get('g-recaptcha-response')
+        if not verify_recaptcha(token):
+            flash('Vui lòng xác nhận bạn không phải robot (reCAPTCHA)!', 'danger')
+            return render_template('login.html')
+        username_or_email = request.form.get('username_or_email')
+        password = request.form.get('password')
+        user = User.query.filter((User.username == username_or_email) | (User.email == username_or_email)).first()
+        if user and user.check_password(password):
+            login_user(user)
+            flash('Đăng nhập thành công!', 'success')
+            return redirect(url_for('main.index'))
+        else:
+            flash('Sai thông tin đăng nhập!', 'danger')
+    return render_template('login.html')
+
+@auth_bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Đã đăng xuất!')
+    return redirect(url_for('auth.login'))
+
+@auth_bp.route('/register', methods=['GET', 'POST'])
+@rate_limit("3/minute")
+def register():
+    if request.method == 'POST':
+        token = request.form.get('g-recaptcha-response')
+        if not verify_recaptcha(token):
+            flash('Vui lòng xác nhận bạn không phải robot (reCAPTCHA)!', 'danger')
+            return render_template('register.html')
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        if not username or not email or not password:
+            flash('Vui lòng điền đầy đủ thông tin!', 'danger')
+            return render_template('register.html')
+        if User.query.filter((User.username == username) | (User.email == email)).first():
+            flash('Tên đăng nhập hoặc email đã tồn tại!', 'danger')
+            return render_template('register.html')
+        user = User(username=username, email=email)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        # Send verification email
+        try:
+            token = get_serializer().dumps({'uid': user.id, 'email': user.email}, salt='verify-email')
+            verify_link = url_for('auth.verify_email', token=token, _external=True)
+            html = render_template('emails/verify_email.html', username=user.username, verify_link=verify_link)
+            sent = send_email('Xác thực email tài khoản', [user.email], html)
+            if sent:
+                flash('Đăng ký thành công! Kiểm tra email để xác thực tài khoản.', 'success')
+            else:
+                flash('Đăng ký thành công! (Không gửi được email xác thực, thử lại sau)', 'warning')
+        except Exception as e:
+            print(f"[verify-email] send failed: {e}")
+            flash('Đăng ký thành công! (Không gửi được email xác thực, thử lại sau)', 'warning')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html')
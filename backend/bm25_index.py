@@ -0,0 +1,120 @@
+"""
+BM25 sparse index cho RAG (hybrid với FAISS)
+Posting lists lưu dạng CSR (indptr / rows / impacts) bằng mảng numpy, điểm BM25
+của từng (term, chunk) được tính sẵn lúc build, nên truy vấn chỉ là cộng dồn vài
+posting list: vài chục micro-giây. Bắt được các mã chính xác như "7480201",
+"A00", "D01" mà embedding dense thường bỏ lỡ.
+"""
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rag_store import atomic_save_npy
+
+BM25_INDPTR = 'bm25_indptr.npy'
+BM25_ROWS = 'bm25_rows.npy'
+BM25_IMPACTS = 'bm25_impacts.npy'
+BM25_VOCAB = 'bm25_vocab.json'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def bm25_tokenize(text: str) -> List[str]:
+    """Tách token đơn giản: chữ thường, NFC, giữ nguyên số và mã tổ hợp (a00, 7480201)"""
+    return _TOKEN_RE.findall(unicodedata.normalize('NFC', text).lower())
+
+
+class BM25Index:
+    def __init__(self, vocab: dict, indptr: np.ndarray, rows: np.ndarray, impacts: np.ndarray, n_docs: int):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self.impacts = impacts
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, documents: Sequence[str], k1: float = 1.2, b: float = 0.75) -> 'BM25Index':
+        """Build index từ danh sách documents (vị trí trong list = row)"""
+        doc_terms = [Counter(bm25_tokenize(doc)) for doc in documents]
+        n_docs = len(doc_terms)
+        lengths = np.array([sum(c.values()) for c in doc_terms], dtype=np.float32)
+        avgdl = float(lengths.mean()) if n_docs and lengths.sum() else 1.0
+
+        postings = {}
+        for row, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab = {}
+        indptr = [0]
+        rows, impacts = [], []
+        for term in sorted(postings):
+            plist = postings[term]
+            df = len(plist)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            vocab[term] = len(vocab)
+            for row, tf in plist:
+                norm = tf + k1 * (1 - b + b * lengths[row] / avgdl)
+                rows.append(row)
+                impacts.append(idf * tf * (k1 + 1) / norm)
+            indptr.append(len(rows))
+
+        return cls(vocab,
+                   np.asarray(indptr, dtype=np.int64),
+                   np.asarray(rows, dtype=np.int32),
+                   np.asarray(impacts, dtype=np.float32),
+                   n_docs)
+
+    def save(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        atomic_save_npy(os.path.join(cache_dir, BM25_INDPTR), self.indptr)
+        atomic_save_npy(os.path.join(cache_dir, BM25_ROWS), self.rows)
+        atomic_save_npy(os.path.join(cache_dir, BM25_IMPACTS), self.impacts)
+        tmp = os.path.join(cache_dir, BM25_VOCAB + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'n_docs': self.n_docs, 'vocab': self.vocab}, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(cache_dir, BM25_VOCAB))
+
+    @classmethod
+    def load(cls, cache_dir: str) -> Optional['BM25Index']:
+        """Nạp index đã lưu (posting arrays được memory-map). None nếu chưa có"""
+        paths = [os.path.join(cache_dir, name) for name in (BM25_INDPTR, BM25_ROWS, BM25_IMPACTS, BM25_VOCAB)]
+        if not all(os.path.exists(p) for p in paths):
+            return None
+        with open(paths[3], 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(meta['vocab'],
+                   np.load(paths[0], mmap_mode='r'),
+                   np.load(paths[1], mmap_mode='r'),
+                   np.load(paths[2], mmap_mode='r'),
+                   int(meta['n_docs']))
+
+    def search(self, query: str, top_k: int = 10,
+               allowed_rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trả về (rows, scores) của top_k chunk theo BM25, giảm dần
+        Args:
+            allowed_rows: Mảng row được phép (lọc metadata); None = không lọc
+        """
+        term_ids = [self.vocab[t] for t in set(bm25_tokenize(query)) if t in self.vocab]
+        if not term_ids or self.n_docs == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows = np.concatenate([self.rows[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        impacts = np.concatenate([self.impacts[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        scores = np.bincount(rows, weights=impacts, minlength=self.n_docs).astype(np.float32)
+        if allowed_rows is not None:
+            mask = np.zeros(self.n_docs, dtype=bool)
+            mask[allowed_rows] = True
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[part]
+        order = np.argsort(-scores[candidates], kind='stable')
+        top = candidates[order]
+        return top, scores[top]
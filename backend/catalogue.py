@@ -0,0 +1,173 @@
+"""
+Danh mục tuyển sinh chỉ-đọc trong bộ nhớ: ngành, khoa và chỉ tiêu / điểm chuẩn năm gần nhất
+của từng ngành, dựng bằng một câu query JOIN và giữ trong mỗi worker.
+
+/api/suggest-programs, /api/admission-statistics... đọc snapshot này thay cho
+Program.query.all() + một query AdmissionQuota + lazy-load department cho mỗi ngành (2N+1 query).
+
+Hết hiệu lực khi:
+- session commit có thêm / sửa / xoá Program, Department, AdmissionQuota (event SQLAlchemy);
+- file version (CATALOGUE_VERSION_FILE, mặc định data/.catalogue_version) đổi: commit ở worker /
+  process khác ghi lại file này, nên mọi worker dựng lại snapshot ở request kế tiếp.
+Script sửa DB bằng SQL thô: gọi catalogue.invalidate() hoặc `touch data/.catalogue_version`.
+"""
+import os
+import threading
+import time
+import uuid
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, func
+from sqlalchemy.orm import Session
+
+from .models import db, AdmissionQuota, Department, Program
+
+VERSION_FILE = os.getenv('CATALOGUE_VERSION_FILE', os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', '.catalogue_version')))
+
+TRACKED_MODELS = (Program, Department, AdmissionQuota)
+
+_catalogues = weakref.WeakSet()
+
+
+class CatalogueSnapshot:
+    """Bản chụp bất biến: dict thuần, không giữ object ORM nên đọc không chạm tới DB"""
+
+    __slots__ = ('version', 'programs', 'by_id', 'built_at', 'build_ms')
+
+    def __init__(self, version, programs: List[dict], build_ms: float):
+        self.version = version
+        self.programs = tuple(programs)
+        self.by_id = {p['id']: p for p in programs}
+        self.built_at = time.time()
+        self.build_ms = build_ms
+
+    def with_quota(self) -> List[dict]:
+        """Các ngành đã có chỉ tiêu / điểm chuẩn (thứ tự theo id như Program.query.all())"""
+        return [p for p in self.programs if p['latest_quota'] is not None]
+
+
+def _quota_dict(quota: Optional[AdmissionQuota]) -> Optional[dict]:
+    if quota is None:
+        return None
+    return {'year': quota.year, 'quota': quota.quota, 'minimum_score': quota.minimum_score,
+            'actual_intake': quota.actual_intake}
+
+
+def load_programs(session=None) -> List[dict]:
+    """Một câu SELECT: Program LEFT JOIN Department LEFT JOIN chỉ tiêu của năm lớn nhất"""
+    session = session or db.session
+    latest = (session.query(AdmissionQuota.program_id, func.max(AdmissionQuota.year).label('year'))
+              .group_by(AdmissionQuota.program_id).subquery())
+    rows = (session.query(Program, Department.name, AdmissionQuota)
+            .outerjoin(Department, Program.department_id == Department.id)
+            .outerjoin(latest, latest.c.program_id == Program.id)
+            .outerjoin(AdmissionQuota, and_(AdmissionQuota.program_id == Program.id,
+                                            AdmissionQuota.year == latest.c.year))
+            .order_by(Program.id, AdmissionQuota.id)
+            .all())
+    programs: Dict[int, dict] = {}
+    for program, department_name, quota in rows:
+        # Trùng năm: giữ bản ghi chỉ tiêu có id lớn nhất (hàng sau ghi đè)
+        entry = programs.get(program.id)
+        if entry is None:
+            programs[program.id] = entry = {
+                'id': program.id,
+                'name': program.name,
+                'code': program.code,
+                'department_id': program.department_id,
+                'department': department_name or 'N/A',
+                'tuition_fee': program.tuition_fee,
+                'duration': program.duration,
+                'latest_quota': None,
+            }
+        if quota is not None:
+            entry['latest_quota'] = _quota_dict(quota)
+    return list(programs.values())
+
+
+class Catalogue:
+    """
+    Args:
+        version_path: File đánh dấu version dùng chung giữa các worker (None = chỉ trong process)
+    """
+
+    def __init__(self, version_path: Optional[str] = VERSION_FILE):
+        self.version_path = version_path
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        _catalogues.add(self)
+
+    def _stamp(self) -> Tuple:
+        # inode + mtime: os.replace tạo inode mới nên không lỡ hai lần sửa trong cùng một giây
+        if not self.version_path:
+            return ()
+        try:
+            st = os.stat(self.version_path)
+            return (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return (None,)
+
+    def get(self) -> CatalogueSnapshot:
+        """Snapshot hiện hành; dựng lại (một query) nếu chưa có hoặc đã hết hiệu lực"""
+        stamp = self._stamp()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == stamp:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != stamp:
+                start = time.perf_counter()
+                programs = load_programs()
+                snapshot = CatalogueSnapshot(stamp, programs, (time.perf_counter() - start) * 1000)
+                self._snapshot = snapshot
+                self.builds += 1
+        return snapshot
+
+    def invalidate(self, broadcast: bool = True):
+        """Bỏ snapshot của process này; broadcast=True ghi lại file version cho các worker khác"""
+        self._snapshot = None
+        if broadcast and self.version_path:
+            try:
+                os.makedirs(os.path.dirname(self.version_path), exist_ok=True)
+                tmp = f"{self.version_path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, 'w') as f:
+                    f.write(f"{time.time_ns()}\n")
+                os.replace(tmp, self.version_path)
+            except OSError as e:
+                print(f"[catalogue] could not bump {self.version_path}: {e}")
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'programs': len(snapshot.programs) if snapshot else 0,
+            'builds': self.builds,
+            'build_ms': round(snapshot.build_ms, 2) if snapshot else None,
+            'age_seconds': round(time.time() - snapshot.built_at, 1) if snapshot else None,
+        }
+
+
+# ----- invalidation qua session event -----
+@event.listens_for(Session, 'after_flush')
+def _track_catalogue_changes(session, flush_context):
+    # Trong after_flush, new / dirty / deleted vẫn là trạng thái trước flush
+    if any(isinstance(obj, TRACKED_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['catalogue_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalogue_changed', False):
+        for catalogue in list(_catalogues):
+            catalogue.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('catalogue_changed', None)
+
+
+catalogue = Catalogue()
@@ -0,0 +1,260 @@
+"""
+Blueprint chatbot: trang /chatbot, /api/chat, /api/chat/stream, /api/chat/status
+và xoá cache câu trả lời. Model ML chỉ được nạp qua ChatbotLoader khi cần.
+"""
+import json
+import os
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, \
+    stream_with_context, url_for
+from flask_login import current_user
+
+from .chatbot_loader import ChatbotLoader, warmup_mode
+from .extensions import admin_required, rate_limit, write_queue
+from .models import ChatbotInteraction
+from .response_cache import ResponseCache
+
+chat_bp = Blueprint('chat', __name__)
+
+# Chatbot (RAG + LLM, fallback TF-IDF) được dựng lười: import app không nạp model ML.
+# Ưu tiên dùng biến CHATBOT_KNOWLEDGE_BASE nếu được cấu hình.
+USE_RAG = os.getenv('USE_RAG_CHATBOT', 'true').lower() == 'true'
+KB_ENV = os.getenv('CHATBOT_KNOWLEDGE_BASE')
+KB_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'chatbot_knowledge_new.json')
+KB_PATH = KB_ENV if KB_ENV else KB_DEFAULT
+chatbot = ChatbotLoader(KB_PATH, use_rag=USE_RAG)
+# Số giây một lượt chat chờ chatbot đang warm trước khi trả 503
+CHATBOT_WAIT = float(os.getenv('CHATBOT_WAIT', '20'))
+
+def _get_chatbot(wait=True):
+    """Chatbot đã sẵn sàng (dựng / chờ nếu wait=True), hoặc None"""
+    bot = chatbot
+    if not isinstance(bot, ChatbotLoader):
+        return bot
+    if not wait:
+        return bot.instance
+    return bot.get(timeout=None if current_app.config.get('TESTING') else CHATBOT_WAIT)
+
+def _chatbot_status():
+    """Trạng thái sẵn sàng: cold | warming | ready | failed"""
+    if isinstance(chatbot, ChatbotLoader):
+        return chatbot.status()
+    return {'state': 'ready', 'error': None, 'load_seconds': None}
+
+def _chatbot_warming_response():
+    state = _chatbot_status()['state']
+    resp = jsonify({'response': 'Chatbot đang khởi động, vui lòng thử lại sau giây lát.', 'status': state})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = '5'
+    return resp
+
+@chat_bp.before_app_request
+def _warm_chatbot():
+    # Request đầu tiên kích hoạt warm-up ở thread nền (warm lại sau retry_after nếu lỗi);
+    # các request sau chỉ tốn một phép so sánh
+    if isinstance(chatbot, ChatbotLoader) and chatbot.state in ('cold', 'failed') and warmup_mode() != 'lazy':
+        chatbot.warm()
+
+# Exact-match cache cho /api/chat (câu hỏi chuẩn hoá). CHAT_CACHE_DB bật tầng SQLite dùng chung giữa các worker
+response_cache = None
+if os.getenv('CHAT_CACHE', 'true').lower() == 'true':
+    try:
+        response_cache = ResponseCache(
+            max_entries=int(os.getenv('CHAT_CACHE_SIZE', '1000')),
+            ttl=float(os.getenv('CHAT_CACHE_TTL', '3600')),
+            db_path=os.getenv('CHAT_CACHE_DB') or None
+        )
+    except Exception as e:
+        print(f"[chat-cache] disabled: {e}")
+        response_cache = None
+
+def _log_interaction(user_input, bot_response, user_id):
+    write_queue.enqueue(ChatbotInteraction, user_input=user_input, bot_response=bot_response,
+                        user_id=user_id, timestamp=datetime.utcnow())
+
+def _chat_cache_version():
+    """Version của nguồn trả lời: đổi khi KB / index đổi để cache cũ tự hết hiệu lực"""
+    rag = getattr(_get_chatbot(wait=False), 'rag_engine', None)
+    version = getattr(rag, 'index_version', None) if rag is not None else None
+    if version:
+        return version
+    try:
+        return str(os.stat(KB_PATH).st_mtime_ns)
+    except OSError:
+        return None
+
+@chat_bp.route('/chatbot')
+def chatbot_page():
+    return render_template('chatbot.html')
+
+# Chatbot API
+@chat_bp.route('/api/chat', methods=['POST'])
+@rate_limit("10/minute")
+def chat():
+    data = request.get_json() or {}
+    user_message = (data.get('message') or '').strip()
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    # Optionally check reCAPTCHA for API if desired
+    # token = data.get('recaptcha_token')
+    # if not verify_recaptcha(token):
+    #     return jsonify({'error': 'reCAPTCHA verification failed'}), 400
+    chatbot = _get_chatbot()
+    if chatbot is None:
+        return _chatbot_warming_response()
+    try:
+        # Prefer structured response (with sources) if supported
+        if hasattr(chatbot, 'get_response_with_sources'):
+            cache_version = _chat_cache_version() if response_cache is not None else None
+            data_resp = response_cache.get(user_message, cache_version) if response_cache is not None else None
+            if data_resp is not None:
+                data_resp = {**data_resp, 'cached': 'exact'}
+            else:
+                data_resp = chatbot.get_response_with_sources(user_message)
+                # Chỉ cache câu trả lời RAG / LLM thành công, không cache câu xin lỗi / fallback
+                if response_cache is not None and data_resp.get('ok'):
+                    response_cache.put(user_message, {
+                        'response': data_resp.get('response') or '',
+                        'sources': data_resp.get('sources', []),
+                        'rag': bool(data_resp.get('rag')),
+                        'provider': data_resp.get('provider')
+                    }, cache_version)
+            response_text = data_resp.get('response') or ''
+            # Persist main response
+            _log_interaction(user_message, response_text,
+                             current_user.id if current_user.is_authenticated else None)
+            body = {
+                'response': response_text,
+                'sources': data_resp.get('sources', []),
+                'rag': bool(data_resp.get('rag')),
+                'provider': data_resp.get('provider')
+            }
+            if data_resp.get('cached'):
+                body['cached'] = data_resp['cached']
+            return jsonify(body)
+        else:
+            response_text = chatbot.get_response(user_message)
+            _log_interaction(user_message, response_text,
+                             current_user.id if current_user.is_authenticated else None)
+            return jsonify({'response': response_text})
+    except Exception as e:
+        # Ensure API still returns 200 with a friendly message; log error
+        print(f"[/api/chat] error: {e}")
+        return jsonify({'response': 'Xin lỗi, đã có lỗi xảy ra. Vui lòng thử lại sau.'}), 200
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@chat_bp.route('/api/chat/stream', methods=['GET', 'POST'])
+@rate_limit("10/minute")
+def chat_stream():
+    """
+    Server-Sent Events: gửi 'sources' ngay sau retrieve, sau đó từng 'token'
+    của câu trả lời, cuối cùng 'done'. GET ?message=... để dùng với EventSource.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = (data.get('message') or request.args.get('message') or '').strip()
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    user_id = current_user.id if current_user.is_authenticated else None
+    chatbot = _get_chatbot()
+    if chatbot is None:
+        return _chatbot_warming_response()
+
+    def events():
+        response_text = ''
+        try:
+            cache_version = _chat_cache_version() if response_cache is not None else None
+            cached = response_cache.get(user_message, cache_version) if response_cache is not None else None
+            if cached is not None:
+                yield _sse('sources', {'sources': cached.get('sources', []), 'rag': bool(cached.get('rag')),
+                                       'provider': cached.get('provider')})
+                response_text = cached.get('response') or ''
+                yield _sse('token', {'text': response_text})
+                yield _sse('done', {'response': response_text, 'cached': 'exact'})
+            elif hasattr(chatbot, 'stream_response_with_sources'):
+                sources_event = {}
+                for event, payload in chatbot.stream_response_with_sources(user_message):
+                    if event == 'sources':
+                        sources_event = payload
+                    elif event == 'done':
+                        response_text = payload.get('response') or ''
+                        if response_cache is not None and not payload.get('cached') and payload.get('ok'):
+                            response_cache.put(user_message, {'response': response_text, **sources_event}, cache_version)
+                    yield _sse(event, payload)
+            else:
+                response_text = chatbot.get_response(user_message)
+                yield _sse('sources', {'sources': [], 'rag': False, 'provider': None})
+                yield _sse('token', {'text': response_text})
+                yield _sse('done', {'response': response_text, 'cached': None})
+        except Exception as e:
+            # Như /api/chat: vẫn lưu lượt hội thoại, với câu xin lỗi làm câu trả lời
+            print(f"[/api/chat/stream] error: {e}")
+            response_text = 'Xin lỗi, đã có lỗi xảy ra. Vui lòng thử lại sau.'
+            yield _sse('error', {'response': response_text})
+        _log_interaction(user_message, response_text, user_id)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx: không buffer, gửi token ngay
+    })
+
+# Lightweight status endpoint for Chatbot/RAG/LLM health
+@chat_bp.route('/api/chat/status', methods=['GET'])
+def chat_status():
+    chatbot = _get_chatbot(wait=False)
+    try:
+        info = {
+            'rag': bool(getattr(chatbot, 'use_rag', False)),
+            'provider': None,
+            'llm_available': False,
+            'documents': None,
+            'knowledge_base': getattr(chatbot, 'knowledge_base_path', None),
+            'embedding_model': None,
+            'cache_dir': None,
+            'chatbot': _chatbot_status()
+        }
+        info['ready'] = info['chatbot']['state'] == 'ready'
+        prov = getattr(chatbot, 'llm_provider', None)
+        if prov is not None:
+            info['provider'] = prov.__class__.__name__
+            info['llm_available'] = bool(getattr(prov, 'available', False))
+            if hasattr(prov, 'stats'):
+                info['llm_stats'] = prov.stats()
+        rag = getattr(chatbot, 'rag_engine', None)
+        if rag is not None:
+            info['documents'] = len(getattr(rag, 'documents', []) or [])
+            info['embedding_model'] = getattr(rag, 'model_name', None)
+            info['cache_dir'] = getattr(rag, 'cache_dir', None)
+        semantic_cache = getattr(chatbot, 'semantic_cache', None)
+        if semantic_cache is not None:
+            info['semantic_cache'] = semantic_cache.stats()
+        if response_cache is not None:
+            info['response_cache'] = response_cache.stats()
+        info['write_queue'] = write_queue.stats()
+        # Fallback to Config knowledge base if not on chatbot
+        if not info['knowledge_base']:
+            try:
+                from .config import Config as _Cfg
+                info['knowledge_base'] = _Cfg.CHATBOT_KNOWLEDGE_BASE
+            except Exception:
+                pass
+        return jsonify({'ok': True, **info})
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+@chat_bp.route('/admin/chat-cache/purge', methods=['POST'])
+@admin_required
+def admin_purge_chat_cache():
+    """Xoá cache câu trả lời chatbot (toàn bộ, hoặc một câu hỏi qua field 'query')"""
+    data = request.get_json(silent=True) or request.form
+    query = (data.get('query') or '').strip() or None
+    purged = response_cache.purge(query) if response_cache is not None else 0
+    semantic_cache = getattr(_get_chatbot(wait=False), 'semantic_cache', None)
+    if semantic_cache is not None and query is None:
+        semantic_cache.clear()
+    if request.is_json:
+        return jsonify({'ok': True, 'purged': purged})
+    flash(f'Đã xoá {purged} câu trả lời trong cache chatbot.', 'success')
+    return redirect(url_for('admin.admin_dashboard'))
@@ -1,58 +1,29 @@
 import json
-try:
-    import nltk
-    from nltk.tokenize import word_tokenize
-    from nltk.corpus import stopwords
-except ImportError:
-    import subprocess
-    subprocess.check_call(['pip', 'install', 'nltk'])
-    import nltk
-    from nltk.tokenize import word_tokenize
-    from nltk.corpus import stopwords
-
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
-except ImportError:
-    import subprocess
-    subprocess.check_call(['pip', 'install', 'scikit-learn'])
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
-
-try:
-    import numpy as np
-except ImportError:
-    import subprocess
-    subprocess.check_call(['pip', 'install', 'numpy'])
-    import numpy as np
+import numpy as np
 
 import os
 import logging
-import re
+
+from .nlp_resources import stopwords
+from .tfidf_store import TfidfIndex, default_cache_dir
+from .vi_tokenizer import ViTokenizer
 
 class ChatbotEngine:
     def __init__(self, knowledge_base_path):
-        # Initialize NLTK components
-        nltk.download('punkt')
-        nltk.download('stopwords')
-        
-        # Use both English and Vietnamese stopwords
-        self.stop_words = set(stopwords.words('english'))
-        # Add Vietnamese stop words
-        vn_stop_words = {'và', 'của', 'cho', 'trong', 'với', 'các', 'được', 'để', 'có',
-                        'những', 'một', 'là', 'này', 'từ', 'khi', 'đến', 'như', 'không',
-                        'về', 'tại', 'theo', 'đã', 'sẽ', 'vì', 'nhưng', 'còn', 'bị', 
-                        'do', 'phải', 'nếu', 'nên', 'được', 'đang', 'sau', 'rồi', 'thì'}
-        self.stop_words.update(vn_stop_words)
+        # English + Vietnamese stopwords từ bundle cục bộ (data/nlp_resources.json), không tải qua mạng
+        self.stop_words = set(stopwords(('en', 'vi')))
+        # Tách âm tiết + gộp từ ghép tiếng Việt ("học phí" -> "học_phí"), có LRU cache
+        self.tokenizer = ViTokenizer(stop_words=frozenset(self.stop_words))
         
         # Load knowledge base
         self.knowledge_base = self.load_knowledge_base(knowledge_base_path)
         
-        # Initialize TF-IDF vectorizer with Vietnamese support
-        self.vectorizer = TfidfVectorizer(
-            tokenizer=self.tokenize_text,
-            stop_words=list(self.stop_words),
-            lowercase=True,
+        # TF-IDF đã fit sẵn, lưu theo hash KB (data/.tfidf_cache/v1): không fit lại mỗi lần khởi động
+        self.index = TfidfIndex(
+            default_cache_dir(knowledge_base_path, 'v1'),
+            analyzer=self.tokenize_text,
+            signature={'engine': 'v1', 'stop_words': sorted(self.stop_words),
+                       **self.tokenizer.signature},
             max_features=5000
         )
         self.response_vectors = None
@@ -67,51 +38,39 @@ class ChatbotEngine:
             return {"intents": []}
 
     def tokenize_text(self, text):
-        # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-ZÀ-ỹ\s]', ' ', text)
-        # Tokenize
-        tokens = word_tokenize(text.lower())
-        # Remove stop words and single characters
-        tokens = [token for token in tokens if token not in self.stop_words and len(token) > 1]
-        return tokens
+        # Syllables (letters only), Vietnamese compounds, minus stop words and single characters
+        return self.tokenizer(text)
 
     def preprocess_text(self, text):
         tokens = self.tokenize_text(text)
         return ' '.join(tokens)
 
     def train_vectorizer(self):
-        # Prepare corpus from knowledge base
-        corpus = []
-        self.responses = []
-        
-        for intent in self.knowledge_base['intents']:
-            for pattern in intent['patterns']:
-                processed_pattern = self.preprocess_text(pattern)
-                corpus.append(processed_pattern)
-                self.responses.append(intent['responses'])
+        # Mở artifact nếu khớp KB, nối thêm hàng nếu KB chỉ thêm intent, còn lại fit lại
+        self.index.load_or_build(self.knowledge_base['intents'])
+        self._sync_responses()
 
-        # Fit vectorizer and transform corpus
-        if corpus:
-            self.response_vectors = self.vectorizer.fit_transform(corpus)
+    def _sync_responses(self):
+        intents = self.knowledge_base['intents']
+        self.responses = [intents[i]['responses'] for i in self.index.rows]
+        if self.index.n_rows:
+            self.response_vectors = self.index.tf
         else:
+            self.response_vectors = None
             logging.warning("No patterns found in knowledge base")
 
     def get_response(self, user_input, context=None):
         try:
-            # Preprocess user input
-            processed_input = self.preprocess_text(user_input)
-            
-            # Transform user input
-            input_vector = self.vectorizer.transform([processed_input])
-            
-            # Calculate similarities
-            similarities = cosine_similarity(input_vector, self.response_vectors)
+            # Calculate cosine similarities against every pattern (index tokenizes the input)
+            similarities = self.index.scores(user_input)
+            if similarities.size == 0:
+                return self.get_default_response()
             
             # Get most similar response
-            max_similarity_idx = np.argmax(similarities[0])
+            max_similarity_idx = np.argmax(similarities)
             
             # Check if similarity is too low
-            if similarities[0][max_similarity_idx] < 0.3:
+            if similarities[max_similarity_idx] < 0.3:
                 return self.get_default_response()
             
             # Get response options for the best match
@@ -135,7 +94,9 @@ class ChatbotEngine:
     def update_knowledge_base(self, new_intent):
         try:
             self.knowledge_base['intents'].append(new_intent)
-            self.train_vectorizer()
+            # Chỉ thêm hàng cho intent mới (df / idf cập nhật chính xác), không fit lại toàn bộ
+            self.index.append([new_intent], start=len(self.knowledge_base['intents']) - 1)
+            self._sync_responses()
             return True
         except Exception as e:
             logging.error(f"Error updating knowledge base: {e}")
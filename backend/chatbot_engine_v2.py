@@ -5,11 +5,13 @@ Hỗ trợ cả TF-IDF fallback và RAG-based responses
 import json
 import os
 import logging
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 
 try:
     from .rag_engine import RAGEngine
-    from .llm_provider import get_llm_provider, create_rag_prompt
+    from .llm_provider import get_llm_provider, create_rag_prompt, answer_max_tokens
+    from .semantic_cache import SemanticCache
+    from .llm_async import pooled
     RAG_AVAILABLE = True
 except ImportError as e:
     print(f"[Chatbot] RAG/LLM not available: {e}")
@@ -17,12 +19,10 @@ except ImportError as e:
 
 # Fallback imports for basic chatbot
 try:
-    import nltk
-    from nltk.tokenize import word_tokenize
-    from nltk.corpus import stopwords
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
     import numpy as np
+    from .nlp_resources import stopwords
+    from .tfidf_store import TfidfIndex, default_cache_dir
+    from .vi_tokenizer import ViTokenizer
     TFIDF_AVAILABLE = True
 except ImportError:
     TFIDF_AVAILABLE = False
@@ -47,7 +47,8 @@ class ChatbotEngine:
             try:
                 print("[Chatbot] Initializing RAG + LLM mode...")
                 self.rag_engine = RAGEngine(knowledge_base_path)
-                self.llm_provider = get_llm_provider()
+                self.llm_provider = get_llm_provider(wrap=pooled)
+                self.semantic_cache = self._init_semantic_cache()
                 print("[Chatbot] RAG + LLM mode ready")
             except Exception as e:
                 print(f"[Chatbot] RAG init failed, falling back to TF-IDF: {e}")
@@ -59,6 +60,23 @@ class ChatbotEngine:
             self._init_tfidf()
             print("[Chatbot] TF-IDF mode ready")
     
+    def _init_semantic_cache(self) -> Optional['SemanticCache']:
+        """
+        Cache câu trả lời theo độ tương đồng câu hỏi (bật/tắt bằng CHAT_SEMANTIC_CACHE).
+        Ngưỡng / TTL / số entry: CHAT_SEMANTIC_THRESHOLD, CHAT_SEMANTIC_TTL, CHAT_SEMANTIC_MAX
+        """
+        if os.getenv('CHAT_SEMANTIC_CACHE', 'true').lower() not in ('true', '1', 'yes'):
+            return None
+        model = getattr(self.rag_engine, 'model', None)
+        if model is None or getattr(self.rag_engine, 'index', None) is None:
+            return None
+        return SemanticCache(
+            dim=self.rag_engine.index.d,
+            threshold=float(os.getenv('CHAT_SEMANTIC_THRESHOLD', '0.92')),
+            ttl=float(os.getenv('CHAT_SEMANTIC_TTL', '3600')),
+            max_entries=int(os.getenv('CHAT_SEMANTIC_MAX', '2000'))
+        )
+    
     def load_knowledge_base(self, path: str) -> dict:
         """Load knowledge base JSON"""
         try:
@@ -80,39 +98,32 @@ class ChatbotEngine:
     
     def _init_tfidf(self):
         """Initialize TF-IDF vectorizer (fallback mode)"""
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
+        # Vietnamese stop words (bundle cục bộ data/nlp_resources.json)
+        self.stop_words = set(stopwords(('vi',)))
+        # Giữ số (năm, mã ngành) như trước, thêm gộp từ ghép tiếng Việt
+        self.tokenizer = ViTokenizer(stop_words=frozenset(self.stop_words), pattern=r'(?u)\w+', min_length=2)
         
-        # Vietnamese stop words
-        self.stop_words = {'và', 'của', 'cho', 'trong', 'với', 'các', 'được', 'để', 'có',
-                          'những', 'một', 'là', 'này', 'từ', 'khi', 'đến', 'như', 'không',
-                          'về', 'tại', 'theo', 'đã', 'sẽ', 'vì', 'nhưng', 'còn', 'bị', 
-                          'do', 'phải', 'nếu', 'nên', 'được', 'đang', 'sau', 'rồi', 'thì'}
-        
-        self.vectorizer = TfidfVectorizer(
-            stop_words=list(self.stop_words),
-            lowercase=True,
+        # TF-IDF đã fit sẵn, lưu theo hash KB (data/.tfidf_cache/v2); KB chỉ thêm intent thì nối thêm hàng
+        self.tfidf_index = TfidfIndex(
+            default_cache_dir(self.knowledge_base_path, 'v2'),
+            analyzer=self._tfidf_analyzer,
+            signature={'engine': 'v2', 'stop_words': sorted(self.stop_words), **self.tokenizer.signature},
             max_features=5000
         )
-        
-        # Build corpus
-        corpus = []
-        self.responses = []
-        
-        for intent in self.knowledge_base.get('intents', []):
-            for pattern in intent.get('patterns', []):
-                corpus.append(pattern)
-                self.responses.append(intent.get('responses', ['Xin lỗi, tôi chưa hiểu câu hỏi.']))
-        
-        if corpus:
-            try:
-                self.response_vectors = self.vectorizer.fit_transform(corpus)
-            except Exception as e:
-                print(f"[Chatbot] TF-IDF fitting error: {e}")
-                self.response_vectors = None
-        else:
+        intents = self.knowledge_base.get('intents', [])
+        try:
+            self.tfidf_index.load_or_build(intents)
+        except Exception as e:
+            print(f"[Chatbot] TF-IDF fitting error: {e}")
+        self.responses = [intents[i].get('responses', ['Xin lỗi, tôi chưa hiểu câu hỏi.'])
+                          for i in self.tfidf_index.rows]
+        self.response_vectors = self.tfidf_index.tf if self.tfidf_index.n_rows else None
+        if self.response_vectors is None:
             print("[Chatbot] Warning: No patterns found in knowledge base")
-            self.response_vectors = None
+
+    def _tfidf_analyzer(self, text: str):
+        # Như analyzer mặc định của TfidfVectorizer (lowercase, token >= 2 ký tự) + từ ghép, bỏ stopword
+        return self.tokenizer(text)
     
     def get_response(self, user_input: str, context: Optional[dict] = None) -> str:
         """
@@ -144,70 +155,179 @@ class ChatbotEngine:
         {
           'response': <str>,
           'sources': [ { 'index': i, 'score': float, 'meta': {...}, 'snippet': '...' }, ... ],
+                       # score: cosine similarity; thêm 'rrf_score' (điểm xếp hạng) khi bật hybrid
           'rag': bool,
-          'provider': <provider_class_name or None>
+          'provider': <provider_class_name or None>,
+          'ok': bool  # True: câu trả lời RAG / LLM thành công, được phép cache
         }
         """
-        result = {
+        try:
+            ctx = self._prepare_answer(user_input, top_k)
+            result = ctx['result']
+            if ctx['prompt'] is None:
+                return result
+            # Có LLM: gọi LLM với prompt đã dựng
+            answer = self.llm_provider.generate(ctx['prompt'], max_tokens=ctx['max_tokens'], temperature=0.7)
+            result['response'] = answer
+            result['ok'] = bool(answer) and not str(answer).startswith('[Error]')
+            self._store_semantic(ctx, result)
+            return result
+        except Exception as e:
+            logging.error(f"[Chatbot] get_response_with_sources error: {e}")
+            return {**self._empty_result(), 'response': "Xin lỗi, đã xảy ra lỗi nội bộ trong quá trình xử lý câu hỏi."}
+
+    def stream_response_with_sources(self, user_input: str, top_k: int = 3) -> Iterator[Tuple[str, dict]]:
+        """
+        Như get_response_with_sources nhưng trả về dần theo sự kiện:
+            ('sources', {'sources': [...], 'rag': bool, 'provider': str})  - ngay sau retrieve
+            ('token', {'text': str})                                        - từng đoạn câu trả lời
+            ('done', {'response': str, 'cached': str|None, 'ok': bool})     - khi xong
+        """
+        try:
+            ctx = self._prepare_answer(user_input, top_k)
+        except Exception as e:
+            logging.error(f"[Chatbot] stream_response_with_sources error: {e}")
+            ctx = {'result': {**self._empty_result(), 'response': "Xin lỗi, đã xảy ra lỗi nội bộ trong quá trình xử lý câu hỏi."},
+                   'prompt': None}
+        result = ctx['result']
+        yield 'sources', {'sources': result['sources'], 'rag': result['rag'], 'provider': result['provider']}
+        if ctx['prompt'] is None:
+            yield 'token', {'text': result['response']}
+            yield 'done', {'response': result['response'], 'cached': result.get('cached'), 'ok': result['ok']}
+            return
+        parts = []
+        ok = True
+        try:
+            for text in self.llm_provider.generate_stream(ctx['prompt'], max_tokens=ctx['max_tokens'], temperature=0.7):
+                if str(text).startswith('[Error]'):
+                    ok = False
+                parts.append(text)
+                yield 'token', {'text': text}
+        except Exception as e:
+            logging.error(f"[Chatbot] stream generation error: {e}")
+            ok = False
+            text = "Xin lỗi, đã xảy ra lỗi nội bộ trong quá trình xử lý câu hỏi."
+            parts.append(text)
+            yield 'token', {'text': text}
+        answer = ''.join(parts).strip()
+        result.update(response=answer, ok=ok and bool(answer))
+        self._store_semantic(ctx, result)
+        yield 'done', {'response': answer, 'cached': None, 'ok': result['ok']}
+
+    def _empty_result(self) -> dict:
+        return {
             'response': '',
             'sources': [],
             'rag': bool(getattr(self, 'use_rag', False)),
-            'provider': getattr(getattr(self, 'llm_provider', None), '__class__', type('X',(),{})).__name__
+            'provider': getattr(getattr(self, 'llm_provider', None), '__class__', type('X',(),{})).__name__,
+            'ok': False
         }
+
+    def _prepare_answer(self, user_input: str, top_k: int = 3) -> dict:
+        """
+        Phần chung của trả lời thường và stream: cache, retrieve, sources, prompt.
+        Trả về {'result': dict, 'prompt': str|None, ...}; prompt None nghĩa là
+        result['response'] đã là câu trả lời cuối (không cần gọi LLM).
+        """
+        result = self._empty_result()
+        ctx = {'result': result, 'prompt': None, 'cache': None, 'query_vec': None, 'cache_key': ''}
         if not user_input or not user_input.strip():
             result['response'] = "Xin lỗi, tôi không nhận được câu hỏi của bạn. Bạn cần hỗ trợ gì?"
-            return result
+            return ctx
         if not self.use_rag:
             # Non-RAG fallback
             result['response'] = self.get_response(user_input)
-            return result
-        try:
-            retrieved_docs = self.rag_engine.retrieve(user_input, top_k=top_k) if hasattr(self, 'rag_engine') else []
-            for i, (doc, meta, score) in enumerate(retrieved_docs, start=1):
-                snippet = ' '.join(str(doc).split())[:800]
-                result['sources'].append({
-                    'index': i,
-                    'score': float(score),
-                    'meta': meta,
-                    'snippet': snippet
-                })
-            # Nếu không có tài liệu
-            if not retrieved_docs:
-                result['response'] = "Xin lỗi, tôi chưa tìm được thông tin liên quan trong cơ sở tri thức."
-                return result
-            # Nếu không có LLM provider khả dụng -> tạo câu trả lời từ snippets
-            if not getattr(self, 'llm_provider', None) or not getattr(self.llm_provider, 'available', False):
-                combined = []
-                for s in result['sources']:
-                    meta_parts = []
-                    m = s['meta']
-                    if isinstance(m, dict):
-                        for k in ('type','ten_nganh','ma_nganh'):
-                            if k in m:
-                                meta_parts.append(str(m[k]))
-                    label = f"[Tài liệu {s['index']}{' | ' + ', '.join(meta_parts) if meta_parts else ''} | score={s['score']:.3f}]"
-                    combined.append(label + "\n" + s['snippet'])
-                result['response'] = (
-                    "(Chế độ snippet - LLM chưa cấu hình) Tổng hợp thông tin từ cơ sở tri thức:\n\n" +
-                    "\n\n".join(combined) +
-                    "\n\nĐể có câu trả lời tự nhiên hơn, hãy thêm OPENAI_API_KEY hoặc GOOGLE_API_KEY vào .env rồi khởi động lại."
-                )
-                return result
-            # Có LLM: tạo prompt và gọi LLM
-            prompt = create_rag_prompt(user_input, retrieved_docs)
-            answer = self.llm_provider.generate(prompt, max_tokens=500, temperature=0.7)
-            result['response'] = answer
-            return result
-        except Exception as e:
-            logging.error(f"[Chatbot] get_response_with_sources error: {e}")
-            result['response'] = "Xin lỗi, đã xảy ra lỗi nội bộ trong quá trình xử lý câu hỏi."
-            return result
+            return ctx
+        cache = getattr(self, 'semantic_cache', None)
+        query_vec, filters = None, None
+        if cache is not None:
+            query_vec = self.rag_engine.encode_query(user_input)
+            filters = self.rag_engine.infer_filters(user_input)
+            ctx.update(cache=cache, query_vec=query_vec,
+                       cache_key=json.dumps(filters, sort_keys=True) if filters else '')
+            hit = cache.lookup(query_vec, self.rag_engine.index_version, ctx['cache_key'])
+            if hit is not None:
+                result['response'] = hit['response']
+                result['sources'] = hit['sources']
+                result['cached'] = 'semantic'
+                result['ok'] = True
+                return ctx
+        retrieved_docs = self._retrieve(user_input, top_k=top_k, query_embedding=query_vec,
+                                        filters=filters) if hasattr(self, 'rag_engine') else []
+        for i, (doc, meta, score) in enumerate(retrieved_docs, start=1):
+            snippet = ' '.join(str(doc).split())[:800]
+            source = {
+                'index': i,
+                'score': float(score),
+                'meta': meta,
+                'snippet': snippet
+            }
+            if isinstance(meta, dict) and 'rrf_score' in meta:
+                # Hybrid: tách điểm RRF khỏi metadata (meta là bản sao do retrieve() tạo)
+                source['meta'] = {k: v for k, v in meta.items() if k != 'rrf_score'}
+                source['rrf_score'] = float(meta['rrf_score'])
+            result['sources'].append(source)
+        # Nếu không có tài liệu
+        if not retrieved_docs:
+            result['response'] = "Xin lỗi, tôi chưa tìm được thông tin liên quan trong cơ sở tri thức."
+            return ctx
+        # Nếu không có LLM provider khả dụng -> tạo câu trả lời từ snippets
+        if not getattr(self, 'llm_provider', None) or not getattr(self.llm_provider, 'available', False):
+            combined = []
+            for s in result['sources']:
+                meta_parts = []
+                m = s['meta']
+                if isinstance(m, dict):
+                    for k in ('type','ten_nganh','ma_nganh'):
+                        if k in m:
+                            meta_parts.append(str(m[k]))
+                label = f"[Tài liệu {s['index']}{' | ' + ', '.join(meta_parts) if meta_parts else ''} | score={s['score']:.3f}]"
+                combined.append(label + "\n" + s['snippet'])
+            result['response'] = (
+                "(Chế độ snippet - LLM chưa cấu hình) Tổng hợp thông tin từ cơ sở tri thức:\n\n" +
+                "\n\n".join(combined) +
+                "\n\nĐể có câu trả lời tự nhiên hơn, hãy thêm OPENAI_API_KEY hoặc GOOGLE_API_KEY vào .env rồi khởi động lại."
+            )
+            result['ok'] = True
+            return ctx
+        ctx['prompt'] = create_rag_prompt(user_input, retrieved_docs)
+        ctx['max_tokens'] = answer_max_tokens(user_input)
+        return ctx
+
+    def _store_semantic(self, ctx: dict, result: dict):
+        """Lưu câu trả lời LLM thành công (result['ok']) vào semantic cache"""
+        cache = ctx.get('cache')
+        if cache is not None and result.get('ok'):
+            cache.store(ctx['query_vec'], self.rag_engine.index_version, result['response'],
+                        result['sources'], ctx['cache_key'])
+    
+    def _retrieve(self, user_input: str, top_k: int = 3, query_embedding=None,
+                  filters: Optional[dict] = None) -> list:
+        """
+        Retrieve có lọc metadata: nếu câu hỏi nhắc năm / mã ngành có trong KB thì
+        chỉ tìm trong các chunk tương ứng, thiếu bao nhiêu bù bằng kết quả không lọc.
+        query_embedding / filters: truyền vào nếu đã tính sẵn (tránh encode lại)
+        """
+        if query_embedding is None:
+            query_embedding = self.rag_engine.encode_query(user_input)
+        if filters is None:
+            filters = self.rag_engine.infer_filters(user_input)
+        docs = self.rag_engine.retrieve(user_input, top_k=top_k, filters=filters,
+                                        query_embedding=query_embedding) if filters else []
+        if len(docs) < top_k:
+            seen = {doc for doc, _, _ in docs}
+            for item in self.rag_engine.retrieve(user_input, top_k=top_k, query_embedding=query_embedding):
+                if len(docs) >= top_k:
+                    break
+                if item[0] not in seen:
+                    docs.append(item)
+        return docs
     
     def _get_rag_response(self, user_input: str) -> str:
         """Generate response using RAG + LLM"""
         try:
             # Retrieve relevant documents
-            retrieved_docs = self.rag_engine.retrieve(user_input, top_k=3)
+            retrieved_docs = self._retrieve(user_input, top_k=3)
             
             if not retrieved_docs:
                 return "Xin lỗi, tôi chưa tìm được thông tin liên quan. Vui lòng liên hệ hotline 0981 33 66 28 hoặc email tuyensinh@ictu.edu.vn."
@@ -244,7 +364,7 @@ class ChatbotEngine:
             prompt = create_rag_prompt(user_input, retrieved_docs)
 
             # Generate response with LLM
-            response = self.llm_provider.generate(prompt, max_tokens=500, temperature=0.7)
+            response = self.llm_provider.generate(prompt, max_tokens=answer_max_tokens(user_input), temperature=0.7)
 
             return response
         except Exception as e:
@@ -254,11 +374,8 @@ class ChatbotEngine:
     def _get_tfidf_response(self, user_input: str) -> str:
         """Generate response using TF-IDF similarity (fallback)"""
         try:
-            # Vectorize input
-            input_vector = self.vectorizer.transform([user_input])
-            
-            # Calculate similarity
-            similarities = cosine_similarity(input_vector, self.response_vectors).flatten()
+            # Cosine similarity với từng pattern
+            similarities = self.tfidf_index.scores(user_input)
             
             # Get best match
             best_idx = np.argmax(similarities)
@@ -280,6 +397,9 @@ class ChatbotEngine:
         """Rebuild RAG index (khi knowledge base thay đổi)"""
         if self.use_rag and hasattr(self, 'rag_engine'):
             self.rag_engine.rebuild_index()
+            # index_version đổi nên cache cũng tự làm mới; xoá ngay để giải phóng bộ nhớ
+            if getattr(self, 'semantic_cache', None) is not None:
+                self.semantic_cache.clear()
             print("[Chatbot] RAG index rebuilt")
         elif TFIDF_AVAILABLE:
             self._init_tfidf()
@@ -0,0 +1,146 @@
+"""
+Khởi tạo chatbot lười (lazy) với trạng thái sẵn sàng.
+
+Import backend.app không còn nạp SBERT / FAISS / NLTK: chatbot chỉ được dựng
+khi có lượt chat đầu tiên, khi warm() chạy ở thread nền (request đầu tiên tới
+app), hoặc khi gunicorn master nạp trước để các worker fork dùng chung bộ nhớ.
+Script CLI (import_all_csv.py, ...) chỉ cần `app` nên không trả chi phí này.
+
+Trạng thái: cold -> warming -> ready | failed (failed -> warming sau retry_after giây)
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ChatbotLoader:
+    """
+    Args:
+        kb_path: Đường dẫn knowledge base
+        use_rag: True = RAG + LLM (fallback TF-IDF nếu lỗi), False = chỉ TF-IDF
+        retry_after: Số giây chờ sau một lần dựng lỗi trước khi thử dựng lại
+    """
+
+    def __init__(self, kb_path: str, use_rag: bool = True, retry_after: Optional[float] = None):
+        self.kb_path = kb_path
+        self.use_rag = use_rag
+        self.retry_after = float(os.getenv('CHATBOT_RETRY_AFTER', '60')) if retry_after is None else retry_after
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._instance = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def instance(self):
+        """Chatbot đã dựng xong, hoặc None (không chờ)"""
+        return self._instance
+
+    def _build(self):
+        if self.use_rag:
+            try:
+                from .chatbot_engine_v2 import ChatbotEngine as RAGChatbotEngine
+                bot = RAGChatbotEngine(self.kb_path, use_rag=True)
+                print(f"[chatbot] RAG mode active | KB={self.kb_path}")
+                return bot
+            except Exception as e:
+                print(f"[chatbot] RAG initialization failed, fallback TF-IDF: {e}")
+                self.error = str(e)
+        from .chatbot_engine import ChatbotEngine as FallbackChatbotEngine
+        bot = FallbackChatbotEngine(self.kb_path)
+        if self.use_rag:
+            print(f"[chatbot] Fallback TF-IDF active | KB={self.kb_path}")
+        else:
+            print(f"[chatbot] RAG disabled via USE_RAG_CHATBOT | KB={self.kb_path}")
+        return bot
+
+    def _retry_due(self) -> bool:
+        return (self.state == FAILED and self._failed_at is not None
+                and time.monotonic() - self._failed_at >= self.retry_after)
+
+    def _load(self, timeout: Optional[float] = None):
+        # Thread khác đang dựng quá `timeout` giây: trả về ngay, caller nhận None (-> 503 warming)
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            return
+        try:
+            if self._instance is not None or (self.state == FAILED and not self._retry_due()):
+                return
+            self.state = WARMING
+            start = time.perf_counter()
+            try:
+                self._instance = self._build()
+                self.state = READY
+            except Exception as e:
+                self.error = str(e)
+                self.state = FAILED
+                self._failed_at = time.monotonic()
+                print(f"[chatbot] initialization failed (retry in {self.retry_after:g}s): {e}")
+            finally:
+                self.load_seconds = round(time.perf_counter() - start, 2)
+                self._ready.set()
+        finally:
+            self._lock.release()
+
+    def warm(self):
+        """Dựng chatbot ở thread nền nếu chưa bắt đầu, hoặc thử lại khi lần trước lỗi đã đủ lâu (không chặn)"""
+        if not (self.state == COLD or self._retry_due()) or (self._thread is not None and self._thread.is_alive()):
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if not (self.state == COLD or self._retry_due()) or (self._thread is not None and self._thread.is_alive()):
+                return
+            self.state = WARMING
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._load, name='chatbot-warmup', daemon=True)
+            self._thread.start()
+        finally:
+            self._lock.release()
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Lấy chatbot, dựng ngay nếu chưa có. Nếu đang dựng ở thread khác thì chờ tối đa
+        `timeout` giây (None = chờ tới khi xong). Trả về None nếu hết thời gian hoặc lỗi.
+        """
+        if self._instance is not None:
+            return self._instance
+        if self._thread is None:
+            self._load(timeout)
+        else:
+            self.warm()  # thử lại nếu lần warm trước lỗi và đã qua retry_after
+            self._ready.wait(timeout)
+        return self._instance
+
+    def status(self) -> dict:
+        return {
+            'state': self.state,
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+        }
+
+    def after_fork(self):
+        """Thread warm-up không sống qua fork: worker nào fork khi master đang warm thì tự dựng lại"""
+        if self._instance is None and self._thread is not None:
+            self._lock = threading.Lock()
+            self._ready = threading.Event()
+            self._thread = None
+            self.state = COLD
+
+
+def warmup_mode() -> str:
+    """
+    CHATBOT_WARMUP:
+        background  warm ở thread nền khi app nhận request đầu tiên (mặc định)
+        eager       gunicorn master dựng sẵn trước khi fork worker (xem gunicorn.conf.py)
+        lazy        chỉ dựng khi có lượt chat đầu tiên
+    """
+    return os.getenv('CHATBOT_WARMUP', 'background').lower()
@@ -18,6 +18,9 @@ class Config:
     SQLALCHEMY_DATABASE_URI = database_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Đo số câu SQL / thời gian DB theo route (/admin/perf, header Server-Timing)
+    PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', 'False').lower() in ('true', '1', 'yes')
+
     # Mail Settings
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
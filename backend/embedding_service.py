@@ -0,0 +1,265 @@
+"""
+Embedding Service - một process giữ model embedding, phục vụ mọi worker
+Các câu query đến đồng thời được gom thành micro-batch (chờ vài ms) rồi encode
+một lần, thay vì mỗi worker encode batch-size-1 trên request thread.
+
+Chạy server:
+    python -m backend.embedding_service --port 8765
+    python -m backend.embedding_service --fake      # encoder giả lập (test/benchmark)
+Bật client mode trong RAGEngine:
+    RAG_EMBEDDING_URL=http://127.0.0.1:8765
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+
+class HashingEncoder:
+    """
+    Encoder giả lập, tất định, không cần tải model.
+    Dùng làm stand-in cho SentenceTransformer trong test và benchmark.
+    Args:
+        dim: Số chiều vector
+        call_overhead_ms: Độ trễ cố định mỗi lần gọi encode (mô phỏng forward pass)
+    """
+
+    def __init__(self, dim: int = 384, call_overhead_ms: float = 0.0):
+        self.dim = dim
+        self.call_overhead_ms = call_overhead_ms
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences, convert_to_numpy: bool = True, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if self.call_overhead_ms:
+            time.sleep(self.call_overhead_ms / 1000.0)
+        out = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, text in enumerate(sentences):
+            for token in str(text).lower().split():
+                h = int.from_bytes(hashlib.md5(token.encode('utf-8')).digest()[:8], 'little')
+                out[i, h % self.dim] += 1.0 if (h >> 63) == 0 else -1.0
+        return out
+
+
+class MicroBatcher:
+    """
+    Gom các yêu cầu encode đồng thời thành batch.
+    Batch được đẩy đi khi đủ max_batch câu hoặc đã chờ max_wait_ms kể từ câu đầu tiên.
+    """
+
+    def __init__(self, model, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stopped = threading.Event()
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        fut: Future = Future()
+        self._queue.put((list(texts), fut))
+        return fut
+
+    def encode(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(texts).result(timeout=timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            pending = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self._flush(pending)
+
+    def _flush(self, pending):
+        texts = [t for batch, _ in pending for t in batch]
+        try:
+            vectors = np.asarray(self.model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+        except Exception as e:
+            for _, fut in pending:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(texts)
+        self.max_seen_batch = max(self.max_seen_batch, len(texts))
+        pos = 0
+        for batch, fut in pending:
+            fut.set_result(vectors[pos:pos + len(batch)])
+            pos += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': round(self.items / self.batches, 2) if self.batches else 0,
+            'max_batch': self.max_seen_batch,
+            'queue_depth': self._queue.qsize(),
+        }
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join(timeout=1)
+
+
+class _EmbeddingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Header và body được ghi riêng; tắt Nagle để tránh trễ delayed-ACK ~40ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, extra_headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            body = json.dumps({'ok': True, **self.server.batcher.stats()}).encode('utf-8')
+            self._send(200, body, 'application/json')
+        else:
+            self._send(404, b'{}', 'application/json')
+
+    def do_POST(self):
+        if self.path != '/encode':
+            self._send(404, b'{}', 'application/json')
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            texts = payload.get('texts') or []
+            if isinstance(texts, str):
+                texts = [texts]
+            vectors = self.server.batcher.encode(texts, timeout=30)
+            # Trả về float32 nhị phân, tránh serialize JSON từng số
+            self._send(200, vectors.astype(np.float32).tobytes(), 'application/octet-stream',
+                       {'X-Embedding-Shape': f"{vectors.shape[0]},{vectors.shape[1] if vectors.ndim > 1 else 0}"})
+        except Exception as e:
+            self._send(500, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+
+
+class EmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, model, host: str = '127.0.0.1', port: int = 8765,
+                 max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        super().__init__((host, port), _EmbeddingHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self) -> threading.Thread:
+        """Chạy server trong thread nền (dùng cho test/benchmark)"""
+        t = threading.Thread(target=self.serve_forever, name='embedding-server', daemon=True)
+        t.start()
+        return t
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+
+
+class EmbeddingClient:
+    """
+    Client cho EmbeddingServer, cùng interface encode() với SentenceTransformer
+    để RAGEngine dùng thay model in-process.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        import requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self._requests = requests
+        self._local = threading.local()
+
+    def _session(self):
+        # Một session keep-alive cho mỗi thread
+        sess = getattr(self._local, 'session', None)
+        if sess is None:
+            sess = self._requests.Session()
+            self._local.session = sess
+        return sess
+
+    def encode(self, sentences, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        resp = self._session().post(f"{self.url}/encode", json={'texts': list(sentences)}, timeout=self.timeout)
+        resp.raise_for_status()
+        rows, dim = (int(x) for x in resp.headers['X-Embedding-Shape'].split(','))
+        return np.frombuffer(resp.content, dtype=np.float32).reshape(rows, dim).copy()
+
+    def health(self) -> dict:
+        resp = self._session().get(f"{self.url}/health", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local embedding service with micro-batching')
+    parser.add_argument('--model', default=os.getenv('RAG_EMBEDDING_MODEL', 'keepitreal/vietnamese-sbert'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('RAG_EMBEDDING_PORT', '8765')))
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--fake', action='store_true', help='Dùng HashingEncoder thay cho model thật')
+    args = parser.parse_args()
+
+    if args.fake:
+        model = HashingEncoder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        print(f"[Embedding] Loading model: {args.model}")
+        model = SentenceTransformer(args.model)
+
+    server = EmbeddingServer(model, args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"[Embedding] Serving on {server.url} (max_batch={args.max_batch}, max_wait_ms={args.max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Extension và helper dùng chung giữa các blueprint.
+Các extension được tạo không gắn app và được init trong create_app() (backend/app.py).
+"""
+import os
+from functools import wraps
+
+from flask import current_app, flash, redirect, url_for
+from flask_login import LoginManager, current_user
+from flask_mail import Mail, Message
+from itsdangerous import URLSafeTimedSerializer
+try:
+    from flask_limiter import Limiter
+    from flask_limiter.util import get_remote_address
+except Exception:  # Fallback if package not installed
+    Limiter = None
+    def get_remote_address():
+        return '0.0.0.0'
+
+from .models import db, User
+from .perf import PerfMonitor
+from .write_queue import WriteBehindQueue
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+mail = Mail()
+# Log hội thoại / ghi sau response theo batch ở thread nền thay vì commit trong request
+write_queue = WriteBehindQueue(db=db)
+# Số câu SQL / thời gian DB theo route; chỉ gắn hook khi PERF_INSTRUMENTATION bật
+perf = PerfMonitor(db=db)
+
+# Document upload constants
+# Allow common document types and plain text for testing/simple CV uploads
+ALLOWED_DOC_EXTENSIONS = {"pdf", "jpg", "jpeg", "png", "doc", "docx", "txt"}
+MAX_DOC_SIZE = 5 * 1024 * 1024  # 5MB
+
+def allowed_doc(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_DOC_EXTENSIONS
+
+def _testing() -> bool:
+    return bool(current_app.config.get('TESTING'))
+
+# Rate limiter (safe fallback if dependency missing). Giới hạn được bỏ qua khi TESTING
+if Limiter:
+    limiter = Limiter(get_remote_address, default_limits=["200/day", "50/hour"],
+                      default_limits_exempt_when=_testing)
+else:
+    class _LimiterFallback:
+        def init_app(self, app):
+            pass
+
+        def limit(self, *_args, **_kwargs):
+            def _decorator(f):
+                return f
+            return _decorator
+    limiter = _LimiterFallback()
+
+# Bọc decorator limit để bỏ qua khi TESTING
+def rate_limit(rule: str):
+    return limiter.limit(rule, exempt_when=_testing)
+
+def get_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
+
+def send_email(subject, recipients, html_body):
+    try:
+        msg = Message(subject, recipients=recipients)
+        default_sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+        if default_sender:
+            msg.sender = default_sender
+        msg.html = html_body
+        mail.send(msg)
+        return True
+    except Exception as e:
+        print(f"[mail] send failed: {e}")
+        return False
+
+def verify_recaptcha(token: str) -> bool:
+    secret = os.getenv('RECAPTCHA_SECRET_KEY')
+    if not secret:
+        # Not configured -> skip verification
+        return True
+    # requests (+ certifi) chỉ import khi thật sự xác thực reCAPTCHA
+    try:
+        import requests
+    except Exception:
+        requests = None
+    if not token or not requests:
+        return False
+    try:
+        r = requests.post('https://www.google.com/recaptcha/api/siteverify', data={
+            'secret': secret,
+            'response': token
+        }, timeout=5)
+        data = r.json()
+        return bool(data.get('success'))
+    except Exception as e:
+        print(f"[recaptcha] verify failed: {e}")
+        return False
+
+@login_manager.user_loader
+def load_user(user_id):
+    return User.query.get(int(user_id))
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            flash('Bạn không có quyền truy cập trang này!', 'danger')
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def verified_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        # Bỏ qua check khi chạy test
+        try:
+            if current_app and current_app.config.get('TESTING'):
+                return f(*args, **kwargs)
+        except Exception:
+            pass
+        if not current_user.is_authenticated:
+            return redirect(url_for('auth.login'))
+        # Admins bỏ qua xác thực email cho tác vụ quản trị
+        if getattr(current_user, 'role', '') == 'admin':
+            return f(*args, **kwargs)
+        if not getattr(current_user, 'email_verified', False):
+            flash('Vui lòng xác thực email để tiếp tục sử dụng chức năng này.', 'warning')
+            return redirect(url_for('main.view_profile'))
+        return f(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,373 @@
+"""
+Async LLM provider layer
+Các provider async dùng chung connection pool keep-alive (httpx.AsyncClient) và
+một asyncio.Semaphore cho mỗi provider để giới hạn số request đồng thời tới API.
+
+Flask là WSGI nên các request thread không tự chạy coroutine: mọi lời gọi LLM
+được đẩy sang MỘT event loop nền của process (AsyncBridge). Với gunicorn
+worker_class=gthread, mỗi thread chỉ chờ future; hàng trăm lượt chat đang chờ LLM
+cùng dùng chung vài kết nối HTTP thay vì mỗi lượt giữ một socket / worker.
+
+Bật bằng LLM_ASYNC=true. Giới hạn đồng thời mỗi provider: LLM_MAX_CONCURRENCY.
+"""
+import asyncio
+import json
+import os
+import queue
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+from .llm_provider import (GeminiProvider, HuggingFaceProvider, LLMProvider, OpenAICompatProvider,
+                           OpenAIProvider, SYSTEM_PROMPT)
+
+# Sentinel kết thúc stream khi chuyển token từ event loop sang thread đồng bộ
+_END = object()
+
+
+def _pool_limits():
+    import httpx
+    size = int(os.getenv('LLM_POOL_SIZE', '20'))
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=60)
+
+
+class AsyncLLMProvider:
+    """Base class cho provider async"""
+
+    name = 'async'
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.in_flight = 0
+        self.available = True
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Semaphore và HTTP client gắn với event loop tạo ra chúng: tạo lại khi
+        # loop đổi (ví dụ AsyncBridge mới trong worker sau fork)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._reset_clients()
+        return self._semaphore
+
+    def _reset_clients(self):
+        pass
+
+    async def agenerate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                return await self._generate(prompt, max_tokens, temperature)
+            finally:
+                self.in_flight -= 1
+
+    async def astream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> AsyncIterator[str]:
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                async for text in self._stream(prompt, max_tokens, temperature):
+                    yield text
+            finally:
+                self.in_flight -= 1
+
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        raise NotImplementedError
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        # Mặc định: không stream, trả cả câu trả lời một lần
+        yield await self._generate(prompt, max_tokens, temperature)
+
+    async def aclose(self):
+        pass
+
+
+class AsyncOpenAICompatProvider(AsyncLLMProvider):
+    """OpenAI / OpenAI-compatible (Groq, Together, OpenRouter, Ollama) qua openai.AsyncOpenAI"""
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str], model: str,
+                 max_concurrency: Optional[int] = None, label: str = 'OpenAI-Compat'):
+        super().__init__(max_concurrency)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.label = label
+        self.name = label
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=60)
+            )
+        return self._client
+
+    def _reset_clients(self):
+        self._client = None
+
+    def _messages(self, prompt: str):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model, messages=self._messages(prompt),
+                max_tokens=max_tokens, temperature=temperature
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            return f"[Error] {self.label} generation failed: {e}"
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model, messages=self._messages(prompt),
+                max_tokens=max_tokens, temperature=temperature, stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"[Error] {self.label} generation failed: {e}"
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class AsyncHuggingFaceProvider(AsyncLLMProvider):
+    """HuggingFace Inference API với httpx.AsyncClient dùng chung"""
+
+    name = 'HuggingFace'
+
+    def __init__(self, api_key: str, model: str, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.api_key = api_key
+        self.model = model
+        self._http = None
+
+    @property
+    def http(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(limits=_pool_limits(), timeout=30,
+                                           headers={"Authorization": f"Bearer {self.api_key}"})
+        return self._http
+
+    def _reset_clients(self):
+        self._http = None
+
+    @property
+    def url(self) -> str:
+        return f"https://api-inference.huggingface.co/models/{self.model}"
+
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        try:
+            resp = await self.http.post(self.url, json={
+                "inputs": prompt,
+                "parameters": {"max_new_tokens": max_tokens, "temperature": temperature},
+            })
+            resp.raise_for_status()
+            data = resp.json()
+            if isinstance(data, list) and data and 'generated_text' in data[0]:
+                return data[0]['generated_text'].strip()
+            if isinstance(data, dict) and 'generated_text' in data:
+                return data['generated_text'].strip()
+            return str(data)
+        except Exception as e:
+            return f"[Error] HuggingFace generation failed: {e}"
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        try:
+            async with self.http.stream('POST', self.url, json={
+                "inputs": prompt,
+                "parameters": {"max_new_tokens": max_tokens, "temperature": temperature},
+                "stream": True,
+            }) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    token = json.loads(line[5:]).get('token') or {}
+                    if token.get('text') and not token.get('special'):
+                        yield token['text']
+        except Exception as e:
+            yield f"[Error] HuggingFace generation failed: {e}"
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class AsyncGeminiProvider(AsyncLLMProvider):
+    """Gemini qua generate_content_async của google-generativeai"""
+
+    name = 'Gemini'
+
+    def __init__(self, model, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.model = model
+
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        try:
+            response = await self.model.generate_content_async(
+                f"{SYSTEM_PROMPT}\n\n{prompt}",
+                generation_config={'max_output_tokens': max_tokens, 'temperature': temperature}
+            )
+            return (response.text or "").strip() or "Xin vui lòng hỏi lại theo cách khác."
+        except Exception as e:
+            return f"[Error] Gemini generation failed: {e}"
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        try:
+            response = await self.model.generate_content_async(
+                f"{SYSTEM_PROMPT}\n\n{prompt}",
+                generation_config={'max_output_tokens': max_tokens, 'temperature': temperature},
+                stream=True
+            )
+            async for chunk in response:
+                if getattr(chunk, 'text', ''):
+                    yield chunk.text
+        except Exception as e:
+            yield f"[Error] Gemini generation failed: {e}"
+
+
+def from_sync_provider(provider: LLMProvider) -> Optional[AsyncLLMProvider]:
+    """Tạo provider async tương ứng với provider đồng bộ đã cấu hình (None nếu không hỗ trợ)"""
+    if not getattr(provider, 'available', False):
+        return None
+    if isinstance(provider, (OpenAICompatProvider, OpenAIProvider)):
+        client = provider.client
+        label = 'OpenAI' if isinstance(provider, OpenAIProvider) else 'OpenAI-Compat'
+        return AsyncOpenAICompatProvider(client.api_key, str(client.base_url), provider.model, label=label)
+    if isinstance(provider, HuggingFaceProvider):
+        return AsyncHuggingFaceProvider(provider.api_key, provider.model)
+    if isinstance(provider, GeminiProvider):
+        return AsyncGeminiProvider(provider.model)
+    return None
+
+
+class AsyncBridge:
+    """
+    Một event loop chạy trong thread nền cho cả process.
+    Tạo lại sau fork (thread của master không tồn tại trong worker).
+    """
+
+    _instance: Optional['AsyncBridge'] = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-async-loop', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> 'AsyncBridge':
+        with cls._lock:
+            if cls._instance is None or cls._instance.pid != os.getpid():
+                cls._instance = cls()
+            return cls._instance
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Chạy coroutine trên loop nền và chờ kết quả từ thread hiện tại"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        finally:
+            # Hết timeout (hoặc thread bị ngắt): huỷ coroutine để trả slot semaphore / kết nối HTTP
+            future.cancel()
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+        """Duyệt async generator từ thread đồng bộ (token được chuyển qua queue)"""
+        out: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    out.put(item)
+            except Exception as e:
+                out.put(e)
+            finally:
+                await agen.aclose()
+                out.put(_END)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item = out.get(timeout=timeout)
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Client ngắt giữa chừng / hết timeout: dừng pump() và đóng agen trên loop nền
+            future.cancel()
+
+
+class PooledProvider(LLMProvider):
+    """
+    Adapter đồng bộ (cùng interface LLMProvider) chạy provider async trên AsyncBridge.
+    ChatbotEngine dùng như mọi provider khác.
+    """
+
+    def __init__(self, async_provider: AsyncLLMProvider, timeout: Optional[float] = None):
+        self.async_provider = async_provider
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT', '60'))
+        self.available = async_provider.available
+
+    @property
+    def name(self) -> str:
+        return self.async_provider.name
+
+    def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
+        try:
+            return AsyncBridge.get().run(
+                self.async_provider.agenerate(prompt, max_tokens=max_tokens, temperature=temperature),
+                timeout=self.timeout
+            )
+        except Exception as e:
+            return f"[Error] {self.name} generation failed: {e}"
+
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        try:
+            yield from AsyncBridge.get().iterate(
+                self.async_provider.astream(prompt, max_tokens=max_tokens, temperature=temperature),
+                timeout=self.timeout
+            )
+        except Exception as e:
+            yield f"[Error] {self.name} generation failed: {e}"
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': self.async_provider.in_flight,
+            'max_concurrency': self.async_provider.max_concurrency,
+        }
+
+
+def pooled(provider: LLMProvider) -> LLMProvider:
+    """Bọc provider bằng bản async dùng connection pool nếu LLM_ASYNC bật và hỗ trợ được"""
+    if os.getenv('LLM_ASYNC', 'false').lower() not in ('true', '1', 'yes'):
+        return provider
+    try:
+        async_provider = from_sync_provider(provider)
+    except Exception as e:
+        print(f"[LLM] Async provider unavailable: {e}")
+        return provider
+    if async_provider is None:
+        return provider
+    print(f"[LLM] Async pooled mode (max_concurrency={async_provider.max_concurrency})")
+    return PooledProvider(async_provider)
@@ -1,8 +1,17 @@
 """
 LLM Wrapper - Hỗ trợ nhiều LLM providers: OpenAI, Google Gemini, HuggingFace
 """
+import json
 import os
-from typing import List, Dict, Optional
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import List, Dict, Iterator, Optional, Tuple
+
+SYSTEM_PROMPT = "Bạn là trợ lý tư vấn tuyển sinh thân thiện và chuyên nghiệp của Trường Đại học Công nghệ Thông tin và Truyền thông - ĐHTN (ICTU)."
 
 
 class LLMProvider:
@@ -11,6 +20,33 @@ class LLMProvider:
     def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
         raise NotImplementedError
 
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Sinh câu trả lời theo từng đoạn text ngay khi provider trả về.
+        Mặc định (provider không hỗ trợ stream): trả cả câu trả lời một lần.
+        """
+        yield self.generate(prompt, max_tokens=max_tokens, temperature=temperature)
+
+
+def _stream_chat_completion(client, model: str, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+    """Stream chat.completions của client OpenAI / OpenAI-compatible, trả về từng delta text"""
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
 
 class OpenAICompatProvider(LLMProvider):
     """Provider tương thích OpenAI API qua base_url tuỳ biến (Groq, Together, OpenRouter)."""
@@ -35,7 +71,7 @@ class OpenAICompatProvider(LLMProvider):
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "Bạn là trợ lý tư vấn tuyển sinh thân thiện và chuyên nghiệp của Trường Đại học Công nghệ Thông tin và Truyền thông - ĐHTN (ICTU)."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=max_tokens,
@@ -45,6 +81,15 @@ class OpenAICompatProvider(LLMProvider):
         except Exception as e:
             return f"[Error] OpenAI-Compat generation failed: {e}"
 
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield "[Error] OpenAI-Compat not available"
+            return
+        try:
+            yield from _stream_chat_completion(self.client, self.model, prompt, max_tokens, temperature)
+        except Exception as e:
+            yield f"[Error] OpenAI-Compat generation failed: {e}"
+
 
 class OpenAIProvider(LLMProvider):
     """OpenAI GPT provider"""
@@ -68,7 +113,7 @@ class OpenAIProvider(LLMProvider):
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "Bạn là trợ lý tư vấn tuyển sinh thân thiện và chuyên nghiệp của Trường Đại học Công nghệ Thông tin và Truyền thông - ĐHTN (ICTU)."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=max_tokens,
@@ -78,6 +123,15 @@ class OpenAIProvider(LLMProvider):
         except Exception as e:
             return f"[Error] OpenAI generation failed: {e}"
 
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield "[Error] OpenAI not available"
+            return
+        try:
+            yield from _stream_chat_completion(self.client, self.model, prompt, max_tokens, temperature)
+        except Exception as e:
+            yield f"[Error] OpenAI generation failed: {e}"
+
 
 class GeminiProvider(LLMProvider):
     """Google Gemini provider"""
@@ -154,11 +208,7 @@ class GeminiProvider(LLMProvider):
         if not self.available:
             return "[Error] Gemini not available"
 
-        system_prompt = (
-            "Bạn là trợ lý tư vấn tuyển sinh thân thiện và chuyên nghiệp của Trường "
-            "Đại học Công nghệ Thông tin và Truyền thông - ĐHTN (ICTU)."
-        )
-        full_prompt = f"{system_prompt}\n\n{prompt}"
+        full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
 
         def _call(model_obj):
             return model_obj.generate_content(
@@ -189,6 +239,26 @@ class GeminiProvider(LLMProvider):
                         continue
             return f"[Error] Gemini generation failed: {e}"
 
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield "[Error] Gemini not available"
+            return
+        try:
+            response = self.model.generate_content(
+                f"{SYSTEM_PROMPT}\n\n{prompt}",
+                generation_config={
+                    'max_output_tokens': max_tokens,
+                    'temperature': temperature,
+                },
+                stream=True
+            )
+            for chunk in response:
+                text = getattr(chunk, 'text', '')
+                if text:
+                    yield text
+        except Exception as e:
+            yield f"[Error] Gemini generation failed: {e}"
+
 
 class HuggingFaceProvider(LLMProvider):
     """HuggingFace Inference API provider (text-generation)"""
@@ -197,19 +267,27 @@ class HuggingFaceProvider(LLMProvider):
         self.api_key = api_key or os.getenv('HUGGINGFACE_API_KEY')
         self.model = model
         self.available = bool(self.api_key)
+        self._session = None
+
+    @property
+    def session(self):
+        """requests.Session dùng lại kết nối keep-alive giữa các lần gọi"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers['Authorization'] = f"Bearer {self.api_key}"
+        return self._session
 
     def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
         if not self.available:
             return "[Error] HuggingFace API key not available"
         try:
-            import requests
             url = f"https://api-inference.huggingface.co/models/{self.model}"
-            headers = {"Authorization": f"Bearer {self.api_key}"}
             payload = {
                 "inputs": prompt,
                 "parameters": {"max_new_tokens": max_tokens, "temperature": temperature},
             }
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
+            resp = self.session.post(url, json=payload, timeout=30)
             resp.raise_for_status()
             data = resp.json()
             # Trả về kết quả đầu tiên
@@ -222,6 +300,32 @@ class HuggingFaceProvider(LLMProvider):
         except Exception as e:
             return f"[Error] HuggingFace generation failed: {e}"
 
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield "[Error] HuggingFace API key not available"
+            return
+        try:
+            url = f"https://api-inference.huggingface.co/models/{self.model}"
+            payload = {
+                "inputs": prompt,
+                "parameters": {"max_new_tokens": max_tokens, "temperature": temperature},
+                "stream": True,
+            }
+            with self.session.post(url, json=payload, timeout=30, stream=True) as resp:
+                resp.raise_for_status()
+                # Text Generation Inference trả về SSE: "data:{"token": {"text": ...}}"
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    event = json.loads(line[5:])
+                    token = (event.get('token') or {})
+                    if token.get('special'):
+                        continue
+                    if token.get('text'):
+                        yield token['text']
+        except Exception as e:
+            yield f"[Error] HuggingFace generation failed: {e}"
+
 
 class FallbackProvider(LLMProvider):
     """Fallback provider khi không có LLM nào available"""
@@ -230,14 +334,203 @@ class FallbackProvider(LLMProvider):
         return "Xin lỗi, hiện tại hệ thống chatbot AI chưa được cấu hình. Vui lòng liên hệ hotline 0981 33 66 28 hoặc email tuyensinh@ictu.edu.vn để được hỗ trợ trực tiếp."
 
 
-def get_llm_provider(provider_name: Optional[str] = None) -> LLMProvider:
+class _ProviderStats:
+    """Latency / lỗi gần đây của một provider và circuit breaker tương ứng"""
+
+    def __init__(self, window: int, failure_threshold: int, cooldown: float):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """closed: luôn cho qua; half_open: cho đúng một request thử; open: chặn"""
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float):
+        with self.lock:
+            self.outcomes.append(ok)
+            self.trial_in_flight = False
+            if ok:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                self.opened_at = None
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold or self.opened_at is not None:
+                    # Mở lại (hoặc giữ mở) breaker, đếm lại thời gian chờ
+                    self.opened_at = time.monotonic()
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        return float(sorted(self.latencies)[int(0.95 * (len(self.latencies) - 1))])
+
+    def snapshot(self) -> dict:
+        calls = len(self.outcomes)
+        return {
+            'state': self.state,
+            'calls': calls,
+            'error_rate': round(1 - sum(self.outcomes) / calls, 3) if calls else 0.0,
+            'p95_ms': round(self.p95(1) * 1000, 1) if self.latencies else None,
+        }
+
+
+def _is_failure(answer) -> bool:
+    return not answer or str(answer).startswith('[Error]')
+
+
+class ProviderRouter(LLMProvider):
     """
-    Factory function để lấy LLM provider
-    Args:
-        provider_name: 'openai', 'gemini', 'groq', 'together', 'openrouter', hoặc None (auto-detect)
+    Giữ toàn bộ chuỗi provider theo thứ tự ưu tiên và chọn lúc chạy:
+    - Provider lỗi liên tiếp LLM_CB_FAILURES lần thì mở circuit breaker trong
+      LLM_CB_COOLDOWN giây (bỏ qua, chuyển sang provider kế tiếp), sau đó thử lại một request.
+    - Chuỗi "[Error] ..." trả về từ provider được tính là lỗi.
+    - LLM_HEDGE=true: nếu provider đầu chưa trả lời sau p95 latency của nó, gửi
+      song song tới provider kế tiếp và lấy câu trả lời đến trước.
     """
-    provider_name = provider_name or os.getenv('LLM_PROVIDER', 'auto').lower()
 
+    def __init__(self, providers: List[Tuple[str, LLMProvider]], hedge: Optional[bool] = None,
+                 failure_threshold: Optional[int] = None, cooldown: Optional[float] = None,
+                 window: int = 100, hedge_min_samples: int = 20):
+        self.providers = providers
+        self.hedge = os.getenv('LLM_HEDGE', 'false').lower() in ('true', '1', 'yes') if hedge is None else hedge
+        self.hedge_min_samples = hedge_min_samples
+        failure_threshold = failure_threshold or int(os.getenv('LLM_CB_FAILURES', '3'))
+        cooldown = cooldown if cooldown is not None else float(os.getenv('LLM_CB_COOLDOWN', '30'))
+        self.stats_by_name = {name: _ProviderStats(window, failure_threshold, cooldown) for name, _ in providers}
+        self.available = any(getattr(p, 'available', False) for _, p in providers)
+        self._executor = None
+        self._executor_pid = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Tạo lại sau fork: thread pool của master không tồn tại trong worker
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_HEDGE_WORKERS', '16')),
+                                                thread_name_prefix='llm-router')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _call(self, name: str, provider: LLMProvider, prompt: str, max_tokens: int,
+              temperature: float) -> Optional[str]:
+        """Gọi một provider và ghi nhận kết quả; None nếu breaker không cho gọi"""
+        if not self.stats_by_name[name].allow():
+            return None
+        start = time.perf_counter()
+        try:
+            answer = provider.generate(prompt, max_tokens=max_tokens, temperature=temperature)
+        except Exception as e:
+            answer = f"[Error] {name} generation failed: {e}"
+        self.stats_by_name[name].record(not _is_failure(answer), time.perf_counter() - start)
+        return answer
+
+    def _candidates(self) -> List[Tuple[str, LLMProvider]]:
+        # Chỉ lọc theo trạng thái; lượt thử half-open được giữ chỗ lúc gọi thật (_call)
+        return [(name, p) for name, p in self.providers if self.stats_by_name[name].state != 'open']
+
+    def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
+        candidates = self._candidates()
+        last_error = "[Error] All LLM providers unavailable"
+        i = 0
+        while i < len(candidates):
+            name, provider = candidates[i]
+            hedge_after = self.stats_by_name[name].p95(self.hedge_min_samples) if self.hedge else None
+            if hedge_after is None or i + 1 >= len(candidates):
+                answer = self._call(name, provider, prompt, max_tokens, temperature)
+                if answer is not None and not _is_failure(answer):
+                    return answer
+                last_error = answer or last_error
+                i += 1
+                continue
+
+            # Hedged request: chờ tới p95 của provider chính rồi gửi thêm provider kế tiếp
+            primary = self.executor.submit(self._call, name, provider, prompt, max_tokens, temperature)
+            done, _ = wait([primary], timeout=hedge_after)
+            if done:
+                answer = primary.result()
+                if answer is not None and not _is_failure(answer):
+                    return answer
+                last_error = answer or last_error
+                i += 1
+                continue
+            backup_name, backup = candidates[i + 1]
+            pending = {primary, self.executor.submit(self._call, backup_name, backup, prompt, max_tokens, temperature)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    answer = fut.result()
+                    if answer is not None and not _is_failure(answer):
+                        return answer
+                    last_error = answer or last_error
+            i += 2
+        return last_error
+
+    def generate_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Iterator[str]:
+        # Stream không hedge được; chỉ chuyển provider nếu lỗi trước khi có token nào
+        last_error = "[Error] All LLM providers unavailable"
+        for name, provider in self._candidates():
+            if not self.stats_by_name[name].allow():
+                continue
+            start = time.perf_counter()
+            try:
+                stream = iter(provider.generate_stream(prompt, max_tokens=max_tokens, temperature=temperature))
+                first = next(stream, '')
+            except Exception as e:
+                first = f"[Error] {name} generation failed: {e}"
+            if _is_failure(first):
+                self.stats_by_name[name].record(False, time.perf_counter() - start)
+                last_error = first or last_error
+                continue
+            # Luôn ghi nhận kết quả (kể cả client ngắt giữa chừng - GeneratorExit), nếu không
+            # lượt thử half-open giữ trial_in_flight mãi và provider bị chặn vĩnh viễn
+            ok = True
+            try:
+                yield first
+                for text in stream:
+                    if str(text).startswith('[Error]'):
+                        ok = False
+                    yield text
+            except Exception:
+                ok = False
+                raise
+            finally:
+                self.stats_by_name[name].record(ok, time.perf_counter() - start)
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    close()
+            return
+        yield last_error
+
+    @property
+    def name(self) -> str:
+        return ' > '.join(name for name, _ in self.providers)
+
+    def stats(self) -> dict:
+        return {name: self.stats_by_name[name].snapshot() for name, _ in self.providers}
+
+
+def _available_providers(provider_name: str) -> Iterator[Tuple[str, LLMProvider]]:
+    """Các provider đã cấu hình và khởi tạo được, theo thứ tự ưu tiên"""
     # 1. Thử Groq trước (miễn phí, nhanh nhất)
     if provider_name in ('groq', 'auto') and os.getenv('GROQ_API_KEY'):
         provider = OpenAICompatProvider(
@@ -246,8 +539,7 @@ def get_llm_provider(provider_name: Optional[str] = None) -> LLMProvider:
             model=os.getenv('GROQ_MODEL')
         )
         if provider.available:
-            print("[LLM] Using Groq provider (llama-3.3-70b-versatile)")
-            return provider
+            yield 'Groq', provider
 
     # 2. Thử Together AI (miễn phí $25 credit)
     if provider_name in ('together', 'auto') and os.getenv('TOGETHER_API_KEY'):
@@ -257,8 +549,7 @@ def get_llm_provider(provider_name: Optional[str] = None) -> LLMProvider:
             model=os.getenv('TOGETHER_MODEL')
         )
         if provider.available:
-            print("[LLM] Using Together AI provider")
-            return provider
+            yield 'Together', provider
 
     # 3. Thử OpenRouter (nhiều model miễn phí)
     if provider_name in ('openrouter', 'auto') and os.getenv('OPENROUTER_API_KEY'):
@@ -268,8 +559,7 @@ def get_llm_provider(provider_name: Optional[str] = None) -> LLMProvider:
             model=os.getenv('OPENROUTER_MODEL')
         )
         if provider.available:
-            print("[LLM] Using OpenRouter provider")
-            return provider
+            yield 'OpenRouter', provider
 
     # 4. Thử Ollama local (ưu tiên OLLAMA_* trước)
     if provider_name in ('ollama', 'auto'):
@@ -281,51 +571,220 @@ def get_llm_provider(provider_name: Optional[str] = None) -> LLMProvider:
                 model=os.getenv('OLLAMA_MODEL')
             )
             if provider.available:
-                print("[LLM] Using Ollama local provider")
-                return provider
+                yield 'Ollama', provider
 
     # 5. OpenAI (nếu có key)
     if provider_name == 'openai' or (provider_name == 'auto' and os.getenv('OPENAI_API_KEY')):
         provider = OpenAIProvider()
         if provider.available:
-            print("[LLM] Using OpenAI provider")
-            return provider
+            yield 'OpenAI', provider
 
     # 6. Gemini (nếu có key)
     if provider_name == 'gemini' or (provider_name == 'auto' and os.getenv('GOOGLE_API_KEY')):
         provider = GeminiProvider()
         if provider.available:
-            print("[LLM] Using Gemini provider")
-            return provider
+            yield 'Gemini', provider
 
     # 7. OpenAI-compatible generic (LLM_BASE_URL)
     if provider_name in ('openai-compat', 'compat') or (provider_name == 'auto' and os.getenv('LLM_BASE_URL')):
         provider = OpenAICompatProvider()
         if provider.available:
-            print("[LLM] Using OpenAI-Compatible provider")
-            return provider
+            yield 'OpenAI-Compat', provider
 
     # 8. HuggingFace (thường không hoạt động với free tier)
     if provider_name == 'hf' or (provider_name == 'auto' and os.getenv('HUGGINGFACE_API_KEY')):
         provider = HuggingFaceProvider()
         if provider.available:
-            print("[LLM] Using HuggingFace provider")
-            return provider
+            yield 'HuggingFace', provider
 
-    print("[LLM] No LLM provider available, using fallback")
-    return FallbackProvider()
 
 
-def create_rag_prompt(query: str, retrieved_docs: List[tuple]) -> str:
+def get_llm_provider(provider_name: Optional[str] = None, wrap=None) -> LLMProvider:
+    """
+    Factory function để lấy LLM provider
+    Args:
+        provider_name: 'openai', 'gemini', 'groq', 'together', 'openrouter', hoặc None (auto-detect)
+        wrap: Hàm bọc từng provider (ví dụ llm_async.pooled)
+    Khi có nhiều provider và LLM_ROUTER bật (mặc định), trả về ProviderRouter giữ
+    cả chuỗi để failover lúc chạy; nếu không, trả về provider đầu tiên dùng được.
+    """
+    provider_name = provider_name or os.getenv('LLM_PROVIDER', 'auto').lower()
+    use_router = os.getenv('LLM_ROUTER', 'true').lower() in ('true', '1', 'yes')
+
+    chain = []
+    for label, provider in _available_providers(provider_name):
+        chain.append((label, wrap(provider) if wrap else provider))
+        if not use_router:
+            break
+
+    if not chain:
+        print("[LLM] No LLM provider available, using fallback")
+        return FallbackProvider()
+    if len(chain) == 1:
+        print(f"[LLM] Using {chain[0][0]} provider")
+        return chain[0][1]
+    print(f"[LLM] Using provider router: {' > '.join(label for label, _ in chain)}")
+    return ProviderRouter(chain)
+
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_YEAR_RE = re.compile(r'\b20\d{2}\b')
+# Câu hỏi so sánh / theo nhiều năm: giữ mọi năm của cùng một ngành
+_TREND_WORDS = ('các năm', 'qua các năm', 'so sánh', 'xu hướng', 'thay đổi', 'tăng', 'giảm')
+# Câu hỏi tra cứu một giá trị: câu trả lời ngắn
+_FACT_WORDS = ('điểm chuẩn', 'học phí', 'mã ngành', 'địa chỉ', 'hotline', 'email', 'website',
+               'số điện thoại', 'chỉ tiêu', 'bao nhiêu', 'khi nào', 'ở đâu', 'hạn')
+# Câu hỏi cần liệt kê / tư vấn: câu trả lời dài hơn
+_LONG_WORDS = ('liệt kê', 'danh sách', 'các ngành', 'so sánh', 'tư vấn', 'giới thiệu', 'nên chọn',
+               'hướng dẫn', 'quy trình', 'thủ tục', 'khác nhau')
+
+
+def _has_phrase(text: str, phrases: Tuple[str, ...]) -> bool:
+    """Có cụm từ nào xuất hiện trọn âm tiết trong text ('hạn' không khớp 'hạnh', 'giới hạn' vẫn khớp)"""
+    padded = ' ' + ' '.join(_WORD_RE.findall(text.lower())) + ' '
+    return any(f' {phrase} ' in padded for phrase in phrases)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """Encoder cl100k_base, nạp ở lần đếm token đầu tiên (lần đầu trên máy mới tiktoken tải
+    file BPE qua mạng, không để chi phí đó rơi vào lúc import); None nếu không dùng được"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        print(f"[LLM] tiktoken unavailable, estimating tokens from UTF-8 length: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Số token của text (tiktoken nếu có, nếu không ước lượng theo số byte UTF-8)"""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Tiếng Việt có dấu: trung bình ~3 byte UTF-8 mỗi token với BPE kiểu cl100k
+    return max(1, (len(text.encode('utf-8')) + 2) // 3)
+
+
+def answer_max_tokens(query: str) -> int:
+    """max_tokens cho câu trả lời theo loại câu hỏi (giới hạn trên: RAG_MAX_TOKENS)"""
+    q = query or ''
+    cap = int(os.getenv('RAG_MAX_TOKENS', '500'))
+    if _has_phrase(q, _LONG_WORDS):
+        return cap
+    if _has_phrase(q, _FACT_WORDS):
+        return min(cap, 200)
+    return min(cap, 350)
+
+
+def _compress_doc(doc: str, meta: Dict) -> str:
+    """Bỏ phần không giúp trả lời: dòng giá trị N/A, danh sách mẫu câu hỏi của intent, khoảng trắng thừa"""
+    lines = []
+    for line in str(doc).splitlines():
+        line = ' '.join(line.split())
+        if not line or line.endswith(': N/A'):
+            continue
+        if meta.get('type') == 'intent' and line.startswith('Các cách hỏi:'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def _truncate_doc(doc: str, query: str, budget: int) -> str:
+    """
+    Cắt chunk về budget token: giữ dòng đầu (tiêu đề) rồi ưu tiên các dòng chứa
+    nhiều từ của câu hỏi, giữ nguyên thứ tự gốc.
+    """
+    if estimate_tokens(doc) <= budget:
+        return doc
+    lines = doc.split('\n')
+    if len(lines) <= 1:
+        # ~2 ký tự tiếng Việt mỗi token
+        return doc[:budget * 2] + '…'
+    terms = set(_WORD_RE.findall(query.lower()))
+    cost = [estimate_tokens(line) + 1 for line in lines]
+    overlap = [len(terms & set(_WORD_RE.findall(line.lower()))) for line in lines]
+    keep = {0}
+    used = cost[0]
+    for i in sorted(range(1, len(lines)), key=lambda i: (-overlap[i], i)):
+        if used + cost[i] <= budget:
+            keep.add(i)
+            used += cost[i]
+    out = [lines[i] for i in sorted(keep)]
+    if len(keep) < len(lines):
+        out.append('…')
+    return '\n'.join(out)
+
+
+def _dedup_docs(query: str, retrieved_docs: List[tuple]) -> List[tuple]:
+    """
+    Bỏ chunk trùng nội dung và chunk cùng ngành ở năm khác: giữ năm được hỏi,
+    nếu câu hỏi không nêu năm thì giữ năm mới nhất. Câu hỏi so sánh theo năm giữ tất cả.
+    """
+    q = (query or '').lower()
+    keep_years = _has_phrase(q, _TREND_WORDS)
+    asked_years = set(_YEAR_RE.findall(q))
+    best: Dict[str, tuple] = {}
+    for item in retrieved_docs:
+        meta = item[1] if isinstance(item[1], dict) else {}
+        code = meta.get('ma_nganh')
+        if code and meta.get('nam') and not keep_years:
+            year = str(meta['nam'])
+            current = best.get(code)
+            preferred = (year in asked_years, year)
+            if current is None or preferred > current[0]:
+                best[code] = (preferred, id(item))
+    seen_text = set()
+    out = []
+    for item in retrieved_docs:
+        doc, meta = item[0], item[1] if isinstance(item[1], dict) else {}
+        key = ' '.join(str(doc).split())
+        if key in seen_text:
+            continue
+        code = meta.get('ma_nganh')
+        if code in best and meta.get('nam') and best[code][1] != id(item):
+            continue
+        seen_text.add(key)
+        out.append(item)
+    return out
+
+
+def pack_context(query: str, retrieved_docs: List[tuple], budget: Optional[int] = None) -> List[tuple]:
+    """
+    Đóng gói context theo ngân sách token (RAG_PROMPT_BUDGET, mặc định 1200):
+    khử trùng lặp, nén từng chunk, rồi cắt theo thứ tự xếp hạng. Một chunk không
+    chiếm quá 60% ngân sách để các tài liệu sau vẫn có chỗ.
+    Trả về list (document_text, metadata, score) đã rút gọn.
+    """
+    budget = budget or int(os.getenv('RAG_PROMPT_BUDGET', '1200'))
+    packed = []
+    remaining = budget
+    for doc, meta, score in _dedup_docs(query, retrieved_docs):
+        if remaining < 40:
+            break
+        text = _compress_doc(doc, meta if isinstance(meta, dict) else {})
+        text = _truncate_doc(text, query, min(remaining, int(budget * 0.6)))
+        remaining -= estimate_tokens(text) + 4
+        packed.append((text, meta, score))
+    return packed
+
+
+def create_rag_prompt(query: str, retrieved_docs: List[tuple], budget: Optional[int] = None) -> str:
     """
     Tạo prompt cho LLM từ query và retrieved documents
     Args:
         query: Câu hỏi của user
         retrieved_docs: List of (document_text, metadata, score)
+        budget: Ngân sách token cho phần tài liệu (mặc định RAG_PROMPT_BUDGET)
     """
-    # Build context từ retrieved documents
+    # Build context từ retrieved documents (đã khử trùng lặp và cắt theo ngân sách token)
     context_parts = []
-    for i, (doc, meta, score) in enumerate(retrieved_docs, 1):
+    for i, (doc, meta, score) in enumerate(pack_context(query, retrieved_docs, budget), 1):
         context_parts.append(f"[Tài liệu {i}]\n{doc}\n")
     
     context = "\n".join(context_parts) if context_parts else "Không tìm thấy tài liệu liên quan."
@@ -0,0 +1,487 @@
+"""
+Blueprint trang công khai và trang người dùng: tin tức, ngành, tra cứu kết quả,
+hồ sơ cá nhân, nguyện vọng, thông báo, tài liệu.
+"""
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
+
+from .extensions import MAX_DOC_SIZE, allowed_doc, verified_required
+from .models import db, Department, Program, Applicant, Application, SiteSetting, News, Score
+
+main_bp = Blueprint('main', __name__)
+
+@main_bp.route('/')
+def index():
+    latest_news = []
+    try:
+        latest_news = News.query.order_by(News.created_at.desc()).limit(3).all()
+    except Exception:
+        latest_news = []
+    return render_template('index.html', news_list=latest_news)
+
+# Danh sách tin tức & sự kiện
+@main_bp.route('/news')
+def news_list():
+    news_list = News.query.order_by(News.created_at.desc()).all()
+    return render_template('news/list.html', news_list=news_list)
+
+# Chi tiết tin tức
+@main_bp.route('/news/<int:news_id>')
+def news_detail(news_id):
+    news = News.query.get_or_404(news_id)
+    return render_template('news/detail.html', news=news)
+# Tra cứu kết quả tuyển sinh theo CCCD hoặc Số điện thoại (chỉ cho user đã đăng nhập)
+@main_bp.route('/results', methods=['GET', 'POST'])
+@login_required
+def view_results():
+    wishes = None
+    result = None
+    error = None
+    if request.method == 'POST':
+        query = request.form.get('query', '').strip()
+        if not query:
+            error = 'Vui lòng nhập số CCCD, mã hồ sơ hoặc số điện thoại.'
+        else:
+            applicant = None
+            # Ưu tiên tìm theo CCCD trước, nếu không có thì thử theo phone
+            applicant = Applicant.query.filter_by(cccd=query).first()
+            if not applicant:
+                applicant = Applicant.query.filter_by(phone=query).first()
+            if not applicant:
+                error = 'Không tìm thấy hồ sơ với thông tin đã nhập.'
+            else:
+                # Lấy nguyện vọng và kết quả
+                app = Application.query.filter_by(applicant_id=applicant.id).order_by(Application.application_date.desc()).first()
+                if not app:
+                    error = 'Chưa có nguyện vọng nào cho hồ sơ này.'
+                else:
+                    program = Program.query.get(app.program_id)
+                    result = {
+                        'full_name': applicant.full_name,
+                        'program_name': program.name if program else '',
+                        'status': app.status,
+                        'submitted_at': app.application_date.strftime('%d/%m/%Y')
+                    }
+    # Nếu đã đăng nhập, hiển thị bảng nguyện vọng của user
+    if current_user.is_authenticated:
+        applicant = Applicant.query.filter_by(email=current_user.email).first()
+        if applicant:
+            wishes = Application.query.filter_by(applicant_id=applicant.id).all()
+    return render_template('results/view.html', wishes=wishes, result=result, error=error)
+
+@main_bp.route('/programs')
+def programs():
+    programs = Program.query.all()
+    return render_template('programs.html', programs=programs)
+
+@main_bp.route('/departments')
+def departments():
+    departments = Department.query.all()
+    return render_template('departments.html', departments=departments)
+
+@main_bp.route('/contact')
+def contact():
+    # Pull contact info from SiteSetting
+    def get_setting(key, default=''):
+        item = SiteSetting.query.filter_by(key=key).first()
+        return item.value if item and item.value is not None else default
+    contact_info = {
+        'address': get_setting('contact_address', '123 Đường ABC, Quận XYZ, TP. HCM'),
+        'email': get_setting('contact_email', 'tuyensinh@university.edu.vn'),
+        'hotline': get_setting('contact_hotline', '1900 xxxx'),
+    }
+    return render_template('contact.html', contact_info=contact_info)
+
+# Public info pages
+@main_bp.route('/guide')
+def guide():
+    return render_template('guide.html')
+
+@main_bp.route('/faq')
+def faq():
+    return render_template('faq.html')
+
+@main_bp.route('/scholarships')
+def scholarships():
+    return render_template('scholarships.html')
+
+@main_bp.route('/privacy')
+def privacy():
+    return render_template('privacy.html')
+
+# Terms of service
+@main_bp.route('/terms')
+def terms():
+    return render_template('terms.html')
+
+# Profile routes
+@main_bp.route('/profile')
+@login_required
+def view_profile():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    return render_template('profile/view.html', applicant=applicant)
+
+@main_bp.route('/profile/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if request.method == 'POST':
+        full_name = request.form.get('full_name')
+        phone = request.form.get('phone')
+        date_of_birth_str = request.form.get('date_of_birth')
+        address = request.form.get('address')
+        high_school = request.form.get('high_school')
+        
+        # Convert date string to date object
+        date_of_birth = None
+        if date_of_birth_str:
+            try:
+                date_of_birth = datetime.strptime(date_of_birth_str, '%Y-%m-%d').date()
+            except ValueError:
+                flash('Ngày sinh không hợp lệ!', 'danger')
+                return render_template('profile/edit.html', applicant=applicant)
+        
+        if not applicant:
+            applicant = Applicant(
+                full_name=full_name,
+                email=current_user.email,
+                phone=phone,
+                date_of_birth=date_of_birth,
+                address=address,
+                high_school=high_school
+            )
+            db.session.add(applicant)
+        else:
+            applicant.full_name = full_name
+            applicant.phone = phone
+            applicant.date_of_birth = date_of_birth
+            applicant.address = address
+            applicant.high_school = high_school
+        db.session.commit()
+        flash('Cập nhật hồ sơ thành công!', 'success')
+        return redirect(url_for('main.view_profile'))
+    return render_template('profile/edit.html', applicant=applicant)
+
+@main_bp.route('/profile/delete', methods=['POST'])
+@login_required
+def delete_profile():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if applicant:
+        db.session.delete(applicant)
+        db.session.commit()
+        flash('Đã xóa hồ sơ!', 'success')
+    return redirect(url_for('main.view_profile'))
+
+# Wishes routes
+@main_bp.route('/wishes')
+@login_required
+@verified_required
+def view_wishes():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if not applicant:
+        flash('Bạn cần tạo hồ sơ trước khi nộp nguyện vọng!', 'warning')
+        return redirect(url_for('main.edit_profile'))
+    wishes = Application.query.filter_by(applicant_id=applicant.id).all()
+    programs = Program.query.all()
+    return render_template('wishes/view.html', wishes=wishes, programs=programs)
+
+@main_bp.route('/wishes/add', methods=['GET', 'POST'])
+@login_required
+@verified_required
+def add_wish():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if not applicant:
+        flash('Bạn cần tạo hồ sơ trước khi nộp nguyện vọng!', 'warning')
+        return redirect(url_for('main.edit_profile'))
+    programs = Program.query.all()
+    if request.method == 'POST':
+        program_id = request.form.get('program_id')
+        admission_method = request.form.get('admission_method')
+        if not program_id:
+            flash('Vui lòng chọn ngành!', 'danger')
+            return render_template('wishes/add.html', programs=programs)
+        if not admission_method:
+            flash('Vui lòng chọn phương thức xét tuyển!', 'danger')
+            return render_template('wishes/add.html', programs=programs)
+        
+        # Tạo nguyện vọng
+        wish = Application(applicant_id=applicant.id, program_id=program_id, admission_method=admission_method)
+        db.session.add(wish)
+        db.session.flush()  # Get application ID
+        
+        # Lưu điểm tùy theo phương thức
+        if admission_method == 'Xét theo điểm thi tốt nghiệp THPT':
+            # Điểm 3 môn cơ bản
+            score_toan = request.form.get('score_toan')
+            score_van = request.form.get('score_van')
+            score_ngoaingu = request.form.get('score_ngoaingu')
+            # Điểm tổ hợp
+            score_mon1 = request.form.get('score_mon1')
+            score_mon2 = request.form.get('score_mon2')
+            score_mon3 = request.form.get('score_mon3')
+            score_tohop = request.form.get('score_tohop')
+            
+            if score_toan:
+                db.session.add(Score(application_id=wish.id, subject='Toán', score=float(score_toan), score_type='thi_thpt'))
+            if score_van:
+                db.session.add(Score(application_id=wish.id, subject='Văn', score=float(score_van), score_type='thi_thpt'))
+            if score_ngoaingu:
+                db.session.add(Score(application_id=wish.id, subject='Ngoại ngữ', score=float(score_ngoaingu), score_type='thi_thpt'))
+            if score_tohop and score_mon1 and score_mon2 and score_mon3:
+                db.session.add(Score(application_id=wish.id, subject=f'Tổ hợp {score_tohop} - Môn 1', score=float(score_mon1), score_type='thi_thpt'))
+                db.session.add(Score(application_id=wish.id, subject=f'Tổ hợp {score_tohop} - Môn 2', score=float(score_mon2), score_type='thi_thpt'))
+                db.session.add(Score(application_id=wish.id, subject=f'Tổ hợp {score_tohop} - Môn 3', score=float(score_mon3), score_type='thi_thpt'))
+        
+        elif admission_method == 'Xét học bạ THPT':
+            score_lop10 = request.form.get('score_lop10')
+            score_lop11 = request.form.get('score_lop11')
+            score_lop12 = request.form.get('score_lop12')
+            
+            if score_lop10:
+                db.session.add(Score(application_id=wish.id, subject='Điểm TB lớp 10', score=float(score_lop10), score_type='hoc_ba'))
+            if score_lop11:
+                db.session.add(Score(application_id=wish.id, subject='Điểm TB lớp 11', score=float(score_lop11), score_type='hoc_ba'))
+            if score_lop12:
+                db.session.add(Score(application_id=wish.id, subject='Điểm TB lớp 12', score=float(score_lop12), score_type='hoc_ba'))
+        
+        elif admission_method == 'Xét theo điểm ĐGNL / đánh giá năng lực':
+            score_dgnl = request.form.get('score_dgnl')
+            score_dgnl_type = request.form.get('score_dgnl_type', 'ĐHQG HCM')
+            
+            if score_dgnl:
+                db.session.add(Score(application_id=wish.id, subject=f'ĐGNL ({score_dgnl_type})', score=float(score_dgnl), score_type='dgnl'))
+        
+        elif admission_method == 'Xét tuyển thẳng / ưu tiên':
+            score_uutien_type = request.form.get('score_uutien_type')
+            score_uutien_desc = request.form.get('score_uutien_desc', '')
+            
+            if score_uutien_type:
+                # Lưu dạng text mô tả
+                db.session.add(Score(application_id=wish.id, subject=score_uutien_type, score=1.0, score_type='uutien'))
+        
+        db.session.commit()
+        flash('Nộp nguyện vọng thành công!', 'success')
+        return redirect(url_for('main.view_wishes'))
+    return render_template('wishes/add.html', programs=programs)
+
+@main_bp.route('/wishes/delete/<int:wish_id>', methods=['POST'])
+@login_required
+@verified_required
+def delete_wish(wish_id):
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    wish = Application.query.filter_by(id=wish_id, applicant_id=applicant.id).first()
+    if wish:
+        db.session.delete(wish)
+        db.session.commit()
+        flash('Đã xóa nguyện vọng!', 'success')
+    return redirect(url_for('main.view_wishes'))
+
+# (Removed duplicate /results route to avoid endpoint conflict)
+
+# Error handlers
+@main_bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@main_bp.app_errorhandler(500)
+def internal_error(error):
+    db.session.rollback()
+    return render_template('errors/500.html'), 500
+
+# ============================================================================
+# NOTIFICATION API ROUTES
+# ============================================================================
+
+@main_bp.route('/api/notifications')
+@login_required
+def get_notifications():
+    """Get all notifications for current user"""
+    from .models import Notification
+    
+    notifications = Notification.query.filter_by(user_id=current_user.id)\
+        .order_by(Notification.created_at.desc())\
+        .limit(50)\
+        .all()
+    
+    unread_count = Notification.query.filter_by(
+        user_id=current_user.id,
+        is_read=False
+    ).count()
+    
+    return jsonify({
+        'notifications': [{
+            'id': n.id,
+            'title': n.title,
+            'message': n.message,
+            'type': n.type,
+            'is_read': n.is_read,
+            'created_at': n.created_at.isoformat(),
+            'link': n.link
+        } for n in notifications],
+        'unread_count': unread_count
+    })
+
+@main_bp.route('/api/notifications/<int:notification_id>/read', methods=['POST'])
+@login_required
+def mark_notification_read(notification_id):
+    """Mark a notification as read"""
+    from .models import Notification
+    
+    notification = Notification.query.filter_by(
+        id=notification_id,
+        user_id=current_user.id
+    ).first()
+    
+    if notification:
+        notification.is_read = True
+        db.session.commit()
+        return jsonify({'ok': True})
+    
+    return jsonify({'ok': False, 'error': 'Notification not found'}), 404
+
+@main_bp.route('/api/notifications/mark-all-read', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    """Mark all notifications as read"""
+    from .models import Notification
+    
+    Notification.query.filter_by(
+        user_id=current_user.id,
+        is_read=False
+    ).update({'is_read': True})
+    db.session.commit()
+    
+    return jsonify({'ok': True})
+
+@main_bp.route('/notifications')
+@login_required
+def notifications_page():
+    """View all notifications page"""
+    from .models import Notification
+    
+    notifications = Notification.query.filter_by(user_id=current_user.id)\
+        .order_by(Notification.created_at.desc())\
+        .all()
+    
+    return render_template('notifications/view.html', notifications=notifications)
+
+def create_notification(user_id, title, message, notification_type='info', link=None):
+    """Helper function to create a notification
+    
+    Args:
+        user_id: ID of the user to notify
+        title: Notification title
+        message: Notification message
+        notification_type: Type (info, success, warning, error)
+        link: Optional link to related resource
+    """
+    from .models import Notification
+    
+    notif = Notification(
+        user_id=user_id,
+        title=title,
+        message=message,
+        type=notification_type,
+        link=link
+    )
+    db.session.add(notif)
+    db.session.commit()
+    return notif
+
+# ============================================================================
+# DOCUMENT MANAGEMENT ROUTES
+# ============================================================================
+
+@main_bp.route('/profile/documents', methods=['GET', 'POST'])
+@login_required
+@verified_required
+def manage_documents():
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if not applicant:
+        flash('Bạn cần tạo hồ sơ trước khi tải lên tài liệu!', 'warning')
+        return redirect(url_for('main.edit_profile'))
+    from .models import ApplicantDocument
+    if request.method == 'POST':
+        file = request.files.get('document')
+        if not file or file.filename == '':
+            flash('Vui lòng chọn tệp để tải lên.', 'danger')
+            return redirect(url_for('main.manage_documents'))
+        if not allowed_doc(file.filename):
+            flash('Định dạng tệp không hợp lệ.', 'danger')
+            return redirect(url_for('main.manage_documents'))
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(0)
+        if size > MAX_DOC_SIZE:
+            flash('Tệp vượt quá dung lượng cho phép (5MB).', 'danger')
+            return redirect(url_for('main.manage_documents'))
+        filename = secure_filename(file.filename)
+        upload_dir = os.path.join(current_app.root_path, '..', 'static', 'uploads')
+        os.makedirs(upload_dir, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        save_name = f"{applicant.id}_{timestamp}_{filename}"
+        file_path = os.path.join('uploads', save_name)
+        abs_path = os.path.join(current_app.root_path, '..', 'static', file_path)
+        file.save(abs_path)
+        doc = ApplicantDocument(
+            applicant_id=applicant.id,
+            filename=filename,
+            file_path=file_path.replace('\\', '/'),
+            file_type=file.mimetype,
+            file_size=size
+        )
+        db.session.add(doc)
+        db.session.commit()
+        flash('Tải lên tài liệu thành công!', 'success')
+        return redirect(url_for('main.manage_documents'))
+    documents = ApplicantDocument.query.filter_by(applicant_id=applicant.id).order_by(ApplicantDocument.uploaded_at.desc()).all()
+    return render_template('profile/documents.html', documents=documents)
+
+
+@main_bp.route('/profile/documents/delete/<int:doc_id>', methods=['POST'])
+@login_required
+@verified_required
+def delete_document(doc_id):
+    from .models import ApplicantDocument
+    doc = ApplicantDocument.query.get(doc_id)
+    applicant = Applicant.query.filter_by(email=current_user.email).first()
+    if doc and applicant and doc.applicant_id == applicant.id:
+        # Remove file from disk
+        abs_path = os.path.join(current_app.root_path, '..', 'static', doc.file_path)
+        try:
+            if os.path.exists(abs_path):
+                os.remove(abs_path)
+        except Exception as e:
+            print(f"[delete_document] file remove failed: {e}")
+        db.session.delete(doc)
+        db.session.commit()
+        flash('Đã xóa tài liệu.', 'success')
+    else:
+        flash('Không tìm thấy tài liệu.', 'danger')
+    return redirect(url_for('main.manage_documents'))
+
+# ============================================================================
+# END NOTIFICATION ROUTES
+# ============================================================================
+
+# ----------------------------------------------------------------------------
+# Deploy/version helper
+# ----------------------------------------------------------------------------
+@main_bp.route('/api/version')
+def api_version():
+    """Return app version string from VERSION file (if present)."""
+    try:
+        project_root = os.path.abspath(os.path.join(current_app.root_path, '..'))
+        version_file = os.path.join(project_root, 'VERSION')
+        if os.path.exists(version_file):
+            with open(version_file, 'r', encoding='utf-8') as f:
+                ver = f.read().strip()
+        else:
+            ver = 'dev'
+        return jsonify({'version': ver})
+    except Exception as e:
+        return jsonify({'version': 'dev', 'error': str(e)}), 200
@@ -45,6 +45,7 @@ class AdmissionScore(db.Model):
     notes = db.Column(db.Text)  # Ghi chú đặc biệt (VD: yêu cầu Toán >= 8.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    program = db.relationship('Program', lazy=True)  # dùng joinedload khi cần program_info
 
 class AdmissionMethod(db.Model):
     """Bảng lưu phương thức xét tuyển theo năm"""
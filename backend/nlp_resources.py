@@ -0,0 +1,56 @@
+"""
+Tài nguyên NLP đóng gói sẵn cho chatbot TF-IDF: stopword tiếng Việt / tiếng Anh,
+từ ghép tiếng Việt (cho vi_tokenizer) và cấu hình tokenizer, đọc từ data/nlp_resources.json (tạo bằng build_nlp_resources.py).
+Không tải gì qua mạng lúc khởi động worker: thay cho nltk.download('punkt' / 'stopwords').
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List
+
+RESOURCE_PATH = os.getenv('NLP_RESOURCES', os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'nlp_resources.json')))
+
+# Dùng khi thiếu bundle (chưa chạy build_nlp_resources.py)
+_FALLBACK = {
+    'version': 0,
+    'stopwords': {
+        'vi': ['và', 'của', 'cho', 'trong', 'với', 'các', 'được', 'để', 'có',
+               'những', 'một', 'là', 'này', 'từ', 'khi', 'đến', 'như', 'không',
+               'về', 'tại', 'theo', 'đã', 'sẽ', 'vì', 'nhưng', 'còn', 'bị',
+               'do', 'phải', 'nếu', 'nên', 'đang', 'sau', 'rồi', 'thì'],
+        'en': [],
+    },
+    'compounds': {'vi': []},
+    'tokenizer': {'pattern': r'[^\W\d_]+', 'min_length': 2},
+}
+
+
+@lru_cache(maxsize=None)
+def load_resources(path: str = RESOURCE_PATH) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[nlp] resource bundle unavailable ({e}); using built-in stopwords. "
+              f"Run: python build_nlp_resources.py")
+        return _FALLBACK
+
+
+@lru_cache(maxsize=None)
+def stopwords(langs: Iterable[str] = ('vi', 'en')) -> FrozenSet[str]:
+    """Tập stopword của các ngôn ngữ trong bundle"""
+    table = load_resources()['stopwords']
+    return frozenset(w for lang in langs for w in table.get(lang, []))
+
+
+@lru_cache(maxsize=None)
+def _token_re():
+    return re.compile(load_resources()['tokenizer']['pattern'])
+
+
+def tokenize(text: str, stop_words: FrozenSet[str] = frozenset()) -> List[str]:
+    """Tách từ bằng regex (chữ cái Unicode, bỏ số / dấu câu), bỏ stopword và token quá ngắn"""
+    min_length = load_resources()['tokenizer'].get('min_length', 1)
+    return [t for t in _token_re().findall(text.lower()) if len(t) >= min_length and t not in stop_words]
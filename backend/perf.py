@@ -0,0 +1,144 @@
+"""
+Đo số câu SQL và thời gian DB theo từng route (bật bằng PERF_INSTRUMENTATION=true).
+
+Gắn vào event before_cursor_execute / after_cursor_execute của engine SQLAlchemy và
+before_request / after_request của Flask:
+- mỗi response có header Server-Timing (db;dur=..;desc="N queries", app;dur=..), xem được
+  trong tab Network / Timing của DevTools;
+- số liệu cộng dồn theo endpoint (số request, số câu SQL trung bình / lớn nhất, thời gian DB)
+  và các câu chậm nhất, xem ở trang admin /admin/perf (số liệu riêng của từng worker).
+
+Câu SQL chạy ngoài request (thread write-behind, warmup) không được tính. Với response stream
+(NDJSON / SSE), chỉ câu SQL chạy trước khi trả header mới nằm trong Server-Timing.
+"""
+import heapq
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+SLOW_PER_ENDPOINT = int(os.getenv('PERF_SLOW_STATEMENTS', '5'))
+SQL_PREVIEW = 500
+
+
+class _EndpointStats:
+    __slots__ = ('requests', 'statements', 'max_statements', 'db_ms', 'total_ms', 'max_ms', 'slowest')
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.db_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slowest: List = []  # min-heap (ms, sql): giữ SLOW_PER_ENDPOINT câu chậm nhất
+
+
+class PerfMonitor:
+    """
+    Args:
+        app: Flask app (có thể gắn sau bằng init_app())
+        db: Flask-SQLAlchemy instance (engine để gắn event)
+    """
+
+    def __init__(self, app=None, db=None, slow_per_endpoint: int = SLOW_PER_ENDPOINT):
+        self.db = db
+        self.slow_per_endpoint = slow_per_endpoint
+        self.enabled = False
+        self.started_at = time.time()
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['perf'] = self
+        self.enabled = bool(app.config.get('PERF_INSTRUMENTATION'))
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            engine = self.db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor)
+        print("[perf] SQL / route instrumentation enabled (/admin/perf, Server-Timing)")
+
+    # ----- SQLAlchemy events -----
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._perf_start = time.perf_counter()
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_perf_start', None)
+        if start is None or not has_request_context():
+            return
+        current = g.get('_perf')
+        if current is None:
+            return
+        ms = (time.perf_counter() - start) * 1000
+        current['statements'] += 1
+        current['db_ms'] += ms
+        current['sql'].append((ms, statement))
+
+    # ----- Flask hooks -----
+    def _before_request(self):
+        g._perf = {'start': time.perf_counter(), 'statements': 0, 'db_ms': 0.0, 'sql': []}
+
+    def _after_request(self, response):
+        current = g.pop('_perf', None)
+        if current is None:
+            return response
+        total_ms = (time.perf_counter() - current['start']) * 1000
+        response.headers.add('Server-Timing', f'db;dur={current["db_ms"]:.2f};desc="{current["statements"]} queries"')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+        self.record(request.endpoint or 'unmatched', current['statements'], current['db_ms'], total_ms,
+                    current['sql'])
+        return response
+
+    # ----- số liệu -----
+    def record(self, endpoint: str, statements: int, db_ms: float, total_ms: float, sql=()):
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = _EndpointStats()
+            stats.requests += 1
+            stats.statements += statements
+            stats.max_statements = max(stats.max_statements, statements)
+            stats.db_ms += db_ms
+            stats.total_ms += total_ms
+            stats.max_ms = max(stats.max_ms, total_ms)
+            for ms, statement in sql:
+                item = (ms, ' '.join(statement.split())[:SQL_PREVIEW])
+                if len(stats.slowest) < self.slow_per_endpoint:
+                    heapq.heappush(stats.slowest, item)
+                elif ms > stats.slowest[0][0]:
+                    heapq.heapreplace(stats.slowest, item)
+
+    def snapshot(self, endpoint: Optional[str] = None) -> List[dict]:
+        """Số liệu theo endpoint, sắp theo tổng thời gian DB giảm dần"""
+        with self._lock:
+            items = [(name, s) for name, s in self._stats.items() if endpoint is None or name == endpoint]
+            rows = [{
+                'endpoint': name,
+                'requests': s.requests,
+                'statements': s.statements,
+                'avg_statements': round(s.statements / s.requests, 2),
+                'max_statements': s.max_statements,
+                'db_ms': round(s.db_ms, 2),
+                'avg_db_ms': round(s.db_ms / s.requests, 2),
+                'avg_ms': round(s.total_ms / s.requests, 2),
+                'max_ms': round(s.max_ms, 2),
+                'slowest': [{'ms': round(ms, 2), 'sql': sql} for ms, sql in sorted(s.slowest, reverse=True)],
+            } for name, s in items]
+        rows.sort(key=lambda r: r['db_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
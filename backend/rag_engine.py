@@ -2,133 +2,612 @@
 RAG Engine - Retrieval-Augmented Generation cho Chatbot ICTU
 Sử dụng sentence-transformers để tạo embeddings và FAISS để vector search
 """
+import hashlib
 import json
 import os
-import pickle
-from typing import List, Dict, Tuple
+import re
+from typing import List, Dict, Tuple, Optional
 import numpy as np
 
+from .bm25_index import BM25Index
+from .rag_store import (FILTER_FIELDS, MmapChunkStore, atomic_save_npy, chunk_store_exists,
+                        load_metadata_index, write_chunk_store, write_metadata_index)
+
 try:
-    from sentence_transformers import SentenceTransformer
     import faiss
-    HAS_RAG_DEPS = True
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SBERT = True
 except ImportError:
-    HAS_RAG_DEPS = False
+    HAS_SBERT = False
+
+HAS_RAG_DEPS = HAS_FAISS and HAS_SBERT
+if not HAS_RAG_DEPS:
     print("[RAG] Warning: sentence-transformers or faiss-cpu not installed. RAG will be disabled.")
     print("[RAG] Install with: pip install sentence-transformers faiss-cpu")
 
 
+# Tăng khi đổi định dạng file cache / cách chunk trong _extract_documents
+CACHE_FORMAT_VERSION = 1
+CHUNKER_VERSION = 1
+
+# Số ứng viên tối thiểu lấy từ mỗi phía (dense / BM25) trước khi fusion
+RRF_DEPTH = 20
+
+# Tập chunk sau khi lọc nhỏ hơn ngưỡng này thì chấm điểm chính xác trên đúng các
+# vector đó (reconstruct), thay vì để FAISS duyệt cả index với IDSelector
+FILTER_EXACT_MAX = int(os.getenv('RAG_FILTER_EXACT_MAX', '2048'))
+
+_YEAR_RE = re.compile(r'\b(20\d{2})\b')
+_PROGRAM_CODE_RE = re.compile(r'\b(7\d{6})\b')
+
+# Model embedding dùng chung trong process. Với gunicorn --preload, model được
+# nạp một lần ở master và các worker fork ra dùng chung trang nhớ (copy-on-write).
+_SHARED_MODELS: Dict[str, object] = {}
+
+
+def get_shared_model(model_name: str):
+    """Lấy (hoặc nạp lần đầu) SentenceTransformer dùng chung trong process"""
+    model = _SHARED_MODELS.get(model_name)
+    if model is None:
+        print(f"[RAG] Loading embedding model: {model_name}")
+        model = SentenceTransformer(model_name)
+        _SHARED_MODELS[model_name] = model
+    return model
+
+
+def after_fork():
+    """
+    Gọi trong worker sau khi fork (gunicorn post_fork).
+    Giới hạn số thread của torch để các worker không tranh CPU và tránh
+    treo thread-pool OpenMP kế thừa từ master.
+    """
+    try:
+        import torch
+        torch.set_num_threads(int(os.getenv('RAG_TORCH_THREADS', '1')))
+    except Exception:
+        pass
+
+
+def chunk_id(text: str) -> int:
+    """Id ổn định của chunk: 63 bit đầu của SHA-1 nội dung (int64 dương cho FAISS)"""
+    digest = hashlib.sha1(text.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little') & 0x7FFFFFFFFFFFFFFF
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Gộp nhiều danh sách xếp hạng: score = sum 1 / (k + rank)"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _env_flag(name: str, default: str = 'false') -> bool:
+    return os.getenv(name, default).lower() in ('true', '1', 'yes')
+
+
 class RAGEngine:
-    def __init__(self, knowledge_base_path: str, model_name: str = 'keepitreal/vietnamese-sbert'):
+    def __init__(self, knowledge_base_path: str, model_name: str = 'keepitreal/vietnamese-sbert',
+                 mmap_index: Optional[bool] = None, embedding_url: Optional[str] = None,
+                 encoder=None, index_factory: Optional[str] = None, hybrid: Optional[bool] = None):
         """
         Khởi tạo RAG engine
         Args:
             knowledge_base_path: Đường dẫn tới file JSON chứa kiến thức
             model_name: Tên model sentence-transformers (mặc định dùng Vietnamese SBERT)
+            mmap_index: Đọc FAISS index bằng memory-map (chế độ shared cho nhiều
+                worker). Mặc định lấy từ biến môi trường RAG_MMAP_INDEX. Chunk store
+                luôn được memory-map và chỉ giải mã các chunk được truy cập.
+            embedding_url: URL của embedding service (client mode). Mặc định lấy từ
+                RAG_EMBEDDING_URL; khi có, không nạp model trong process.
+            encoder: Object có encode() dùng thay model (ví dụ HashingEncoder khi test)
+            index_factory: Chuỗi faiss.index_factory, ví dụ 'Flat', 'HNSW32',
+                'IVF256,Flat', 'IVF256,PQ32'. Mặc định lấy từ RAG_INDEX_FACTORY ('Flat').
+            hybrid: Kết hợp BM25 + dense bằng reciprocal-rank fusion. Mặc định lấy từ
+                RAG_HYBRID ('true').
         """
         self.knowledge_base_path = knowledge_base_path
         self.model_name = model_name
-        self.model = None
+        self.mmap_index = _env_flag('RAG_MMAP_INDEX') if mmap_index is None else mmap_index
+        self.embedding_url = embedding_url if embedding_url is not None else os.getenv('RAG_EMBEDDING_URL')
+        self.index_factory = index_factory or os.getenv('RAG_INDEX_FACTORY', 'Flat')
+        # Loại index thực sự đã dựng (khác index_factory khi train lỗi và phải dùng Flat)
+        self.built_index_factory = self.index_factory
+        self.hybrid = _env_flag('RAG_HYBRID', 'true') if hybrid is None else hybrid
+        self.bm25: Optional[BM25Index] = None
+        self.model = encoder
         self.index = None
         self.documents = []
         self.metadata = []
+        self.ids = None
+        self.meta_index: Dict[str, Dict[str, np.ndarray]] = {}
+        self.manifest: Optional[Dict] = None
         
         # Cache paths
         self.cache_dir = os.path.join(os.path.dirname(knowledge_base_path), '.rag_cache')
         self.index_path = os.path.join(self.cache_dir, 'faiss.index')
-        self.docs_path = os.path.join(self.cache_dir, 'documents.pkl')
-        self.meta_path = os.path.join(self.cache_dir, 'metadata.pkl')
+        self.ids_path = os.path.join(self.cache_dir, 'chunk_ids.npy')
+        # Embedding cache theo hash nội dung chunk (tái dùng khi KB thay đổi)
+        self.emb_path = os.path.join(self.cache_dir, 'embeddings.npy')
+        self.emb_ids_path = os.path.join(self.cache_dir, 'embedding_ids.npy')
+        self.manifest_path = os.path.join(self.cache_dir, 'manifest.json')
         
-        if HAS_RAG_DEPS:
+        if HAS_FAISS and (HAS_SBERT or self.embedding_url or self.model is not None):
             self._init_rag()
     
     def _init_rag(self):
         """Khởi tạo model và index"""
         try:
-            # Load model
-            print(f"[RAG] Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
+            if self.model is not None:
+                pass
+            elif self.embedding_url:
+                # Client mode: encode qua embedding service dùng chung
+                from .embedding_service import EmbeddingClient
+                print(f"[RAG] Using embedding service: {self.embedding_url}")
+                self.model = EmbeddingClient(self.embedding_url)
+            else:
+                # Load model (dùng chung trong process)
+                self.model = get_shared_model(self.model_name)
             
-            # Load hoặc build index
-            if self._cache_exists():
+            # Load hoặc build index (theo manifest của cache)
+            status = self._validate_cache() if self._cache_exists() else 'missing'
+            if status in ('ok', 'kb_changed'):
                 print("[RAG] Loading cached index...")
                 try:
                     self._load_cache()
+                    if status == 'kb_changed':
+                        print("[RAG] Knowledge base changed since cache was built. Updating index...")
+                        if not self._update_index():
+                            self._build_index()
                 except Exception as e:
                     print(f"[RAG] Failed to load cache ({e}). Rebuilding index...")
                     self._build_index()
             else:
-                print("[RAG] Building new index from knowledge base...")
+                if status == 'missing':
+                    print("[RAG] Building new index from knowledge base...")
+                else:
+                    print(f"[RAG] Cache is stale ({status}). Rebuilding index...")
                 self._build_index()
             
             print(f"[RAG] Index ready with {len(self.documents)} documents")
         except Exception as e:
             print(f"[RAG] Error initializing RAG: {e}")
             # As a last resort, keep model if loaded; index may be None
-            if self.model is None:
+            if self.model is None and HAS_SBERT:
                 try:
-                    self.model = SentenceTransformer(self.model_name)
+                    self.model = get_shared_model(self.model_name)
                 except Exception:
                     pass
     
+    def _kb_fingerprint(self, with_hash: bool = True) -> Dict:
+        """Kích thước + mtime của file KB (O(1)) và SHA-1 nội dung (nếu cần)"""
+        st = os.stat(self.knowledge_base_path)
+        fp = {'kb_size': st.st_size, 'kb_mtime_ns': st.st_mtime_ns}
+        if with_hash:
+            with open(self.knowledge_base_path, 'rb') as f:
+                fp['kb_sha1'] = hashlib.sha1(f.read()).hexdigest()
+        return fp
+    
+    def _model_dimension(self) -> Optional[int]:
+        getter = getattr(self.model, 'get_sentence_embedding_dimension', None)
+        try:
+            return int(getter()) if getter else None
+        except Exception:
+            return None
+    
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_manifest(self, kb_fp: Dict):
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'chunker_version': CHUNKER_VERSION,
+            'model_name': self.model_name,
+            'index_factory': self.built_index_factory,
+            'dim': int(self.index.d) if self.index is not None else None,
+            'count': len(self.documents),
+            **kb_fp,
+        }
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+        self.manifest = manifest
+    
+    def _validate_cache(self) -> str:
+        """
+        So manifest với cấu hình hiện tại. Trả về:
+          'ok'          - cache dùng được ngay
+          'kb_changed'  - KB đổi nội dung: nạp cache rồi cập nhật tăng dần
+          'rechunk'     - đổi chunker/định dạng: chunk lại, embedding vẫn tái dùng theo hash
+          'model'       - đổi model/số chiều: phải encode lại toàn bộ
+          'index'       - đổi loại index: dựng lại từ embedding cache, không encode
+        Trường hợp thường gặp (KB không đổi) chỉ cần stat file, không đọc KB.
+        """
+        manifest = self._read_manifest()
+        if not manifest or manifest.get('format_version') != CACHE_FORMAT_VERSION:
+            return 'rechunk'
+        if manifest.get('model_name') != self.model_name:
+            return 'model'
+        dim = self._model_dimension()
+        if dim is not None and manifest.get('dim') not in (None, dim):
+            return 'model'
+        if manifest.get('chunker_version') != CHUNKER_VERSION:
+            return 'rechunk'
+        if manifest.get('index_factory', 'Flat') != self.index_factory:
+            return 'index'
+        self.manifest = manifest
+        fp = self._kb_fingerprint(with_hash=False)
+        if fp['kb_size'] == manifest.get('kb_size') and fp['kb_mtime_ns'] == manifest.get('kb_mtime_ns'):
+            return 'ok'
+        # mtime đổi (deploy/checkout) nhưng có thể nội dung không đổi
+        fp = self._kb_fingerprint()
+        if fp['kb_sha1'] == manifest.get('kb_sha1'):
+            try:
+                self._write_manifest(fp)
+            except OSError:
+                pass
+            return 'ok'
+        return 'kb_changed'
+    
+    @property
+    def index_version(self) -> Optional[str]:
+        """Định danh phiên bản index (đổi khi KB hoặc model đổi)"""
+        m = self.manifest or {}
+        if not m.get('kb_sha1'):
+            return None
+        return f"{m.get('model_name')}:{m.get('chunker_version')}:{m['kb_sha1'][:12]}"
+    
     def _cache_exists(self) -> bool:
         """Kiểm tra cache có tồn tại không"""
-        return (os.path.exists(self.index_path) and 
-                os.path.exists(self.docs_path) and 
-                os.path.exists(self.meta_path))
+        return (os.path.exists(self.index_path) and
+                os.path.exists(self.ids_path) and
+                chunk_store_exists(self.cache_dir))
     
     def _load_cache(self):
-        """Load index và documents từ cache"""
-        self.index = faiss.read_index(self.index_path)
-        with open(self.docs_path, 'rb') as f:
-            self.documents = pickle.load(f)
-        with open(self.meta_path, 'rb') as f:
-            self.metadata = pickle.load(f)
-    
-    def _save_cache(self):
-        """Lưu index và documents vào cache"""
+        """
+        Load index và chunk store từ cache.
+        Documents/metadata không được nạp hết vào RAM: chỉ map file và giải mã
+        từng chunk khi được truy cập (top-k lúc retrieve).
+        """
+        if self.mmap_index:
+            # Index chỉ đọc, map thẳng từ file: các worker chia sẻ page cache của OS.
+            # IO_FLAG_MMAP không map phần codes của IndexFlat / IndexIDMap2 (vẫn copy lên heap);
+            # IO_FLAG_MMAP_IFC map cả codes; bản faiss cũ không có cờ này thì dùng IO_FLAG_MMAP
+            mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+            flags = mmap_flag | getattr(faiss, 'IO_FLAG_READ_ONLY', 0)
+            self.index = faiss.read_index(self.index_path, flags)
+        else:
+            self.index = faiss.read_index(self.index_path)
+        store = MmapChunkStore(self.cache_dir)
+        self.documents = store.documents
+        self.metadata = store.metadata
+        self._set_ids(np.load(self.ids_path, mmap_mode='r'))
+        self.bm25 = BM25Index.load(self.cache_dir)
+        if self.bm25 is None or self.bm25.n_docs != len(self.documents):
+            # Cache cũ chưa có BM25: dựng từ chunk store
+            self.bm25 = BM25Index.build(self.documents)
+            try:
+                self.bm25.save(self.cache_dir)
+            except OSError:
+                pass
+        self.meta_index = load_metadata_index(self.cache_dir, len(self.metadata))
+        if self.meta_index is None:
+            # Cache cũ chưa có index metadata
+            try:
+                write_metadata_index(self.cache_dir, self.metadata)
+                self.meta_index = load_metadata_index(self.cache_dir, len(self.metadata))
+            except OSError:
+                pass
+        self.meta_index = self.meta_index or self._metadata_index_in_memory()
+    
+    def _save_cache(self) -> bool:
+        """Lưu index và chunk store vào cache. Trả về True nếu ghi thành công"""
         try:
             os.makedirs(self.cache_dir, exist_ok=True)
             print(f"[RAG] Saving to cache: {self.cache_dir}")
-            faiss.write_index(self.index, self.index_path)
-            with open(self.docs_path, 'wb') as f:
-                pickle.dump(self.documents, f)
-            with open(self.meta_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
+            # Ghi file tạm rồi os.replace: worker đang mmap index cũ vẫn đọc an toàn
+            faiss.write_index(self.index, self.index_path + '.tmp')
+            os.replace(self.index_path + '.tmp', self.index_path)
+            write_chunk_store(self.cache_dir, self.documents, self.metadata)
+            self.bm25 = BM25Index.build(self.documents)
+            self.bm25.save(self.cache_dir)
+            write_metadata_index(self.cache_dir, self.metadata)
+            atomic_save_npy(self.ids_path, np.asarray(self.ids, dtype=np.int64))
+            # Manifest ghi sau cùng: chỉ khi mọi file đã đầy đủ
+            self._write_manifest(self._kb_fingerprint())
+            # Định dạng pickle cũ không còn dùng
+            for legacy in ('documents.pkl', 'metadata.pkl'):
+                legacy_path = os.path.join(self.cache_dir, legacy)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
             print(f"[RAG] Cache saved successfully")
+            return True
         except Exception as e:
             print(f"[RAG] Warning: Could not save cache: {e}")
             print(f"[RAG] Index will work but won't be cached for next run")
+            return False
     
-    def _build_index(self):
-        """Xây dựng FAISS index từ knowledge base"""
-        # Load knowledge base
+    def _metadata_index_in_memory(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Index metadata dựng trong RAM (khi không ghi được cache)"""
+        index: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+        for row, meta in enumerate(self.metadata):
+            for field in FILTER_FIELDS:
+                if meta.get(field) is not None:
+                    index[field].setdefault(str(meta[field]), []).append(row)
+        return {field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for field, values in index.items()}
+    
+    def _filter_rows(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Các row thoả filters: AND giữa các trường, OR giữa các giá trị của một trường
+        (ví dụ {'nam': '2024', 'ma_nganh': ['7480201', '7480101']}).
+        Trả về None nếu không lọc.
+        """
+        if not filters:
+            return None
+        allowed = None
+        for field, values in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            postings = self.meta_index.get(field, {})
+            parts = [postings[str(v)] for v in values if str(v) in postings]
+            rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+            allowed = rows if allowed is None else np.intersect1d(allowed, rows, assume_unique=True)
+            if len(allowed) == 0:
+                break
+        return allowed
+    
+    def infer_filters(self, query: str) -> Dict[str, str]:
+        """
+        Đoán filter từ câu hỏi: năm tuyển sinh và mã ngành được nhắc tới,
+        chỉ giữ các giá trị có trong knowledge base.
+        """
+        filters = {}
+        for field, pattern in (('nam', _YEAR_RE), ('ma_nganh', _PROGRAM_CODE_RE)):
+            known = self.meta_index.get(field, {})
+            found = [v for v in dict.fromkeys(pattern.findall(query)) if v in known]
+            if found:
+                filters[field] = found[0] if len(found) == 1 else found
+        return filters
+    
+    def _set_ids(self, ids):
+        """Gán chunk ids (song song với documents, đã sắp xếp tăng dần)"""
+        self.ids = ids
+    
+    def _row_for_id(self, cid: int) -> Optional[int]:
+        """Vị trí của chunk trong store: tìm nhị phân trên mảng ids đã sắp xếp (mmap)"""
+        ids = self.ids
+        if ids is None or len(ids) == 0:
+            return None
+        row = int(np.searchsorted(ids, cid))
+        if row < len(ids) and int(ids[row]) == cid:
+            return row
+        return None
+    
+    def _load_knowledge_chunks(self) -> Tuple[List[str], List[Dict], np.ndarray]:
+        """
+        Đọc KB, chunk và gán id theo nội dung; chunk trùng nội dung chỉ giữ một bản.
+        Kết quả sắp xếp theo id để tra id -> vị trí bằng tìm nhị phân.
+        """
         with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
             knowledge = json.load(f)
+        documents, metadata = self._extract_documents(knowledge)
+        docs, metas, ids, seen = [], [], [], set()
+        for doc, meta in zip(documents, metadata):
+            cid = chunk_id(doc)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            docs.append(doc)
+            metas.append(meta)
+            ids.append(cid)
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        return ([docs[i] for i in order], [metas[i] for i in order],
+                np.asarray([ids[i] for i in order], dtype=np.int64))
+    
+    def _load_embedding_cache(self) -> Dict[int, np.ndarray]:
+        """Embedding đã tính, tra theo chunk id (hash nội dung)"""
+        if not (os.path.exists(self.emb_path) and os.path.exists(self.emb_ids_path)):
+            return {}
+        manifest = self._read_manifest()
+        if manifest and manifest.get('model_name') != self.model_name:
+            # Vector của model khác không dùng lại được
+            return {}
+        try:
+            vectors = np.load(self.emb_path)
+            ids = np.load(self.emb_ids_path)
+            if len(vectors) != len(ids):
+                return {}
+            return {int(cid): vectors[i] for i, cid in enumerate(ids)}
+        except Exception as e:
+            print(f"[RAG] Ignoring unreadable embedding cache: {e}")
+            return {}
+    
+    def _save_embedding_cache(self, cache: Dict[int, np.ndarray], keep_ids: np.ndarray):
+        """Lưu embedding của các chunk hiện tại (bỏ chunk đã xoá để cache không phình)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            keep = [int(cid) for cid in keep_ids if int(cid) in cache]
+            vectors = np.stack([cache[cid] for cid in keep]) if keep else np.zeros((0, 0), dtype=np.float32)
+            atomic_save_npy(self.emb_path, vectors.astype(np.float32))
+            atomic_save_npy(self.emb_ids_path, np.asarray(keep, dtype=np.int64))
+        except Exception as e:
+            print(f"[RAG] Warning: Could not save embedding cache: {e}")
+    
+    def _embed_missing(self, documents: List[str], ids: np.ndarray,
+                       cache: Dict[int, np.ndarray]) -> int:
+        """Encode các chunk chưa có trong cache, ghi vào cache. Trả về số chunk đã encode"""
+        missing = [i for i, cid in enumerate(ids) if int(cid) not in cache]
+        if not missing:
+            return 0
+        print(f"[RAG] Creating embeddings for {len(missing)}/{len(documents)} documents...")
+        embeddings = self.model.encode([documents[i] for i in missing], show_progress_bar=len(missing) > 32,
+                                       convert_to_numpy=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        # Normalize vectors for cosine similarity
+        faiss.normalize_L2(embeddings)
+        for row, i in enumerate(missing):
+            cache[int(ids[i])] = embeddings[row]
+        return len(missing)
+    
+    def _build_index(self):
+        """Xây dựng FAISS index từ knowledge base (tái dùng embedding đã cache)"""
+        documents, metadata, ids = self._load_knowledge_chunks()
         
-        # Extract và chunk documents
-        self.documents, self.metadata = self._extract_documents(knowledge)
-        
-        if not self.documents:
+        if not documents:
             print("[RAG] Warning: No documents found in knowledge base")
+            self.documents, self.metadata = documents, metadata
+            self._set_ids(ids)
             return
         
-        # Tạo embeddings
-        print(f"[RAG] Creating embeddings for {len(self.documents)} documents...")
-        embeddings = self.model.encode(self.documents, show_progress_bar=True, convert_to_numpy=True)
+        cache = self._load_embedding_cache()
+        self._embed_missing(documents, ids, cache)
+        embeddings = np.stack([cache[int(cid)] for cid in ids])
         
-        # Build FAISS index
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product (cosine similarity)
+        # Build FAISS index: IDMap để add/remove theo chunk id
+        self.index = self._create_index(embeddings)
+        self.index.add_with_ids(embeddings, ids)
         
-        # Normalize vectors for cosine similarity
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
+        self.documents, self.metadata = documents, metadata
+        self._set_ids(ids)
         
         # Save cache
-        self._save_cache()
+        saved = self._save_cache()
+        self._save_embedding_cache(cache, ids)
+        if saved:
+            # Đọc lại từ chunk store để bỏ list documents trong heap của process này
+            self._load_cache()
+        else:
+            self.meta_index = self._metadata_index_in_memory()
         print("[RAG] Index built and cached successfully")
     
+    def _create_index(self, embeddings: np.ndarray):
+        """
+        Tạo index theo index_factory (metric inner product = cosine trên vector đã chuẩn hoá),
+        tự train nếu cần. Nếu dữ liệu quá ít để train (IVF/PQ), dùng Flat; manifest ghi 'Flat'
+        nên lần khởi động sau _validate_cache trả về 'index' và thử dựng lại index đã cấu hình.
+        """
+        dimension = embeddings.shape[1]
+        factory = self.index_factory.strip() or 'Flat'
+        try:
+            inner = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+            if not inner.is_trained:
+                print(f"[RAG] Training index '{factory}' on {len(embeddings)} vectors...")
+                inner.train(embeddings)
+        except RuntimeError as e:
+            print(f"[RAG] Cannot build index '{factory}' ({str(e).splitlines()[0]}). "
+                  f"Falling back to Flat; will retry '{factory}' on next start.")
+            inner = faiss.IndexFlatIP(dimension)
+            factory = 'Flat'
+        self.built_index_factory = factory
+        return faiss.IndexIDMap2(inner)
+    
+    def _search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None, sel=None):
+        """
+        Tham số search theo loại index (nprobe cho IVF, efSearch cho HNSW).
+        sel: faiss.IDSelector giới hạn các chunk id được xét (lọc metadata)
+        """
+        inner = faiss.downcast_index(self.index.index) if hasattr(self.index, 'id_map') else self.index
+        nprobe = nprobe or int(os.getenv('RAG_NPROBE', '0') or 0)
+        ef_search = ef_search or int(os.getenv('RAG_EF_SEARCH', '0') or 0)
+        if nprobe and faiss.try_extract_index_ivf(inner) is not None:
+            return faiss.SearchParametersIVF(nprobe=nprobe, sel=sel)
+        if ef_search and isinstance(inner, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(efSearch=ef_search, sel=sel)
+        if sel is not None:
+            return faiss.SearchParameters(sel=sel)
+        return None
+    
+    def _dense_search(self, query_embedding: np.ndarray, depth: int, allowed: Optional[np.ndarray],
+                      nprobe: Optional[int], ef_search: Optional[int]) -> List[Tuple[int, float]]:
+        """Dense search, trả về [(row, score)] giảm dần; chỉ xét các row trong allowed nếu có"""
+        if allowed is not None and len(allowed) <= FILTER_EXACT_MAX:
+            # Tập nhỏ: chấm điểm chính xác đúng các vector được phép
+            try:
+                vectors = self.index.reconstruct_batch(np.ascontiguousarray(self.ids[allowed], dtype=np.int64))
+                scores = vectors @ query_embedding[0]
+                order = np.argsort(-scores, kind='stable')[:depth]
+                return [(int(allowed[i]), float(scores[i])) for i in order]
+            except RuntimeError:
+                pass  # Index không reconstruct được (IVF): dùng IDSelector
+        sel = None
+        if allowed is not None:
+            sel = faiss.IDSelectorBatch(np.ascontiguousarray(self.ids[allowed], dtype=np.int64))
+        scores, labels = self.index.search(query_embedding, depth,
+                                           params=self._search_params(nprobe, ef_search, sel))
+        # label là chunk id -> vị trí trong chunk store
+        dense = []
+        for score, label in zip(scores[0], labels[0]):
+            row = self._row_for_id(int(label))
+            if row is not None:  # Valid id
+                dense.append((row, float(score)))
+        return dense
+    
+    def _cosine_scores(self, query_embedding: np.ndarray, rows: List[int]) -> Dict[int, float]:
+        """Cosine giữa query và các row cho trước ({} nếu index không reconstruct được, vd IVF)"""
+        try:
+            vectors = self.index.reconstruct_batch(np.ascontiguousarray(self.ids[rows], dtype=np.int64))
+        except RuntimeError:
+            return {}
+        return {row: float(score) for row, score in zip(rows, vectors @ query_embedding[0])}
+    
+    def _update_index(self) -> bool:
+        """
+        Cập nhật index theo diff của knowledge base:
+        chỉ encode chunk mới/đổi nội dung, xoá chunk đã bị bỏ.
+        Trả về False nếu index hiện tại không hỗ trợ cập nhật tăng dần.
+        """
+        if self.index is None or not hasattr(self.index, 'id_map') or self.ids is None:
+            return False
+        if self.mmap_index:
+            # Bản mmap là chỉ đọc: nạp một bản ghi được để sửa
+            self.index = faiss.read_index(self.index_path)
+        
+        documents, metadata, ids = self._load_knowledge_chunks()
+        old_ids = set(int(cid) for cid in self.ids)
+        new_ids = set(int(cid) for cid in ids)
+        removed = old_ids - new_ids
+        added = [i for i, cid in enumerate(ids) if int(cid) not in old_ids]
+        
+        if removed:
+            try:
+                self.index.remove_ids(np.fromiter(removed, dtype=np.int64, count=len(removed)))
+            except RuntimeError:
+                # Một số index (HNSW) không hỗ trợ xoá: dựng lại từ embedding cache
+                return False
+        cache = self._load_embedding_cache()
+        encoded = 0
+        if added:
+            added_docs = [documents[i] for i in added]
+            added_ids = ids[added]
+            encoded = self._embed_missing(added_docs, added_ids, cache)
+            vectors = np.stack([cache[int(cid)] for cid in added_ids])
+            self.index.add_with_ids(vectors, added_ids)
+        
+        self.documents, self.metadata = documents, metadata
+        self._set_ids(ids)
+        saved = self._save_cache()
+        self._save_embedding_cache(cache, ids)
+        if saved:
+            self._load_cache()
+        else:
+            self.meta_index = self._metadata_index_in_memory()
+        print(f"[RAG] Index updated: +{len(added)} -{len(removed)} chunks ({encoded} encoded)")
+        return True
+    
     def _extract_documents(self, knowledge: Dict) -> Tuple[List[str], List[Dict]]:
         """
         Trích xuất documents từ knowledge base
@@ -197,40 +676,78 @@ Trả lời:
         
         return documents, metadata
     
-    def retrieve(self, query: str, top_k: int = 3) -> List[Tuple[str, Dict, float]]:
+    def encode_query(self, query: str) -> Optional[np.ndarray]:
+        """Vector (1, dim) đã chuẩn hoá L2 của câu hỏi; dùng lại được cho retrieve()"""
+        if self.model is None:
+            return None
+        query_embedding = np.ascontiguousarray(self.model.encode([query], convert_to_numpy=True), dtype=np.float32)
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+    
+    def retrieve(self, query: str, top_k: int = 3, nprobe: Optional[int] = None,
+                 ef_search: Optional[int] = None, filters: Optional[Dict] = None,
+                 query_embedding: Optional[np.ndarray] = None) -> List[Tuple[str, Dict, float]]:
         """
         Retrieve top-k documents liên quan nhất với query
-        Returns: List of (document_text, metadata, similarity_score)
+        Args:
+            filters: Lọc theo metadata trước khi xếp hạng, ví dụ {'nam': '2024'},
+                {'ma_nganh': '7480201', 'type': 'nganh_hoc'}. Các trường hỗ trợ:
+                type, nam, ma_nganh, tag, source. Có thể ít hơn top_k kết quả.
+            nprobe: Số cluster quét với index IVF (mặc định RAG_NPROBE)
+            ef_search: Độ rộng tìm kiếm với index HNSW (mặc định RAG_EF_SEARCH)
+            query_embedding: Vector từ encode_query() nếu đã có (không encode lại)
+        Returns: List of (document_text, metadata, score)
+            score luôn là cosine similarity (dense); khi bật hybrid, thứ tự theo RRF và
+            metadata (bản sao) có thêm 'rrf_score'
         """
-        if not HAS_RAG_DEPS or self.model is None or self.index is None:
+        if not HAS_FAISS or self.model is None or self.index is None:
+            return []
+        
+        allowed = self._filter_rows(filters)
+        if allowed is not None and len(allowed) == 0:
             return []
         
+        hybrid = self.hybrid and self.bm25 is not None
+        # Lấy nhiều ứng viên hơn mỗi phía để fusion có đủ thứ hạng
+        depth = max(top_k * 4, RRF_DEPTH) if hybrid else top_k
+        
+        # Sparse (BM25): chỉ cộng dồn vài posting list
+        sparse_rows = self.bm25.search(query, depth, allowed_rows=allowed)[0] if hybrid else []
+        
         # Encode query
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        faiss.normalize_L2(query_embedding)
+        if query_embedding is None:
+            query_embedding = self.encode_query(query)
         
-        # Search
-        scores, indices = self.index.search(query_embedding, top_k)
+        dense = self._dense_search(query_embedding, depth, allowed, nprobe, ef_search)
         
-        # Format results
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.documents):  # Valid index
-                results.append((
-                    self.documents[idx],
-                    self.metadata[idx],
-                    float(score)
-                ))
+        if not hybrid:
+            # Chỉ giải mã text/metadata của top-k
+            return [(self.documents[row], self.metadata[row], score) for row, score in dense[:top_k]]
         
-        return results
+        fused = reciprocal_rank_fusion([[row for row, _ in dense], [int(r) for r in sparse_rows]])[:top_k]
+        # score vẫn là cosine như chế độ dense; chunk chỉ BM25 tìm thấy thì tính cosine riêng
+        cosine = dict(dense)
+        missing = [row for row, _ in fused if row not in cosine]
+        if missing:
+            cosine.update(self._cosine_scores(query_embedding, missing))
+        return [(self.documents[row], dict(self.metadata[row], rrf_score=rrf), cosine.get(row, 0.0))
+                for row, rrf in fused]
     
     def rebuild_index(self):
-        """Rebuild index từ đầu (khi knowledge base thay đổi)"""
-        if not HAS_RAG_DEPS or self.model is None:
+        """
+        Cập nhật index khi knowledge base thay đổi.
+        Chỉ encode lại các chunk mới/thay đổi; chi phí tỉ lệ với diff.
+        """
+        if not HAS_FAISS or self.model is None:
             print("[RAG] Cannot rebuild: dependencies not installed")
             return
         
         print("[RAG] Rebuilding index...")
+        try:
+            if self._update_index():
+                return
+        except Exception as e:
+            print(f"[RAG] Incremental update failed ({e}). Rebuilding from knowledge base...")
         self._build_index()
 
 
@@ -0,0 +1,161 @@
+"""
+Chunk store dạng memory-map cho RAG
+Lưu documents/metadata thành file bytes + mảng offsets để nhiều worker
+(gunicorn --preload) cùng đọc chung một vùng trang nhớ, không phải unpickle.
+Mở store là O(1); mỗi chunk chỉ được giải mã khi truy cập, nên thời gian nạp
+và bộ nhớ không tăng theo số chunk.
+"""
+import json
+import mmap
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+DOCS_BIN = 'documents.bin'
+DOCS_OFFSETS = 'documents.offsets.npy'
+META_BIN = 'metadata.bin'
+META_OFFSETS = 'metadata.offsets.npy'
+META_INDEX = 'metadata_index.json'
+
+# Các trường metadata được đánh index để lọc lúc retrieve
+FILTER_FIELDS = ('type', 'nam', 'ma_nganh', 'tag', 'source')
+
+STORE_FILES = (DOCS_BIN, DOCS_OFFSETS, META_BIN, META_OFFSETS)
+
+
+def atomic_save_npy(path: str, array: np.ndarray):
+    """np.save qua file tạm + os.replace: process khác đang mmap file cũ không bị ảnh hưởng"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _write_column(data_path: str, offsets_path: str, items: List[bytes]):
+    """Ghi một cột: các bản ghi nối liền nhau + offsets (n+1 phần tử)."""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    tmp = data_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pos = 0
+        for i, raw in enumerate(items):
+            f.write(raw)
+            pos += len(raw)
+            offsets[i + 1] = pos
+    # Không ghi đè tại chỗ: worker khác có thể đang mmap file cũ (truncate -> SIGBUS)
+    os.replace(tmp, data_path)
+    atomic_save_npy(offsets_path, offsets)
+
+
+def write_chunk_store(cache_dir: str, documents: Sequence[str], metadata: Sequence[Dict]):
+    """Ghi documents và metadata ra định dạng có thể memory-map"""
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_column(
+        os.path.join(cache_dir, DOCS_BIN),
+        os.path.join(cache_dir, DOCS_OFFSETS),
+        [doc.encode('utf-8') for doc in documents]
+    )
+    _write_column(
+        os.path.join(cache_dir, META_BIN),
+        os.path.join(cache_dir, META_OFFSETS),
+        [json.dumps(m, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for m in metadata]
+    )
+
+
+def write_metadata_index(cache_dir: str, metadata: Sequence[Dict]):
+    """Ghi index ngược field -> value -> các row (tăng dần) có metadata đó"""
+    index: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+    for row, meta in enumerate(metadata):
+        for field in FILTER_FIELDS:
+            value = meta.get(field)
+            if value is not None:
+                index[field].setdefault(str(value), []).append(row)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = os.path.join(cache_dir, META_INDEX + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'n': len(metadata), 'fields': index}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, os.path.join(cache_dir, META_INDEX))
+
+
+def load_metadata_index(cache_dir: str, n: int) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+    """Nạp index metadata; None nếu chưa có hoặc không khớp số chunk n"""
+    path = os.path.join(cache_dir, META_INDEX)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('n') != n:
+        return None
+    return {
+        field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+        for field, values in data.get('fields', {}).items()
+    }
+
+
+def chunk_store_exists(cache_dir: str) -> bool:
+    return all(os.path.exists(os.path.join(cache_dir, name)) for name in STORE_FILES)
+
+
+class _MmapColumn:
+    """Một cột chỉ đọc: mmap bytes + offsets np.load(mmap_mode='r')"""
+
+    def __init__(self, data_path: str, offsets_path: str, decode):
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        self._decode = decode
+        self._file = open(data_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap không cho phép map file rỗng
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if idx < 0 or idx >= n:
+            raise IndexError(idx)
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return self._decode(self._buf[start:end])
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+
+class MmapChunkStore:
+    """
+    Cặp (documents, metadata) đọc trực tiếp từ file memory-map.
+    Mỗi cột hoạt động như một list chỉ đọc (len, index, iterate).
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.documents = _MmapColumn(
+            os.path.join(cache_dir, DOCS_BIN),
+            os.path.join(cache_dir, DOCS_OFFSETS),
+            lambda raw: bytes(raw).decode('utf-8')
+        )
+        self.metadata = _MmapColumn(
+            os.path.join(cache_dir, META_BIN),
+            os.path.join(cache_dir, META_OFFSETS),
+            lambda raw: json.loads(bytes(raw).decode('utf-8'))
+        )
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def close(self):
+        self.documents.close()
+        self.metadata.close()
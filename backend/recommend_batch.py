@@ -0,0 +1,201 @@
+"""
+Gợi ý ngành theo lô cho giáo viên tư vấn: nhận danh sách học sinh (CSV hoặc JSON), trả NDJSON
+từng dòng một (một dòng / học sinh, dòng cuối là thống kê thông lượng).
+
+Điểm chuẩn + thông tin ngành được nạp MỘT lần mỗi request (một query JOIN) thành mảng NumPy
+(scoring.MatchScorer); học sinh được chấm theo khối RECOMMEND_BATCH_CHUNK bằng phép tính vector.
+Lô từ RECOMMEND_BATCH_POOL_MIN học sinh trở lên được chia cho ProcessPoolExecutor
+(RECOMMEND_BATCH_WORKERS process, khởi tạo kiểu spawn: an toàn trong worker gunicorn nhiều thread).
+Mỗi worker chỉ chạy tối đa RECOMMEND_BATCH_POOLS pool cùng lúc; request đến khi đã hết chỗ được
+chấm ngay trong thread (cùng kết quả, chậm hơn) thay vì sinh thêm interpreter.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import joinedload
+
+from .ai_recommendation import program_info
+from .models import AdmissionScore
+from .scoring import (INTEREST_KEYWORDS, SKILL_KEYWORDS, MatchScorer, init_batch_worker, preference_counts,
+                      probability_labels, recommend_chunk)
+
+BATCH_CHUNK = int(os.getenv('RECOMMEND_BATCH_CHUNK', '512'))
+BATCH_MAX = int(os.getenv('RECOMMEND_BATCH_MAX', '20000'))
+POOL_MIN = int(os.getenv('RECOMMEND_BATCH_POOL_MIN', '5000'))
+POOL_WORKERS = int(os.getenv('RECOMMEND_BATCH_WORKERS', str(min(4, os.cpu_count() or 1))))
+POOL_CONCURRENCY = int(os.getenv('RECOMMEND_BATCH_POOLS', '1'))
+
+_pool_slots = threading.BoundedSemaphore(max(1, POOL_CONCURRENCY))
+
+
+class BatchError(ValueError):
+    """Dữ liệu tải lên không hợp lệ (trả 400 / 413)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _split(value) -> List[str]:
+    # CSV: "công nghệ; AI" hoặc "công nghệ|AI"; JSON: list
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, str)]
+    if not value:
+        return []
+    return [v.strip() for v in str(value).replace('|', ';').split(';') if v.strip()]
+
+
+def parse_students(req) -> List[dict]:
+    """Đọc danh sách học sinh từ file CSV (multipart 'file'), body text/csv hoặc JSON"""
+    upload = req.files.get('file')
+    if upload is not None or (req.mimetype or '').endswith('csv'):
+        raw = upload.read() if upload is not None else req.get_data()
+        reader = csv.DictReader(io.StringIO(raw.decode('utf-8-sig', errors='replace')))
+        students = [{(k or '').strip(): (v or '').strip() for k, v in row.items()} for row in reader]
+    else:
+        data = req.get_json(silent=True)
+        students = data.get('students') if isinstance(data, dict) else data
+        if not isinstance(students, list):
+            raise BatchError('Body phải là danh sách học sinh (JSON) hoặc file CSV')
+    if len(students) > BATCH_MAX:
+        raise BatchError(f'Tối đa {BATCH_MAX} học sinh mỗi lần tải lên', 413)
+    return students
+
+
+class Candidates:
+    """Điểm chuẩn 3 năm gần nhất + thông tin ngành, dạng dict thuần (sinh NDJSON không chạm DB)"""
+
+    def __init__(self, scores):
+        self.rows = [{
+            'program_name': score.program_name,
+            'admission_score': score.admission_score,
+            'year': score.year,
+            'notes': score.notes,
+            'program_info': program_info(score.program),
+        } for score in scores]
+        self.names = [r['program_name'] for r in self.rows]
+        self.cutoffs = [r['admission_score'] for r in self.rows]
+        self.scorer = MatchScorer(self.names, self.cutoffs)
+
+
+def load_candidates(current_year: Optional[int] = None) -> Candidates:
+    """Một query: AdmissionScore LEFT JOIN Program, thứ tự điểm chuẩn giảm dần như API đơn lẻ"""
+    current_year = current_year or datetime.now().year
+    rows = (AdmissionScore.query.options(joinedload(AdmissionScore.program))
+            .filter(AdmissionScore.admission_score.isnot(None),
+                    AdmissionScore.year.in_([current_year, current_year - 1, current_year - 2]))
+            .order_by(AdmissionScore.admission_score.desc(), AdmissionScore.id)
+            .all())
+    return Candidates(rows)
+
+
+def _encode(students: List[dict]):
+    """Tách học sinh hợp lệ thành mảng (tổng điểm, đếm sở thích, đếm kỹ năng); lỗi theo dòng"""
+    valid, errors, totals, interests, skills = [], {}, [], [], []
+    for i, student in enumerate(students):
+        try:
+            total = float(student.get('total_score') or 0) if isinstance(student, dict) else 0
+        except (TypeError, ValueError):
+            total = 0
+        if not total:
+            errors[i] = 'Vui lòng cung cấp tổng điểm'
+            continue
+        valid.append(i)
+        totals.append(total)
+        interests.append(preference_counts(_split(student.get('interests')), INTEREST_KEYWORDS))
+        skills.append(preference_counts(_split(student.get('skills')), SKILL_KEYWORDS))
+    n_interest, n_skill = len(INTEREST_KEYWORDS), len(SKILL_KEYWORDS)
+    return (valid, errors, np.array(totals, dtype=np.float64),
+            np.array(interests, dtype=np.int64).reshape(-1, n_interest),
+            np.array(skills, dtype=np.int64).reshape(-1, n_skill))
+
+
+def _chunks(totals, interest_counts, skill_counts, k, chunk):
+    for start in range(0, len(totals), chunk):
+        end = start + chunk
+        yield totals[start:end], interest_counts[start:end], skill_counts[start:end], k
+
+
+def stream_recommendations(candidates: Candidates, students: List[dict], k: int = 10,
+                           chunk: int = BATCH_CHUNK, workers: Optional[int] = None,
+                           pool_min: int = POOL_MIN) -> Iterator[str]:
+    """Sinh từng dòng NDJSON; dòng cuối {"summary": {...}} báo số học sinh / giây"""
+    start = time.perf_counter()
+    workers = POOL_WORKERS if workers is None else workers
+    valid, errors, totals, interest_counts, skill_counts = _encode(students)
+    use_pool = workers > 1 and len(valid) >= pool_min
+    if use_pool and not _pool_slots.acquire(blocking=False):
+        print(f"[recommend-batch] {POOL_CONCURRENCY} process pool(s) busy, scoring {len(valid)} students in-thread")
+        use_pool = False
+    jobs = list(_chunks(totals, interest_counts, skill_counts, k, chunk))
+
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + '\n'
+
+    pool = None
+    try:
+        if use_pool:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                       initializer=init_batch_worker,
+                                       initargs=(candidates.names, candidates.cutoffs))
+            results = pool.map(recommend_chunk, jobs)
+        else:
+            results = (candidates.scorer.recommend_batch(*job) for job in jobs)
+        position = 0
+        emitted = 0
+        for ranked, picked, eligible in results:
+            for row in range(ranked.shape[0]):
+                index = valid[position]
+                # Dòng lỗi đứng trước theo đúng thứ tự tải lên
+                while emitted < index:
+                    if emitted in errors:
+                        yield line({'row': emitted, 'error': errors[emitted]})
+                    emitted += 1
+                student = students[index]
+                total = float(totals[position])
+                picks = [i for i in ranked[row] if i >= 0]
+                labels = probability_labels(total - np.asarray([candidates.cutoffs[i] for i in picks]))
+                yield line({
+                    'row': index,
+                    'student_id': student.get('student_id') or student.get('id'),
+                    'name': student.get('name'),
+                    'total_score': total,
+                    'recommendations': [dict(candidates.rows[i], match_score=float(points),
+                                             score_difference=total - candidates.cutoffs[i],
+                                             probability=str(label))
+                                        for i, points, label in zip(picks, picked[row], labels)],
+                    'total_matches': int(eligible[row]),
+                })
+                emitted = index + 1
+                position += 1
+        for index in range(emitted, len(students)):
+            if index in errors:
+                yield line({'row': index, 'error': errors[index]})
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if use_pool:
+            _pool_slots.release()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'students': len(students),
+        'scored': len(valid),
+        'errors': len(errors),
+        'programs': len(candidates.rows),
+        'workers': workers if use_pool else 1,
+        'seconds': round(elapsed, 3),
+        'students_per_second': round(len(valid) / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(f"[recommend-batch] {summary['scored']} students x {summary['programs']} rows in "
+          f"{summary['seconds']}s ({summary['students_per_second']}/s, workers={summary['workers']})")
+    yield line({'summary': summary})
@@ -0,0 +1,195 @@
+"""
+Response cache cho /api/chat theo câu hỏi đã chuẩn hoá
+Câu hỏi được đưa về dạng chuẩn (chữ thường, bỏ dấu, gộp khoảng trắng, bỏ dấu câu)
+nên "Học phí ICTU?" và "hoc phi  ictu" dùng chung một entry.
+Hai tầng:
+    - LRU trong process (nhanh nhất, riêng từng worker)
+    - SQLite dùng chung (tuỳ chọn, CHAT_CACHE_DB): mọi gunicorn worker thấy câu
+      trả lời của nhau
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+_PUNCT_RE = re.compile(r'[^\w\s]', re.UNICODE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """Chuẩn hoá câu hỏi: chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d), bỏ dấu câu, gộp khoảng trắng"""
+    text = unicodedata.normalize('NFD', (text or '').lower())
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    text = text.replace('đ', 'd')
+    text = _PUNCT_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def cache_key(text: str, version: Optional[str]) -> str:
+    return hashlib.sha1(f"{version or ''}\0{normalize_query(text)}".encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Args:
+        max_entries: Số entry tối đa của tầng LRU trong process
+        ttl: Thời gian sống của entry (giây), áp dụng cho cả hai tầng
+        db_path: File SQLite cho tầng dùng chung; None = chỉ dùng LRU
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits_memory = 0
+        self.hits_shared = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._local = threading.local()
+        # Thế hệ cache: admin purge tăng số này, worker khác thấy và bỏ LRU của mình
+        self._generation = 0
+        if db_path:
+            self._init_db()
+
+    # ----- tầng SQLite -----
+    def _conn(self) -> sqlite3.Connection:
+        # Mỗi thread một connection; tạo lại sau fork (không dùng chung connection của master)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS chat_cache ('
+                         'key TEXT PRIMARY KEY, query TEXT, payload TEXT NOT NULL, created REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS chat_cache_meta (name TEXT PRIMARY KEY, value INTEGER)')
+            conn.execute("INSERT OR IGNORE INTO chat_cache_meta VALUES ('generation', 0)")
+        self._generation = self._shared_generation()
+
+    def _shared_generation(self) -> int:
+        row = self._conn().execute("SELECT value FROM chat_cache_meta WHERE name = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _read_generation(self) -> Optional[int]:
+        try:
+            return self._shared_generation()
+        except sqlite3.Error as e:
+            print(f"[chat-cache] shared tier unavailable: {e}")
+            return None
+
+    # ----- API -----
+    # Lock chỉ bảo vệ LRU trong process; I/O SQLite chạy ngoài lock để lượt trúng LRU
+    # không phải chờ một query chậm của thread khác. Lỗi SQLite (vd "database is locked"
+    # khi nhiều worker cùng ghi) không làm hỏng request: đọc lỗi = miss, ghi lỗi = bỏ qua.
+    def get(self, text: str, version: Optional[str] = None) -> Optional[Dict]:
+        """Trả về payload đã cache (dict) hoặc None"""
+        key = cache_key(text, version)
+        now = time.time()
+        generation = self._read_generation() if self.db_path else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # Worker khác đã purge: bỏ LRU của process này
+                self._memory.clear()
+                self._generation = generation
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return entry[0]
+                del self._memory[key]
+        if self.db_path and generation is not None:
+            try:
+                row = self._conn().execute('SELECT payload, created FROM chat_cache WHERE key = ?',
+                                           (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"[chat-cache] shared read failed: {e}")
+                row = None
+            if row and now - row[1] <= self.ttl:
+                payload = json.loads(row[0])
+                with self._lock:
+                    self._remember(key, payload, row[1])
+                    self.hits_shared += 1
+                return payload
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, payload: Dict, version: Optional[str] = None):
+        key = cache_key(text, version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, payload, now)
+        if self.db_path:
+            try:
+                conn = self._conn()
+                with conn:
+                    conn.execute('INSERT OR REPLACE INTO chat_cache VALUES (?, ?, ?, ?)',
+                                 (key, normalize_query(text), json.dumps(payload, ensure_ascii=False), now))
+                    conn.execute('DELETE FROM chat_cache WHERE created < ?', (now - self.ttl,))
+            except sqlite3.Error as e:
+                print(f"[chat-cache] shared write skipped: {e}")
+
+    def _remember(self, key: str, payload: Dict, created: float):
+        self._memory[key] = (payload, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def purge(self, text: Optional[str] = None) -> int:
+        """
+        Xoá cache. text=None xoá toàn bộ; có text thì xoá mọi entry của câu hỏi
+        đó (mọi version) ở tầng dùng chung. LRU trong process luôn được xoá hết.
+        Trả về số entry đã xoá ở tầng dùng chung (hoặc LRU nếu không có).
+        """
+        with self._lock:
+            purged = len(self._memory)
+            self._memory.clear()
+        if self.db_path:
+            conn = self._conn()
+            with conn:
+                if text is None:
+                    purged = conn.execute('DELETE FROM chat_cache').rowcount
+                else:
+                    purged = conn.execute('DELETE FROM chat_cache WHERE query = ?',
+                                          (normalize_query(text),)).rowcount
+                conn.execute("UPDATE chat_cache_meta SET value = value + 1 WHERE name = 'generation'")
+            generation = self._shared_generation()
+            with self._lock:
+                self._memory.clear()
+                self._generation = generation
+        return purged
+
+    def stats(self) -> dict:
+        hits = self.hits_memory + self.hits_shared
+        total = hits + self.misses
+        info = {
+            'entries': len(self._memory),
+            'hits': hits,
+            'hits_memory': self.hits_memory,
+            'hits_shared': self.hits_shared,
+            'misses': self.misses,
+            'hit_ratio': round(hits / total, 3) if total else 0.0,
+            'miss_ratio': round(self.misses / total, 3) if total else 0.0,
+            'shared': bool(self.db_path),
+        }
+        if self.db_path:
+            try:
+                info['shared_entries'] = self._conn().execute('SELECT COUNT(*) FROM chat_cache').fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return info
@@ -0,0 +1,283 @@
+"""
+Chấm điểm ngành học dạng vector (NumPy) cho /api/recommend-programs và /api/suggest-programs.
+
+Ngành được mã hoá một lần thành mảng: điểm chuẩn, bitset từ khoá sở thích / kỹ năng khớp với tên
+ngành. Mỗi học sinh (hoặc cả lô hàng nghìn học sinh trong ngày tư vấn) được chấm với mọi ngành
+trong một phép tính ma trận, top-k lấy bằng argpartition thay vì sort toàn bộ danh sách.
+
+Điểm và thứ hạng giữ đúng như vòng lặp cũ: cùng ngưỡng, cùng trọng số, cùng thứ tự khi bằng điểm
+(ngành đứng trước trong danh sách đầu vào xếp trước).
+"""
+from functools import lru_cache
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ----- bảng từ khoá (tên ngành chứa từ khoá -> khớp sở thích / kỹ năng) -----
+INTEREST_KEYWORDS = {
+    'công nghệ': ['công nghệ', 'kỹ thuật', 'máy tính', 'phần mềm', 'mạng', 'an ninh'],
+    'kinh doanh': ['kinh doanh', 'quản trị', 'marketing', 'thương mại'],
+    'thiết kế': ['thiết kế', 'đồ họa', 'truyền thông', 'nghệ thuật'],
+    'tài chính': ['tài chính', 'ngân hàng', 'kế toán'],
+    'AI': ['AI', 'trí tuệ', 'máy học', 'dữ liệu'],
+    'tự động': ['tự động', 'robot', 'điện tử', 'cơ điện']
+}
+
+SKILL_KEYWORDS = {
+    'lập trình': ['phần mềm', 'công nghệ thông tin', 'máy tính'],
+    'logic': ['máy tính', 'toán', 'AI'],
+    'sáng tạo': ['thiết kế', 'đồ họa', 'nghệ thuật', 'truyền thông'],
+    'giao tiếp': ['marketing', 'quản trị', 'kinh doanh'],
+    'kỹ thuật': ['kỹ thuật', 'điện', 'tự động', 'ô tô']
+}
+
+# (chênh lệch điểm tối thiểu, điểm thưởng); dưới mọi ngưỡng -> giá trị mặc định
+MATCH_TIERS = ((3, 40), (1.5, 35), (0.5, 30), (0, 25))
+MATCH_DEFAULT = 10
+KEYWORD_POINTS = 10
+KEYWORD_CAP = 30
+
+PROBABILITY_LABELS = ((3, "Rất cao (95-100%)"), (1.5, "Cao (80-95%)"), (0.5, "Trung bình (60-80%)"),
+                      (0, "Thấp (40-60%)"))
+PROBABILITY_LABEL_DEFAULT = "Rất thấp (<40%)"
+
+# suggest-programs: (chênh lệch tối thiểu, xác suất %, trạng thái)
+CUTOFF_TIERS = ((2, 95, 'very_high'), (1, 85, 'high'), (0, 70, 'medium'), (-0.5, 50, 'low'))
+CUTOFF_DEFAULT = (20, 'very_low')
+
+# Môn thi và tổ hợp xét tuyển THPT
+SUBJECTS = ('toan', 'van', 'ngoai_ngu', 'ly', 'hoa', 'sinh')
+COMBINATIONS = {
+    'A00': ('toan', 'ly', 'hoa'),
+    'A01': ('toan', 'ly', 'ngoai_ngu'),
+    'B00': ('toan', 'hoa', 'sinh'),
+    'D01': ('toan', 'van', 'ngoai_ngu'),
+}
+# Cột môn của từng tổ hợp, theo đúng thứ tự cộng của code cũ (toan + ly + ngoai_ngu, ...):
+# tổng số thực phụ thuộc thứ tự cộng, cộng khác thứ tự có thể lệch ở ngưỡng điểm chuẩn
+COMBINATION_COLUMNS = tuple(tuple(SUBJECTS.index(s) for s in subjects) for subjects in COMBINATIONS.values())
+
+
+def tier_values(values: np.ndarray, tiers: Sequence[Tuple], default, base=None):
+    """
+    np.select theo ngưỡng giảm dần: phần tử đầu tiên có values >= ngưỡng,
+    hoặc values >= base + ngưỡng nếu có base (giữ đúng dạng so sánh của code cũ: với số thực,
+    24.35 >= 22.35 + 2 và 24.35 - 22.35 >= 2 có thể cho kết quả khác nhau)
+    """
+    if base is None:
+        conditions = [values >= t[0] for t in tiers]
+    else:
+        conditions = [values >= base + t[0] for t in tiers]
+    return np.select(conditions, [t[1] for t in tiers], default)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Chỉ số top-k theo điểm giảm dần, bằng điểm thì giữ thứ tự ban đầu (như list.sort ổn định).
+    scores: mảng số nguyên (n,) hoặc (m, n) -> kết quả (k,) hoặc (m, k)
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    # Khoá duy nhất: điểm * n + (n - 1 - vị trí) -> argpartition cho kết quả xác định
+    key = scores.astype(np.int64) * n + (n - 1 - np.arange(n))
+    part = np.argpartition(-key, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(key, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+# ----- recommend-programs: điểm phù hợp (điểm số + sở thích + kỹ năng) -----
+@lru_cache(maxsize=4096)
+def keyword_bits(program_name: str) -> Tuple[Tuple[bool, ...], Tuple[bool, ...]]:
+    """Bitset (sở thích, kỹ năng) của một tên ngành, tính một lần cho mỗi tên"""
+    name = program_name.lower()
+    return (tuple(any(kw in name for kw in kws) for kws in INTEREST_KEYWORDS.values()),
+            tuple(any(kw in name for kw in kws) for kws in SKILL_KEYWORDS.values()))
+
+
+def preference_counts(values: Sequence[str], table: Mapping[str, list]) -> np.ndarray:
+    """Số lần mỗi khoá của bảng xuất hiện trong danh sách sở thích / kỹ năng (so khớp lowercase)"""
+    lowered = [v.lower() for v in values or [] if isinstance(v, str)]
+    return np.array([lowered.count(key) for key in table], dtype=np.int64)
+
+
+class MatchScorer:
+    """
+    Args:
+        names: Tên ngành của từng ứng viên (AdmissionScore.program_name)
+        cutoffs: Điểm chuẩn tương ứng
+    """
+
+    def __init__(self, names: Sequence[str], cutoffs: Sequence[float]):
+        self.cutoffs = np.asarray(cutoffs, dtype=np.float64)
+        n = len(self.cutoffs)
+        bits = [keyword_bits(name or '') for name in names]
+        self.interest_hits = np.array([b[0] for b in bits], dtype=np.int64).reshape(n, len(INTEREST_KEYWORDS))
+        self.skill_hits = np.array([b[1] for b in bits], dtype=np.int64).reshape(n, len(SKILL_KEYWORDS))
+
+    def __len__(self):
+        return len(self.cutoffs)
+
+    def score_batch(self, totals: np.ndarray, interest_counts: np.ndarray,
+                    skill_counts: np.ndarray) -> np.ndarray:
+        """Điểm phù hợp (m học sinh x n ngành), số nguyên 0-100"""
+        totals = np.asarray(totals, dtype=np.float64).reshape(-1, 1)
+        points = tier_values(totals - self.cutoffs, MATCH_TIERS, MATCH_DEFAULT)
+        points = points + np.minimum(KEYWORD_POINTS * (np.atleast_2d(interest_counts) @ self.interest_hits.T),
+                                     KEYWORD_CAP)
+        points = points + np.minimum(KEYWORD_POINTS * (np.atleast_2d(skill_counts) @ self.skill_hits.T),
+                                     KEYWORD_CAP)
+        return points.astype(np.int64)
+
+    def score(self, total_score: float, interests: Sequence[str], skills: Sequence[str]) -> np.ndarray:
+        return self.score_batch(np.array([total_score]), preference_counts(interests, INTEREST_KEYWORDS),
+                                preference_counts(skills, SKILL_KEYWORDS))[0]
+
+    def eligible(self, totals: np.ndarray) -> np.ndarray:
+        """Mặt nạ ngành có điểm chuẩn <= tổng điểm (m x n)"""
+        return self.cutoffs <= np.asarray(totals, dtype=np.float64).reshape(-1, 1)
+
+    def recommend_batch(self, totals: np.ndarray, interest_counts: np.ndarray, skill_counts: np.ndarray,
+                        k: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Top-k ngành đủ điểm cho cả lô học sinh.
+        Returns: (chỉ số m x k, điểm phù hợp m x k, số ngành đủ điểm m); ô không đủ điểm có chỉ số -1
+        """
+        scores = self.score_batch(totals, interest_counts, skill_counts)
+        mask = self.eligible(totals)
+        ranked = top_k(np.where(mask, scores, -1), k)
+        picked = np.take_along_axis(scores, ranked, axis=-1)
+        ok = np.take_along_axis(mask, ranked, axis=-1)
+        return np.where(ok, ranked, -1), np.where(ok, picked, 0), mask.sum(axis=1)
+
+
+def probability_labels(diff) -> np.ndarray:
+    """Nhãn xác suất theo chênh lệch điểm (code cũ cũng so sánh trên total - điểm chuẩn)"""
+    return tier_values(np.asarray(diff, dtype=np.float64), PROBABILITY_LABELS, PROBABILITY_LABEL_DEFAULT)
+
+
+# ----- suggest-programs: tổ hợp xét tuyển + so với điểm chuẩn năm gần nhất -----
+def subject_matrix(rows: Sequence[Mapping[str, float]]) -> np.ndarray:
+    """Điểm từng môn (m x len(SUBJECTS)), NaN nếu thiếu môn"""
+    return np.array([[float(r[s]) if s in r else np.nan for s in SUBJECTS] for r in rows],
+                    dtype=np.float64).reshape(len(rows), len(SUBJECTS))
+
+
+def combination_scores(rows: Sequence[Mapping[str, float]], method: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Điểm xét tuyển theo phương thức cho cả lô học sinh.
+    Returns: (tên cột, ma trận m x số cột); NaN = không đủ môn cho tổ hợp đó
+    """
+    if method == 'thpt':
+        subjects = subject_matrix(rows)
+        totals = np.empty((len(rows), len(COMBINATION_COLUMNS)))
+        for j, columns in enumerate(COMBINATION_COLUMNS):
+            # Thiếu môn -> NaN lan qua phép cộng
+            total = subjects[:, columns[0]]
+            for col in columns[1:]:
+                total = total + subjects[:, col]
+            totals[:, j] = total
+        return list(COMBINATIONS), totals
+    if method == 'hoc_ba':
+        # Điểm trung bình 3 năm, quy đổi sang thang 30
+        return ['TB_3_NAM'], np.array([[float(r.get('tb_3_nam', 0)) * 3] for r in rows]).reshape(-1, 1)
+    if method == 'dgnl':
+        # Quy đổi điểm ĐGNL (thang 1200) sang thang 30
+        return ['DGNL'], np.array([[float(r.get('dgnl', 0)) / 1200 * 30] for r in rows]).reshape(-1, 1)
+    return [], np.zeros((len(rows), 0))
+
+
+def best_combinations(columns: List[str], totals: np.ndarray) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Điểm cao nhất (0 nếu không có tổ hợp nào) và tên tổ hợp tốt nhất (None nếu điểm <= 0)"""
+    if not columns:
+        return np.zeros(totals.shape[0]), [None] * totals.shape[0]
+    filled = np.where(np.isnan(totals), -np.inf, totals)
+    best = filled.max(axis=1)
+    best_idx = filled.argmax(axis=1)  # phần tử đầu tiên bằng max, như vòng lặp '>' cũ
+    names = [columns[i] if b > 0 else None for i, b in zip(best_idx, best)]
+    return np.where(np.isfinite(best), best, 0.0), names
+
+
+class CutoffScorer:
+    """
+    Args:
+        programs: Ngành trong snapshot danh mục (catalogue), mỗi ngành có 'latest_quota'
+    """
+
+    def __init__(self, programs: Sequence[dict]):
+        self.programs = [p for p in programs if p.get('latest_quota') and p['latest_quota']['minimum_score']]
+        self.cutoffs = np.array([p['latest_quota']['minimum_score'] for p in self.programs], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.programs)
+
+    def probabilities(self, best_scores: np.ndarray) -> np.ndarray:
+        """Xác suất đỗ (%) cho m học sinh x n ngành"""
+        scores = np.asarray(best_scores, dtype=np.float64).reshape(-1, 1)
+        # Như code cũ: điểm >= điểm chuẩn + ngưỡng (không so trên hiệu đã tính sẵn)
+        return tier_values(scores, CUTOFF_TIERS, CUTOFF_DEFAULT[0], base=self.cutoffs).astype(np.int64)
+
+    def rank_batch(self, best_scores: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k ngành theo xác suất đỗ cho cả lô: (chỉ số m x k, xác suất m x k)"""
+        probs = self.probabilities(best_scores)
+        ranked = top_k(probs, k)
+        return ranked, np.take_along_axis(probs, ranked, axis=-1)
+
+    def suggest(self, best_score: float, best_combination: Optional[str], k: int = 10) -> List[dict]:
+        """Top-k gợi ý cho một học sinh, cùng định dạng JSON với /api/suggest-programs"""
+        ranked, probs = self.rank_batch(np.array([best_score]), k)
+        statuses = dict((p, s) for _, p, s in CUTOFF_TIERS)
+        statuses[CUTOFF_DEFAULT[0]] = CUTOFF_DEFAULT[1]
+        suggestions = []
+        for i, probability in zip(ranked[0], probs[0]):
+            program = self.programs[i]
+            quota = program['latest_quota']
+            min_score = quota['minimum_score']
+            suggestions.append({
+                'id': program['id'],
+                'name': program['name'],
+                'code': program['code'],
+                'department': program['department'],
+                'minimum_score': min_score,
+                'your_score': round(float(best_score), 2),
+                'difference': round(float(best_score) - min_score, 2),
+                'probability': int(probability),
+                'status': statuses[int(probability)],
+                'best_combination': best_combination,
+                'year': quota['year'],
+                'quota': quota['quota'],
+                'tuition_fee': program['tuition_fee'],
+                'duration': program['duration']
+            })
+        return suggestions
+
+
+_cutoff_cache: Tuple[object, Optional[CutoffScorer]] = (None, None)
+
+
+def cutoff_scorer(snapshot) -> CutoffScorer:
+    """CutoffScorer dựng một lần cho mỗi snapshot danh mục (dựng lại khi catalogue đổi version)"""
+    global _cutoff_cache
+    cached_snapshot, scorer = _cutoff_cache
+    if scorer is None or cached_snapshot is not snapshot:
+        scorer = CutoffScorer(snapshot.programs)
+        _cutoff_cache = (snapshot, scorer)
+    return scorer
+
+
+# ----- process pool cho lô lớn (ngày tư vấn) -----
+_worker_scorer: Optional[MatchScorer] = None
+
+
+def init_batch_worker(names: Sequence[str], cutoffs: Sequence[float]):
+    """Initializer của ProcessPoolExecutor: mỗi process con dựng MatchScorer một lần"""
+    global _worker_scorer
+    _worker_scorer = MatchScorer(names, cutoffs)
+
+
+def recommend_chunk(args) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Chấm một khối học sinh trong process con: (tổng điểm, đếm sở thích, đếm kỹ năng, k)"""
+    totals, interest_counts, skill_counts, k = args
+    return _worker_scorer.recommend_batch(totals, interest_counts, skill_counts, k)
@@ -0,0 +1,130 @@
+"""
+Semantic answer cache cho chatbot
+Lưu (vector câu hỏi -> câu trả lời, sources) trong một FAISS index nhỏ riêng.
+Câu hỏi mới đủ gần (cosine >= threshold) với câu đã trả lời thì dùng lại câu
+trả lời cũ, bỏ qua retrieve + gọi LLM. Có TTL, giới hạn số entry (LRU) và tự
+xoá sạch khi version của index RAG thay đổi.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    import faiss
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+# Số láng giềng xét khi lookup (entry gần nhất có thể hết hạn / khác filter)
+_LOOKUP_K = 4
+
+
+class SemanticCache:
+    """
+    Args:
+        dim: Số chiều vector câu hỏi (cùng model embedding của RAG)
+        threshold: Cosine similarity tối thiểu để coi là cùng câu hỏi
+        ttl: Thời gian sống của một entry (giây)
+        max_entries: Số entry tối đa; vượt quá thì bỏ entry ít dùng nhất
+    """
+
+    def __init__(self, dim: int, threshold: float = 0.92, ttl: float = 3600.0, max_entries: int = 2000):
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: Optional[str]):
+        # KB / index đổi -> mọi câu trả lời cũ đều có thể sai
+        if version != self.version:
+            self._clear()
+            self.version = version
+
+    def _clear(self):
+        self._entries.clear()
+        self._index.reset()
+
+    def _remove(self, entry_ids):
+        for eid in entry_ids:
+            self._entries.pop(eid, None)
+        if entry_ids:
+            self._index.remove_ids(np.asarray(entry_ids, dtype=np.int64))
+
+    @staticmethod
+    def _as_query(vector: np.ndarray) -> np.ndarray:
+        q = np.ascontiguousarray(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+        faiss.normalize_L2(q)
+        return q
+
+    def lookup(self, vector: np.ndarray, version: Optional[str], key: str = '') -> Optional[Dict]:
+        """
+        Tìm câu trả lời đã cache cho vector câu hỏi.
+        key: Phần phải khớp tuyệt đối (ví dụ filter năm / mã ngành đã suy ra),
+            để "điểm chuẩn 2023" không dùng lại câu trả lời của "điểm chuẩn 2024".
+        Trả về dict {'response', 'sources', 'similarity'} hoặc None.
+        """
+        with self._lock:
+            self._check_version(version)
+            if not self._entries:
+                self.misses += 1
+                return None
+            scores, labels = self._index.search(self._as_query(vector), min(_LOOKUP_K, len(self._entries)))
+            now = time.time()
+            expired = []
+            found = None
+            for score, eid in zip(scores[0], labels[0]):
+                entry = self._entries.get(int(eid))
+                if entry is None or score < self.threshold:
+                    continue
+                if now - entry['created'] > self.ttl:
+                    expired.append(int(eid))
+                    continue
+                if entry['key'] == key:
+                    self._entries.move_to_end(int(eid))
+                    found = {'response': entry['response'], 'sources': entry['sources'],
+                             'similarity': float(score)}
+                    break
+            self._remove(expired)
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return found
+
+    def store(self, vector: np.ndarray, version: Optional[str], response: str, sources: list, key: str = ''):
+        """Thêm một câu trả lời vào cache"""
+        with self._lock:
+            self._check_version(version)
+            eid = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(self._as_query(vector), np.array([eid], dtype=np.int64))
+            self._entries[eid] = {'response': response, 'sources': sources, 'key': key, 'created': time.time()}
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._remove(list(self._entries)[:overflow])
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,215 @@
+"""
+TF-IDF đã fit sẵn cho chatbot fallback, lưu thành artifact theo hash của knowledge base.
+
+Thay cho TfidfVectorizer.fit_transform ở mỗi lần khởi động: ma trận tần suất từ (CSR),
+document frequency và vocabulary được ghi ra .npy / .json trong <thư mục KB>/.tfidf_cache/<name>/
+và được mở bằng mmap, nên các worker dùng chung trang nhớ và khởi động không phải fit lại.
+
+Lưu tần suất thô (không lưu trọng số tf-idf) nên IDF luôn tính lại chính xác từ df:
+thêm intent mới chỉ cần nối thêm hàng + cập nhật df, kết quả giống hệt fit lại
+(smooth_idf, chuẩn hoá L2 như TfidfVectorizer mặc định).
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from .rag_store import atomic_save_npy
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+VOCAB = 'vocab.json'
+ARRAYS = ('data', 'indices', 'indptr', 'df', 'rows')
+
+
+def _sha1(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class TfidfIndex:
+    """
+    Args:
+        cache_dir: Thư mục artifact (None = chỉ giữ trong RAM)
+        analyzer: Hàm text -> list token (tokenize + bỏ stopword)
+        signature: Mô tả analyzer để đưa vào khoá cache (đổi tokenizer / stopword -> fit lại)
+        max_features: Giới hạn vocabulary lúc fit đầy đủ (như TfidfVectorizer)
+    """
+
+    def __init__(self, cache_dir: Optional[str], analyzer: Callable[[str], List[str]],
+                 signature: Optional[dict] = None, max_features: int = 5000):
+        self.cache_dir = cache_dir
+        self.analyzer = analyzer
+        self.max_features = max_features
+        self.params_key = _sha1({'format': FORMAT_VERSION, 'max_features': max_features, **(signature or {})})
+        self.terms: List[str] = []
+        self.vocab: Dict[str, int] = {}
+        self.tf: Optional[sparse.csr_matrix] = None
+        self.df = np.zeros(0, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)   # row -> chỉ số intent
+        self.intent_hashes: List[str] = []
+        self.idf = np.zeros(0)
+        self.row_norms = np.zeros(0)
+        self.source = None  # 'loaded' | 'appended' | 'fitted'
+
+    @property
+    def n_rows(self) -> int:
+        return 0 if self.tf is None else self.tf.shape[0]
+
+    # ----- build / load -----
+    def load_or_build(self, intents: Sequence[dict]) -> 'TfidfIndex':
+        """Mở artifact nếu khớp KB; KB chỉ thêm intent ở cuối thì nối thêm hàng; còn lại fit lại"""
+        hashes = [_sha1(intent.get('patterns', [])) for intent in intents]
+        if self._load():
+            n = len(self.intent_hashes)
+            if self.intent_hashes == hashes:
+                self.source = 'loaded'
+                return self
+            if n < len(hashes) and self.intent_hashes == hashes[:n]:
+                self.append(intents[n:], start=n)
+                return self
+        self.fit(intents)
+        return self
+
+    def fit(self, intents: Sequence[dict]):
+        docs, rows = self._analyze(intents, 0)
+        totals = Counter(t for tokens in docs for t in tokens)
+        terms = sorted(totals)
+        if len(terms) > self.max_features:
+            # Giữ các từ xuất hiện nhiều nhất trong corpus (giống max_features của sklearn)
+            terms = sorted(sorted(terms, key=lambda t: -totals[t])[:self.max_features])
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.df = np.zeros(len(terms), dtype=np.int64)
+        self.tf = None
+        self.rows = np.zeros(0, dtype=np.int32)
+        self._add_rows(docs, rows)
+        self.intent_hashes = [_sha1(intent.get('patterns', [])) for intent in intents]
+        self.source = 'fitted'
+        self._save()
+
+    def append(self, intents: Sequence[dict], start: int):
+        """Nối thêm hàng cho các intent mới (chỉ số intent bắt đầu từ start), mở rộng vocabulary nếu cần"""
+        docs, rows = self._analyze(intents, start)
+        for tokens in docs:
+            for t in tokens:
+                if t not in self.vocab:
+                    self.vocab[t] = len(self.terms)
+                    self.terms.append(t)
+        self._add_rows(docs, rows)
+        self.intent_hashes = self.intent_hashes + [_sha1(intent.get('patterns', [])) for intent in intents]
+        self.source = 'appended'
+        self._save()
+
+    def _analyze(self, intents: Sequence[dict], start: int):
+        docs, rows = [], []
+        for i, intent in enumerate(intents, start):
+            for pattern in intent.get('patterns', []):
+                docs.append(self.analyzer(pattern))
+                rows.append(i)
+        return docs, rows
+
+    def _add_rows(self, docs: List[List[str]], rows: List[int]):
+        n_terms = len(self.terms)
+        indptr, indices, data = [0], [], []
+        for tokens in docs:
+            counts = Counter(self.vocab[t] for t in tokens if t in self.vocab)
+            for col in sorted(counts):
+                indices.append(col)
+                data.append(counts[col])
+            indptr.append(len(indices))
+        new = sparse.csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32),
+                                 np.asarray(indptr, dtype=np.int32)), shape=(len(docs), n_terms))
+        if self.df.shape[0] < n_terms:
+            self.df = np.concatenate([self.df, np.zeros(n_terms - self.df.shape[0], dtype=np.int64)])
+        self.df = self.df + np.bincount(new.indices, minlength=n_terms)
+        if self.tf is None:
+            self.tf = new
+        else:
+            old = sparse.csr_matrix((self.tf.data, self.tf.indices, self.tf.indptr), shape=(self.tf.shape[0], n_terms))
+            self.tf = sparse.vstack([old, new], format='csr')
+        self.rows = np.concatenate([self.rows, np.asarray(rows, dtype=np.int32)])
+        self._refresh_weights()
+
+    def _refresh_weights(self):
+        # smooth idf: ln((1 + n) / (1 + df)) + 1; chuẩn hoá L2 theo hàng
+        n = self.n_rows
+        self.idf = np.log((1.0 + n) / (1.0 + self.df)) + 1.0
+        weighted_sq = self.tf.multiply(self.tf).dot(self.idf ** 2) if n else np.zeros(0)
+        self.row_norms = np.sqrt(np.asarray(weighted_sq, dtype=np.float64)).ravel()
+
+    # ----- query -----
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity giữa câu hỏi và từng pattern (một phần tử / hàng)"""
+        counts = Counter(self.vocab[t] for t in self.analyzer(text) if t in self.vocab)
+        if not counts or self.n_rows == 0:
+            return np.zeros(self.n_rows)
+        q = np.zeros(len(self.terms))
+        for col, c in counts.items():
+            q[col] = c * self.idf[col]
+        q /= np.linalg.norm(q)
+        dots = self.tf.dot(q * self.idf)
+        norms = np.where(self.row_norms > 0, self.row_norms, 1.0)
+        return dots / norms
+
+    # ----- persistence -----
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _load(self) -> bool:
+        if not self.cache_dir:
+            return False
+        try:
+            with open(self._path(MANIFEST), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('params_key') != self.params_key:
+                return False
+            with open(self._path(VOCAB), 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+            arrays = {name: np.load(self._path(f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+            indptr = arrays['indptr']
+            n_rows = len(indptr) - 1
+            # File đang được process khác ghi dở / không khớp nhau -> bỏ qua, fit lại
+            if not (len(terms) == manifest.get('n_terms') == len(arrays['df'])
+                    and n_rows == manifest.get('n_rows') == len(arrays['rows'])
+                    and len(indptr) > 0 and indptr[0] == 0
+                    and len(arrays['data']) == len(arrays['indices']) == indptr[-1]):
+                return False
+            tf = sparse.csr_matrix((arrays['data'], arrays['indices'], indptr),
+                                   shape=(n_rows, len(terms)), copy=False)
+        except Exception:
+            return False
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.tf = tf
+        self.df = np.asarray(arrays['df'])
+        self.rows = arrays['rows']
+        self.intent_hashes = manifest['intent_hashes']
+        self._refresh_weights()
+        return True
+
+    def _save(self):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            arrays = {'data': self.tf.data.astype(np.float32), 'indices': self.tf.indices.astype(np.int32),
+                      'indptr': self.tf.indptr.astype(np.int32), 'df': self.df, 'rows': self.rows}
+            for name, array in arrays.items():
+                atomic_save_npy(self._path(f'{name}.npy'), np.ascontiguousarray(array))
+            for name, payload in ((VOCAB, self.terms), (MANIFEST, {
+                'params_key': self.params_key, 'intent_hashes': self.intent_hashes,
+                'n_rows': self.n_rows, 'n_terms': len(self.terms)})):
+                tmp = self._path(name + '.tmp')
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp, self._path(name))
+        except OSError as e:
+            print(f"[TF-IDF] could not persist artifact to {self.cache_dir}: {e}")
+
+
+def default_cache_dir(knowledge_base_path: str, name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(knowledge_base_path)), '.tfidf_cache', name)
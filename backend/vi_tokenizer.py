@@ -0,0 +1,101 @@
+"""
+Tokenizer tiếng Việt cho nhánh TF-IDF: tách âm tiết bằng regex rồi gộp từ ghép
+("học phí" -> "học_phí", "ký túc xá" -> "ký_túc_xá") theo từ điển trong bundle
+data/nlp_resources.json, so khớp dài nhất trên trie âm tiết dựng một lần lúc khởi tạo.
+
+Câu đã tách được giữ trong LRU cache (theo chuỗi gốc): pattern của KB và các câu hỏi lặp lại
+không phải tách lại. Kích thước cache: VI_TOKENIZER_CACHE (mặc định 4096, 0 = tắt).
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .nlp_resources import load_resources
+
+CACHE_SIZE = int(os.getenv('VI_TOKENIZER_CACHE', '4096'))
+JOINER = '_'
+_END = None  # khoá đánh dấu hết một từ ghép trong trie (âm tiết không bao giờ là None)
+
+
+def compile_trie(compounds: Iterable[str]) -> Dict:
+    """Trie lồng dict theo âm tiết: {'học': {'phí': {None: True}, ...}, ...}"""
+    trie: Dict = {}
+    for phrase in compounds:
+        node = trie
+        for syllable in unicodedata.normalize('NFC', phrase).lower().split():
+            node = node.setdefault(syllable, {})
+        node[_END] = True
+    return trie
+
+
+class ViTokenizer:
+    """
+    Args:
+        compounds: Danh sách từ ghép (mặc định: compounds.vi trong bundle)
+        stop_words: Stopword bỏ đi (chỉ áp dụng cho âm tiết đơn và từ ghép nguyên cụm)
+        pattern: Regex tách âm tiết (mặc định: tokenizer.pattern trong bundle)
+        min_length: Độ dài tối thiểu của âm tiết đơn (từ ghép luôn giữ, vd "gợi_ý")
+        keep_syllables: Giữ cả âm tiết của từ ghép ("học_phí", "học", "phí") để câu hỏi
+            chỉ khớp một phần vẫn còn điểm; từ ghép khớp đủ cho điểm cao hơn
+        cache_size: Số câu giữ trong LRU cache
+    """
+
+    def __init__(self, compounds: Optional[Iterable[str]] = None, stop_words: FrozenSet[str] = frozenset(),
+                 pattern: Optional[str] = None, min_length: Optional[int] = None,
+                 keep_syllables: bool = True, cache_size: int = CACHE_SIZE):
+        resources = load_resources()
+        config = resources['tokenizer']
+        if compounds is None:
+            compounds = resources.get('compounds', {}).get('vi', [])
+        self.compounds = sorted(set(compounds))
+        self.trie = compile_trie(self.compounds)
+        self.stop_words = frozenset(stop_words)
+        self.pattern = pattern or config['pattern']
+        self.min_length = config.get('min_length', 1) if min_length is None else min_length
+        self.keep_syllables = keep_syllables
+        self._syllable_re = re.compile(self.pattern)
+        self._cached = lru_cache(maxsize=cache_size)(self._tokenize) if cache_size else self._tokenize
+
+    @property
+    def signature(self) -> dict:
+        """Mô tả tokenizer để đưa vào khoá cache TF-IDF (đổi từ điển -> fit lại)"""
+        digest = hashlib.sha1('\n'.join(self.compounds).encode('utf-8')).hexdigest()
+        return {'tokenizer': 'vi_tokenizer', 'pattern': self.pattern, 'min_length': self.min_length,
+                'keep_syllables': self.keep_syllables, 'compounds': digest}
+
+    def __call__(self, text: str) -> List[str]:
+        return list(self._cached(text))
+
+    def cache_info(self):
+        return self._cached.cache_info() if hasattr(self._cached, 'cache_info') else None
+
+    def segment(self, syllables: List[str]) -> List[str]:
+        """Gộp âm tiết thành từ ghép, ưu tiên cụm dài nhất có trong từ điển"""
+        tokens = []
+        i, n = 0, len(syllables)
+        while i < n:
+            node, end = self.trie, i
+            j = i
+            while j < n and syllables[j] in node:
+                node = node[syllables[j]]
+                j += 1
+                if _END in node:
+                    end = j
+            if end > i + 1:
+                tokens.append(JOINER.join(syllables[i:end]))
+                if self.keep_syllables:
+                    tokens.extend(syllables[i:end])
+                i = end
+            else:
+                tokens.append(syllables[i])
+                i += 1
+        return tokens
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        # NFC: bàn phím macOS / iOS gửi chữ có dấu dạng tổ hợp (NFD)
+        syllables = self._syllable_re.findall(unicodedata.normalize('NFC', text).lower())
+        return tuple(t for t in self.segment(syllables)
+                     if t not in self.stop_words and (JOINER in t or len(t) >= self.min_length))
@@ -0,0 +1,167 @@
+"""
+Write-behind queue cho các bản ghi ghi sau khi đã trả response
+(log ChatbotInteraction, ...). Request chỉ đẩy dict vào hàng đợi trong RAM;
+một thread nền gom thành batch và ghi bằng một lệnh INSERT executemany mỗi
+bảng, nên request không còn chờ commit và SQLite không bị khoá theo từng lượt chat.
+
+Cấu hình:
+    WRITE_QUEUE_BATCH     số bản ghi tối đa mỗi batch (mặc định 200)
+    WRITE_QUEUE_FLUSH_MS  thời gian chờ tối đa trước khi ghi batch (mặc định 500)
+    WRITE_QUEUE_MAX       sức chứa hàng đợi; đầy thì request ghi trực tiếp (backpressure)
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Báo cho thread nền flush ngay
+_FLUSH = object()
+
+
+class WriteBehindQueue:
+    """
+    Args:
+        app: Flask app (thread nền cần app_context để dùng db); có thể gắn sau bằng init_app()
+        db: Flask-SQLAlchemy instance
+    """
+
+    def __init__(self, app=None, db=None, max_batch: Optional[int] = None, flush_ms: Optional[float] = None,
+                 max_size: Optional[int] = None):
+        self.app = app
+        self.db = db
+        self.max_batch = max_batch or int(os.getenv('WRITE_QUEUE_BATCH', '200'))
+        self.flush_interval = (flush_ms if flush_ms is not None else float(os.getenv('WRITE_QUEUE_FLUSH_MS', '500'))) / 1000.0
+        self.max_size = max_size or int(os.getenv('WRITE_QUEUE_MAX', '10000'))
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.overflow = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._idle = threading.Event()
+        self._idle.set()
+        atexit.register(self.close)
+
+    def init_app(self, app):
+        self.app = app
+
+    def _ensure_worker(self):
+        # Thread nền tạo lười theo từng process (thread của master không sống qua fork)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.max_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, model, **values):
+        """Đưa một bản ghi của model (db.Model) vào hàng đợi ghi"""
+        if self.app.config.get('TESTING'):
+            # Khi test ghi trực tiếp để kết quả thấy được ngay trong cùng session
+            self._write({model: [values]})
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((model, values))
+        except queue.Full:
+            # Backpressure: hàng đợi đầy thì request tự ghi (chậm hơn nhưng không mất dữ liệu)
+            self.overflow += 1
+            self._write({model: [values]})
+            return
+        self.enqueued += 1
+        self._idle.clear()
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._idle.set()
+                continue
+            pending: Dict[object, List[dict]] = defaultdict(list)
+            count = 0
+            deadline = time.monotonic() + self.flush_interval
+            item = first
+            while True:
+                if item is not _FLUSH:
+                    pending[item[0]].append(item[1])
+                    count += 1
+                    if count < self.max_batch:
+                        remaining = deadline - time.monotonic()
+                        if remaining > 0:
+                            try:
+                                item = self._queue.get(timeout=remaining)
+                                continue
+                            except queue.Empty:
+                                pass
+                break
+            if pending:
+                self._write(pending)
+            if self._queue.empty():
+                self._idle.set()
+
+    def _write(self, pending: Dict[object, List[dict]]):
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                for model, rows in pending.items():
+                    # Một INSERT với list tham số -> executemany
+                    self.db.session.execute(model.__table__.insert(), rows)
+                self.db.session.commit()
+                self.written += sum(len(rows) for rows in pending.values())
+                self.batches += 1
+            except Exception as e:
+                self.db.session.rollback()
+                self.failed += sum(len(rows) for rows in pending.values())
+                print(f"[write-queue] batch failed: {e}")
+            finally:
+                self.db.session.remove()
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Chờ tới khi mọi bản ghi đang đợi đã được ghi. Trả về False nếu quá timeout"""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            pass
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.empty() and self._idle.wait(0.05):
+                return True
+        return False
+
+    def close(self):
+        """Drain hàng đợi khi tắt process (atexit / gunicorn worker_exit)"""
+        if self._thread is not None and self._pid == os.getpid() and not self._queue.empty():
+            print(f"[write-queue] draining {self._queue.qsize()} pending writes")
+            self.flush()
+
+    def stats(self) -> dict:
+        depth = self._queue.qsize()
+        return {
+            'depth': depth,
+            'capacity': self.max_size,
+            'fill_ratio': round(depth / self.max_size, 4) if self.max_size else 0.0,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'avg_batch': round(self.written / self.batches, 1) if self.batches else 0,
+            'failed': self.failed,
+            'overflow': self.overflow,
+            'last_flush_ms': self.last_flush_ms,
+        }
@@ -0,0 +1,74 @@
+"""
+Benchmark đóng gói context cho prompt RAG: số token đầu vào trước / sau khi pack
+và tỉ lệ câu hỏi vẫn giữ được chunk đúng (recall) trong prompt.
+Câu hỏi lấy từ các pattern của intents; chunk đúng là chunk của intent đó.
+Chạy:
+    python bench_context_packing.py                 # model embedding thật
+    python bench_context_packing.py --fake          # HashingEncoder, không cần tải model
+    python bench_context_packing.py --budget 800 -k 5
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.llm_provider import answer_max_tokens, create_rag_prompt, estimate_tokens, pack_context
+from backend.rag_engine import RAGEngine
+
+
+def naive_prompt_tokens(query, docs):
+    """Prompt kiểu cũ: nối nguyên văn mọi chunk"""
+    context = "\n".join(f"[Tài liệu {i}]\n{doc}\n" for i, (doc, _, _) in enumerate(docs, 1))
+    return estimate_tokens(context) + estimate_tokens(query)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kb', default=os.path.join('data', 'chatbot_knowledge_new.json'))
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--budget', type=int, default=int(os.getenv('RAG_PROMPT_BUDGET', '1200')))
+    parser.add_argument('--fake', action='store_true', help='Dùng HashingEncoder thay cho model thật')
+    args = parser.parse_args()
+
+    encoder = None
+    tmp = None
+    kb_path = args.kb
+    if args.fake:
+        from backend.embedding_service import HashingEncoder
+        encoder = HashingEncoder()
+        # Cache riêng để không ghi đè cache của model thật
+        tmp = tempfile.mkdtemp()
+        kb_path = shutil.copy(args.kb, os.path.join(tmp, 'kb.json'))
+    rag = RAGEngine(kb_path, encoder=encoder)
+
+    with open(kb_path, 'r', encoding='utf-8') as f:
+        intents = json.load(f).get('intents', [])
+    questions = [(p, it['tag']) for it in intents for p in it.get('patterns', [])[:3]]
+
+    before = after = kept_before = kept_after = out_tokens = 0
+    for query, tag in questions:
+        docs = rag.retrieve(query, top_k=args.k)
+        packed = pack_context(query, docs, args.budget)
+        before += naive_prompt_tokens(query, docs)
+        after += estimate_tokens(create_rag_prompt(query, docs, args.budget)) - estimate_tokens(
+            create_rag_prompt(query, [], args.budget)) + estimate_tokens(query)
+        kept_before += any(m.get('tag') == tag for _, m, _ in docs)
+        kept_after += any(m.get('tag') == tag for _, m, _ in packed)
+        out_tokens += answer_max_tokens(query)
+
+    n = max(len(questions), 1)
+    print(f"questions={len(questions)} top_k={args.k} budget={args.budget}")
+    print(f"{'':<22}{'naive':>10}{'packed':>10}")
+    print(f"{'avg input tokens':<22}{before / n:>10.0f}{after / n:>10.0f}  ({100 * (1 - after / max(before, 1)):.0f}% fewer)")
+    print(f"{'recall (gold chunk)':<22}{kept_before / n:>10.3f}{kept_after / n:>10.3f}")
+    print(f"{'avg max_tokens':<22}{500:>10}{out_tokens / n:>10.0f}")
+    if tmp:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
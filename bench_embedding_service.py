@@ -0,0 +1,102 @@
+"""
+Benchmark: encode query in-process (batch-size-1) vs qua embedding service (micro-batch)
+Chạy:
+    python bench_embedding_service.py                 # HashingEncoder mô phỏng 8ms/forward pass
+    python bench_embedding_service.py --real          # dùng model SBERT thật
+    python bench_embedding_service.py --clients 32 --requests 20
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.embedding_service import EmbeddingClient, EmbeddingServer, HashingEncoder
+
+QUERIES = [
+    "Điểm chuẩn ngành Khoa học máy tính năm 2024 là bao nhiêu?",
+    "Học phí của trường ICTU",
+    "Địa chỉ trường đại học",
+    "Ngành nào có điểm chuẩn cao nhất?",
+    "Tổ hợp xét tuyển A00 gồm những môn nào?",
+]
+
+
+def run_load(encode_fn, clients: int, requests_per_client: int):
+    """Mỗi client gửi tuần tự các query; trả về (latencies_ms, tổng thời gian)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(cid):
+        local = []
+        for i in range(requests_per_client):
+            q = QUERIES[(cid + i) % len(QUERIES)]
+            t0 = time.perf_counter()
+            encode_fn([q])
+            local.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies), time.perf_counter() - start
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:<28} p50={np.percentile(latencies, 50):8.2f}ms  "
+          f"p99={np.percentile(latencies, 99):8.2f}ms  "
+          f"throughput={len(latencies) / elapsed:8.1f} q/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=25)
+    parser.add_argument('--overhead-ms', type=float, default=8.0,
+                        help='Độ trễ cố định mỗi forward pass của encoder giả lập')
+    parser.add_argument('--max-wait-ms', type=float, default=3.0)
+    parser.add_argument('--real', action='store_true', help='Dùng SentenceTransformer thật')
+    args = parser.parse_args()
+
+    if args.real:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer('keepitreal/vietnamese-sbert')
+    else:
+        model = HashingEncoder(call_overhead_ms=args.overhead_ms)
+
+    print(f"clients={args.clients} requests/client={args.requests}")
+
+    # In-process: một model, các request thread encode riêng lẻ và tuần tự hoá
+    # quanh model (giống một worker gunicorn chỉ có một bản model)
+    model_lock = threading.Lock()
+
+    def in_process(texts):
+        with model_lock:
+            return model.encode(texts, convert_to_numpy=True)
+
+    lat, elapsed = run_load(in_process, args.clients, args.requests)
+    report('in-process (batch=1)', lat, elapsed)
+
+    server = EmbeddingServer(model, port=0, max_wait_ms=args.max_wait_ms)
+    server.start_background()
+    try:
+        client = EmbeddingClient(server.url)
+        client.encode(['warmup'])
+        lat, elapsed = run_load(client.encode, args.clients, args.requests)
+        report('embedding service (batched)', lat, elapsed)
+        print(f"batcher: {server.batcher.stats()}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark các loại FAISS index cho RAGEngine: recall@k so với Flat, QPS và bộ nhớ
+Chạy:
+    python bench_rag_index.py                                   # 20k vector tổng hợp, dim 384
+    python bench_rag_index.py --n 100000 --factories Flat HNSW32 IVF1024,Flat IVF1024,PQ48
+    python bench_rag_index.py --nprobe 1 8 32 --ef-search 16 64 128
+    python bench_rag_index.py --kb data/chatbot_knowledge_new.json   # vector thật từ SBERT
+
+Chọn giá trị cho deployment bằng biến môi trường:
+    RAG_INDEX_FACTORY=HNSW32  RAG_EF_SEARCH=64
+    RAG_INDEX_FACTORY=IVF256,PQ32  RAG_NPROBE=16
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import faiss
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Vector có cấu trúc cụm (gần với embedding thật hơn nhiễu đều)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, clusters, n)
+    x = centers[assign] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(x)
+    return x
+
+
+def kb_vectors(kb_path: str) -> np.ndarray:
+    from backend.rag_engine import RAGEngine
+    rag = RAGEngine(kb_path)
+    x = rag.model.encode(list(rag.documents), convert_to_numpy=True).astype(np.float32)
+    faiss.normalize_L2(x)
+    return x
+
+
+def build(factory: str, xb: np.ndarray):
+    index = faiss.index_factory(xb.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    t0 = time.perf_counter()
+    if not index.is_trained:
+        index.train(xb)
+    index.add(xb)
+    return index, time.perf_counter() - t0
+
+
+def search_params(index, nprobe=None, ef_search=None):
+    if nprobe and faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+def measure(index, xq, k, gt, params):
+    t0 = time.perf_counter()
+    _, labels = index.search(xq, k, params=params)
+    elapsed = time.perf_counter() - t0
+    recall = np.mean([len(set(labels[i]) & set(gt[i])) / k for i in range(len(xq))])
+    return recall, len(xq) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=20000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--factories', nargs='+', default=['Flat', 'HNSW32', 'IVF256,Flat', 'IVF256,PQ32'])
+    parser.add_argument('--nprobe', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--ef-search', nargs='+', type=int, default=[16, 64, 128])
+    parser.add_argument('--kb', help='Dùng embedding thật của knowledge base này')
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    if args.kb:
+        xb = kb_vectors(args.kb)
+    else:
+        xb = synthetic_vectors(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    xq = xb[rng.integers(0, len(xb), args.queries)] + 0.05 * rng.standard_normal((args.queries, xb.shape[1])).astype(np.float32)
+    xq = np.ascontiguousarray(xq, dtype=np.float32)
+    faiss.normalize_L2(xq)
+
+    flat = faiss.IndexFlatIP(xb.shape[1])
+    flat.add(xb)
+    _, gt = flat.search(xq, args.k)
+
+    print(f"vectors={len(xb)} dim={xb.shape[1]} queries={len(xq)} k={args.k} threads={args.threads}")
+    print(f"{'index':<16}{'param':<14}{'recall@k':>10}{'QPS':>12}{'memory MB':>12}{'build s':>10}")
+    for factory in args.factories:
+        try:
+            index, build_s = build(factory, xb)
+        except RuntimeError as e:
+            print(f"{factory:<16}skipped: {str(e).splitlines()[0]}")
+            continue
+        memory_mb = faiss.serialize_index(index).nbytes / 1e6
+        if faiss.try_extract_index_ivf(index) is not None:
+            sweep = [(f"nprobe={p}", search_params(index, nprobe=p)) for p in args.nprobe]
+        elif isinstance(index, faiss.IndexHNSW):
+            sweep = [(f"efSearch={e}", search_params(index, ef_search=e)) for e in args.ef_search]
+        else:
+            sweep = [('-', None)]
+        for label, params in sweep:
+            recall, qps = measure(index, xq, args.k, gt, params)
+            print(f"{factory:<16}{label:<14}{recall:>10.3f}{qps:>12.0f}{memory_mb:>12.1f}{build_s:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
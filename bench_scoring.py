@@ -0,0 +1,88 @@
+"""
+Benchmark chấm điểm gợi ý ngành: vòng lặp Python cũ (calculate_match_score cho từng ngành)
+so với backend/scoring.py, từng học sinh và theo lô (ngày tư vấn: hàng nghìn học sinh).
+Ngành / điểm chuẩn sinh ngẫu nhiên từ tên ngành mẫu, không cần database.
+Chạy:
+    python bench_scoring.py
+    python bench_scoring.py --programs 300 --students 5000 -k 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.scoring import INTEREST_KEYWORDS, SKILL_KEYWORDS, MatchScorer, preference_counts, top_k
+
+NAMES = ['Công nghệ thông tin', 'Kỹ thuật phần mềm', 'Quản trị kinh doanh', 'Thiết kế đồ họa',
+         'Tài chính ngân hàng', 'Khoa học dữ liệu', 'Kỹ thuật điện tử', 'Marketing số', 'Kế toán',
+         'Truyền thông đa phương tiện', 'Thương mại điện tử', 'Công nghệ kỹ thuật ô tô', 'Luật kinh tế']
+
+
+def legacy_rank(names, cutoffs, total, interests, skills, k):
+    """Cách cũ: lọc theo điểm chuẩn, vòng lặp từ khoá cho từng ngành, sort toàn bộ"""
+    rows = []
+    for i, (name, cutoff) in enumerate(zip(names, cutoffs)):
+        if cutoff > total:
+            continue
+        diff = total - cutoff
+        points = 40 if diff >= 3 else 35 if diff >= 1.5 else 30 if diff >= 0.5 else 25
+        for values, table in ((interests, INTEREST_KEYWORDS), (skills, SKILL_KEYWORDS)):
+            hits = 0
+            for value in values:
+                for keyword in table.get(value.lower(), []):
+                    if keyword in name.lower():
+                        hits += 10
+                        break
+            points += min(hits, 30)
+        rows.append((points, i))
+    rows.sort(key=lambda r: r[0], reverse=True)
+    return [i for _, i in rows[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--programs', type=int, default=200)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"{rng.choice(NAMES)} {i}" for i in range(args.programs)]
+    cutoffs = [round(rng.uniform(15, 28), 2) for _ in names]
+    students = [(round(rng.uniform(15, 30), 2), rng.sample(list(INTEREST_KEYWORDS), rng.randint(1, 3)),
+                 rng.sample(list(SKILL_KEYWORDS), rng.randint(0, 2))) for _ in range(args.students)]
+
+    start = time.perf_counter()
+    legacy = [legacy_rank(names, cutoffs, *s, args.k) for s in students]
+    t_legacy = time.perf_counter() - start
+
+    scorer = MatchScorer(names, cutoffs)
+    start = time.perf_counter()
+    single = []
+    for total, interests, skills in students:
+        mask = np.flatnonzero(scorer.cutoffs <= total)
+        single.append(mask[top_k(scorer.score(total, interests, skills)[mask], args.k)].tolist())
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranked, _, _ = scorer.recommend_batch(
+        np.array([s[0] for s in students]),
+        np.stack([preference_counts(s[1], INTEREST_KEYWORDS) for s in students]),
+        np.stack([preference_counts(s[2], SKILL_KEYWORDS) for s in students]), k=args.k)
+    t_batch = time.perf_counter() - start
+    batch = [[i for i in row if i >= 0] for row in ranked.tolist()]
+
+    print(f"programs={args.programs} students={args.students} k={args.k}")
+    print(f"{'':<14}{'seconds':>10}{'students/s':>14}{'same top-k':>12}")
+    for name, elapsed, result in (('legacy loop', t_legacy, legacy), ('vector', t_single, single),
+                                  ('vector batch', t_batch, batch)):
+        print(f"{name:<14}{elapsed:>10.3f}{args.students / elapsed:>14,.0f}{str(result == legacy):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark tokenizer của nhánh TF-IDF: regex + stopword (cũ) so với vi_tokenizer
+(gộp từ ghép bằng trie, có / không LRU cache).
+- Tốc độ: token/giây khi tách toàn bộ pattern + câu hỏi mẫu, lặp nhiều vòng
+  (câu hỏi thật lặp lại nhiều, nên vòng sau đi qua cache).
+- Chất lượng: (1) câu hỏi có nhãn intent (LABELLED, cho KB mặc định), đúng nếu pattern
+  gần nhất thuộc intent mong đợi; (2) leave-one-out trên pattern của KB, bỏ từng pattern
+  khỏi index rồi hỏi lại bằng chính nó.
+Chạy:
+    python bench_tokenizer.py
+    python bench_tokenizer.py --kb data/chatbot_knowledge.json --rounds 50
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.nlp_resources import stopwords, tokenize
+from backend.tfidf_store import TfidfIndex
+from backend.vi_tokenizer import ViTokenizer
+
+# Câu hỏi diễn đạt lại -> intent mong đợi trong data/chatbot_knowledge_new.json
+LABELLED = [
+    ('Học phí ngành công nghệ thông tin bao nhiêu', 'tuition_it_major'),
+    ('học phí công nghệ truyền thông', 'tuition_media'),
+    ('ngành kinh tế số học phí thế nào', 'tuition_media'),
+    ('học phí thiết kế đồ họa một năm', 'tuition_design'),
+    ('chi phí học tập mỗi kỳ', 'tuition'),
+    ('trường có học bổng không', 'scholarship'),
+    ('hồ sơ học bổng', 'scholarship'),
+    ('tiêu chí xét học bổng', 'scholarship'),
+    ('giảm học phí cho sinh viên', 'scholarship'),
+    ('chính sách hỗ trợ sinh viên khó khăn', 'scholarship'),
+    ('điều kiện xét tuyển vào trường', 'admission_criteria'),
+    ('điểm chuẩn năm nay', 'admission_criteria'),
+    ('hồ sơ đăng ký nhập học gồm gì', 'application_process'),
+    ('ký túc xá cho sinh viên', 'dormitory'),
+    ('nhà ở sinh viên giá bao nhiêu', 'dormitory'),
+    ('chỗ ở cho tân sinh viên', 'dormitory'),
+    ('cơ hội việc làm sau khi ra trường', 'career_prospects'),
+    ('học phí thạc sĩ', 'tuition_postgraduate'),
+    ('học phí chương trình liên kết quốc tế', 'tuition_international'),
+    ('học phí quản trị kinh doanh', 'tuition_business'),
+    ('các chuyên ngành đào tạo của trường', 'programs'),
+    ('học phí năm 2025 là bao nhiêu', 'tuition_2025'),
+    ('xin chào', 'greeting'),
+    ('tạm biệt, hẹn gặp lại', 'goodbye'),
+]
+
+QUERIES = [
+    'Học phí ngành CNTT năm 2024 là bao nhiêu?',
+    'điểm chuẩn ngành công nghệ thông tin',
+    'Ký túc xá có còn chỗ không',
+    'Cơ hội việc làm sau khi tốt nghiệp ngành kinh tế',
+    'Tôi muốn xét tuyển bằng học bạ thì cần hồ sơ gì',
+    'học bổng cho tân sinh viên',
+]
+
+
+def baseline(stop_words):
+    """Tokenizer cũ của ChatbotEngine v1: bỏ ký tự lạ rồi regex + stopword"""
+    def analyzer(text):
+        return tokenize(re.sub(r'[^a-zA-ZÀ-ỹ\s]', ' ', text), stop_words)
+    return analyzer
+
+
+def throughput(analyzer, texts, rounds):
+    n_tokens = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            n_tokens += len(analyzer(text))
+    elapsed = time.perf_counter() - start
+    return len(texts) * rounds / elapsed, n_tokens / elapsed
+
+
+def labelled_accuracy(analyzer, intents):
+    tags = [intent.get('tag') for intent in intents]
+    index = TfidfIndex(None, analyzer).load_or_build(intents)
+    hits = 0
+    for query, tag in LABELLED:
+        scores = index.scores(query)
+        hits += bool(scores.size and scores.max() > 0 and tags[index.rows[int(np.argmax(scores))]] == tag)
+    return hits / len(LABELLED)
+
+
+def leave_one_out(analyzer, intents):
+    hits = total = 0
+    for i, intent in enumerate(intents):
+        for j, pattern in enumerate(intent.get('patterns', [])):
+            rest = intent['patterns'][:j] + intent['patterns'][j + 1:]
+            held_out = intents[:i] + [dict(intent, patterns=rest)] + intents[i + 1:]
+            index = TfidfIndex(None, analyzer).load_or_build(held_out)
+            scores = index.scores(pattern)
+            total += 1
+            hits += bool(scores.size and scores.max() > 0 and index.rows[int(np.argmax(scores))] == i)
+    return hits / max(total, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kb', default=os.path.join('data', 'chatbot_knowledge_new.json'))
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.kb, 'r', encoding='utf-8') as f:
+        intents = json.load(f).get('intents', [])
+    texts = [p for it in intents for p in it.get('patterns', [])] + QUERIES
+    stop_words = stopwords(('en', 'vi'))
+
+    candidates = [
+        ('regex (old)', baseline(stop_words)),
+        ('vi_tokenizer', ViTokenizer(stop_words=stop_words, cache_size=0)),
+        ('vi_tokenizer+lru', ViTokenizer(stop_words=stop_words)),
+    ]
+    print(f"kb={args.kb} intents={len(intents)} texts={len(texts)} rounds={args.rounds}")
+    for query in QUERIES[:2]:
+        print(f"  {query!r}\n    old: {candidates[0][1](query)}\n    new: {candidates[1][1](query)}")
+    labelled = {intent.get('tag') for intent in intents} >= {tag for _, tag in LABELLED}
+    print(f"{'':<20}{'texts/s':>12}{'tokens/s':>12}{'labelled':>10}{'LOO top-1':>11}")
+    for name, analyzer in candidates:
+        rate = throughput(analyzer, texts, args.rounds)
+        accuracy = f"{labelled_accuracy(analyzer, intents):.3f}" if labelled else '-'
+        print(f"{name:<20}{rate[0]:>12,.0f}{rate[1]:>12,.0f}{accuracy:>10}{leave_one_out(analyzer, intents):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
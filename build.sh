@@ -4,8 +4,8 @@
 echo "Installing dependencies..."
 pip install -r requirements.txt
 
-echo "Downloading NLTK data..."
-python download_nltk_data.py
+echo "Building NLP resource bundle (stopwords, tokenizer)..."
+python build_nlp_resources.py
 
 echo "Setting up database..."
 python -c "from backend.database import init_db; init_db()"
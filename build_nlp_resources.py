@@ -0,0 +1,118 @@
+"""
+Tạo bundle tài nguyên NLP cho chatbot TF-IDF: data/nlp_resources.json
+(stopword tiếng Việt + tiếng Anh, từ ghép tiếng Việt, cấu hình tokenizer). Chạy offline, kết quả
+xác định (cùng input -> cùng file), nên có thể commit bundle và chạy lại ở bước build.
+Chạy:
+    python build_nlp_resources.py                          # ghi data/nlp_resources.json
+    python build_nlp_resources.py --extra my_stopwords.txt # thêm stopword (mỗi dòng một từ)
+    python build_nlp_resources.py --compounds my_terms.txt # thêm từ ghép (mỗi dòng một cụm)
+    python build_nlp_resources.py --check                  # báo lỗi nếu bundle đã lỗi thời
+"""
+import argparse
+import json
+import os
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.nlp_resources import RESOURCE_PATH
+
+VERSION = 2
+
+# Hư từ / từ chức năng tiếng Việt thường gặp trong câu hỏi tuyển sinh
+VI_STOPWORDS = """
+à ạ anh ấy bạn bằng bị bởi cả các cái cho chiếc chứ chưa có còn của cũng cùng
+đã đang đây để đến đều do đó được hãy hoặc họ khi không là lại lúc mà mình
+mỗi một này nên nếu ngay nhé những như nhưng nữa ơi phải rằng rất rồi sau sẽ
+sự tại tôi thì thế theo trên trong từ và vẫn về vì với vừa xin
+""".split()
+
+# Từ ghép nhiều âm tiết hay gặp trong câu hỏi tuyển sinh; vi_tokenizer gộp thành một token
+# ("học phí" -> "học_phí") để TF-IDF không khớp nhầm "học" / "phí" đứng riêng
+VI_COMPOUNDS = """
+học phí | học bổng | học kỳ | học tập | học sinh | sinh viên | tân sinh viên | năm học | ngành học
+điểm chuẩn | điểm sàn | điểm thi | điểm số | điểm ưu tiên | điểm cộng | điểm tối thiểu
+xét tuyển | xét học bạ | học bạ | trúng tuyển | tuyển sinh | tuyển thẳng | nhập học | thủ tục
+hồ sơ | đăng ký | nguyện vọng | chỉ tiêu | tổ hợp | khối thi | phương thức | điều kiện
+thời hạn | hạn chót | lịch thi | kết quả | giấy tờ | chứng chỉ | tốt nghiệp | trung học phổ thông
+đào tạo | chương trình | chương trình đào tạo | chất lượng cao | liên kết | văn bằng | tín chỉ
+ký túc xá | cơ sở vật chất | thư viện | câu lạc bộ | học viện | đại học | cao đẳng | trường học
+công nghệ | công nghệ thông tin | khoa học máy tính | máy tính | lập trình | trí tuệ nhân tạo
+an toàn thông tin | kỹ thuật | kỹ thuật phần mềm | hệ thống thông tin | dữ liệu | mạng máy tính
+kinh tế | kinh doanh | quản trị kinh doanh | quản lý | tài chính | ngân hàng | kế toán | kiểm toán
+marketing số | thương mại điện tử | ngôn ngữ anh | du lịch | luật kinh tế | kinh tế số
+thiết kế | thiết kế đồ họa | đồ họa | mỹ thuật | truyền thông | đa phương tiện | quốc tế
+sau đại học | thạc sĩ | tiến sĩ | cao học | chuyên ngành | chi phí | chính sách | hỗ trợ | ưu đãi
+quy trình | yêu cầu | đầu vào | tiêu chí | định hướng | nhà ở | chỗ ở | hẹn gặp lại
+nghề nghiệp | việc làm | cơ hội | cơ hội việc làm | công việc | mức lương | triển vọng | ra trường
+tư vấn | gợi ý | phù hợp | quan tâm | sở thích | năng lực | khả năng | xác suất | an toàn
+hướng dẫn | sử dụng | tài khoản | mật khẩu | thông tin | liên hệ | địa chỉ | số điện thoại
+xin chào | chào bạn | cảm ơn | cám ơn | tạm biệt | bao nhiêu | bao giờ | thế nào | làm sao | ở đâu
+""".replace('\n', '|').split('|')
+
+# Tokenizer: chuỗi chữ cái Unicode (gồm chữ có dấu tiếng Việt), bỏ số và dấu câu
+TOKEN_PATTERN = r'[^\W\d_]+'
+
+
+def english_stopwords():
+    # Lấy từ scikit-learn (đã là dependency) để bundle không phụ thuộc dữ liệu nltk tải về
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return ENGLISH_STOP_WORDS
+
+
+def _read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [unicodedata.normalize('NFC', line.strip().lower()) for line in f if line.strip()]
+
+
+def build(extra_path=None, compounds_path=None) -> dict:
+    # Giữ lại từ để hỏi (gì, nào, bao...) và từ có nghĩa trong cụm (chỉ tiêu, điều kiện, việc làm)
+    vi = {unicodedata.normalize('NFC', w) for w in VI_STOPWORDS}
+    if extra_path:
+        vi |= set(_read_lines(extra_path))
+    compounds = {' '.join(unicodedata.normalize('NFC', c).split()) for c in VI_COMPOUNDS if c.strip()}
+    if compounds_path:
+        compounds |= {' '.join(c.split()) for c in _read_lines(compounds_path)}
+    return {
+        'version': VERSION,
+        'stopwords': {
+            'vi': sorted(vi),
+            'en': sorted(english_stopwords()),
+        },
+        'compounds': {'vi': sorted(c for c in compounds if ' ' in c)},
+        'tokenizer': {'pattern': TOKEN_PATTERN, 'min_length': 2},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', default=RESOURCE_PATH)
+    parser.add_argument('--extra', help='File stopword bổ sung, mỗi dòng một từ')
+    parser.add_argument('--compounds', help='File từ ghép bổ sung, mỗi dòng một cụm')
+    parser.add_argument('--check', action='store_true', help='Chỉ kiểm tra bundle hiện có')
+    args = parser.parse_args()
+
+    bundle = build(args.extra, args.compounds)
+    text = json.dumps(bundle, ensure_ascii=False, indent=1, sort_keys=True) + '\n'
+    if args.check:
+        try:
+            with open(args.output, 'r', encoding='utf-8') as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != text:
+            print(f"{args.output} is missing or out of date; run python build_nlp_resources.py")
+            sys.exit(1)
+        print(f"{args.output} is up to date")
+        return
+    tmp = args.output + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, args.output)
+    print(f"wrote {args.output}: vi={len(bundle['stopwords']['vi'])} en={len(bundle['stopwords']['en'])} stopwords, "
+          f"{len(bundle['compounds']['vi'])} compounds")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +0,0 @@
-import nltk
-
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('punkt_tab')
\ No newline at end of file
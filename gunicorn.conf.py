@@ -0,0 +1,56 @@
+"""
+Cấu hình gunicorn cho production
+Chạy: gunicorn -c gunicorn.conf.py backend.app:app
+
+preload_app: app (kèm model embedding + FAISS index) được nạp một lần ở master,
+các worker fork ra dùng chung trang nhớ thay vì mỗi worker tự nạp một bản.
+"""
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('true', '1', 'yes')
+
+# gthread: mỗi worker phục vụ nhiều request bằng thread. Khi LLM_ASYNC=true, các
+# thread chỉ chờ kết quả từ event loop nền (backend/llm_async.py), nên một
+# worker giữ được nhiều lượt chat đang chờ LLM với vài kết nối HTTP keep-alive.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+# Stream SSE có thể kéo dài bằng thời gian sinh câu trả lời
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Index được đọc bằng memory-map để các worker chia sẻ page cache
+os.environ.setdefault('RAG_MMAP_INDEX', 'true')
+# Chatbot được dựng ở master trước khi fork (xem when_ready) để worker dùng chung model
+os.environ.setdefault('CHATBOT_WARMUP', 'eager' if preload_app else 'background')
+
+
+def when_ready(server):
+    # Chạy ở master sau khi nạp app và trước khi fork worker đầu tiên
+    if preload_app and os.environ.get('CHATBOT_WARMUP') == 'eager':
+        from backend.chat import chatbot
+        chatbot.get()
+
+
+def pre_fork(server, worker):
+    # Đưa các object đã nạp vào generation cố định để GC không chạm vào
+    # (tránh copy-on-write toàn bộ heap ở mỗi worker)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Chỉ reset những gì master đã nạp: worker không tự import ML deps ở đây
+    if 'backend.rag_engine' in sys.modules:
+        from backend.rag_engine import after_fork
+        after_fork()
+    if 'backend.chat' in sys.modules:
+        from backend.chat import chatbot
+        chatbot.after_fork()
+
+
+def worker_exit(server, worker):
+    # Ghi nốt log hội thoại còn trong write-behind queue trước khi worker thoát
+    from backend.extensions import write_queue
+    write_queue.close()
@@ -197,25 +197,54 @@ class FloatingChatWidget {
         this.showTypingIndicator();
 
         try {
-            // Send to backend
-            const response = await fetch('/api/chat', {
+            // Stream từ backend (SSE): câu trả lời hiện dần theo từng token
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({ message: message })
             });
+            if (!response.ok || !response.body) {
+                throw new Error(`HTTP ${response.status}`);
+            }
 
-            const data = await response.json();
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let botMessage = null;
+            let answer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const blocks = buffer.split('\n\n');
+                buffer = blocks.pop();
+                for (const block of blocks) {
+                    const event = (block.match(/^event: (.*)$/m) || [])[1];
+                    const dataLine = (block.match(/^data: (.*)$/m) || [])[1];
+                    if (!event || !dataLine) continue;
+                    const data = JSON.parse(dataLine);
+                    if (event === 'token') {
+                        answer += data.text;
+                        if (!botMessage) {
+                            this.removeTypingIndicator();
+                            botMessage = this.addMessage(answer, 'bot');
+                        } else {
+                            botMessage.element.textContent = answer;
+                            botMessage.entry.text = answer;
+                            this.scrollToBottom();
+                        }
+                    } else if (event === 'error') {
+                        answer = data.response;
+                    }
+                }
+            }
 
-            // Remove typing indicator
             this.removeTypingIndicator();
-
-            // Add bot response
-            if (data.response) {
-                this.addMessage(data.response, 'bot');
-            } else {
-                this.addMessage('Xin lỗi, tôi không thể trả lời câu hỏi này lúc này.', 'bot');
+            if (!botMessage) {
+                this.addMessage(answer || 'Xin lỗi, tôi không thể trả lời câu hỏi này lúc này.', 'bot');
             }
         } catch (error) {
             console.error('Chat error:', error);
@@ -257,7 +286,9 @@ class FloatingChatWidget {
         this.scrollToBottom();
 
         // Store message
-        this.messages.push({ text, sender, time: new Date().toISOString() });
+        const entry = { text, sender, time: new Date().toISOString() };
+        this.messages.push(entry);
+        return { element: contentDiv, entry };
     }
 
     showTypingIndicator() {
@@ -1,6 +1,37 @@
 import sys, os
+
+import pytest
+
 # Ensure 'admission_system' directory is on sys.path so 'import backend' works
 TESTS_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(TESTS_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Tạo app riêng với DB SQLite trong tmp_path (không đụng data/admission_system.db)"""
+    from backend.app import create_app
+    from backend.config import Config
+
+    def factory(**overrides):
+        config = type('TestConfig', (Config,), {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + (tmp_path / 'test.db').as_posix(),
+            **overrides,
+        })
+        return create_app(config)
+
+    return factory
+
+
+@pytest.fixture
+def isolated_app(make_app):
+    """App riêng cho mỗi test, đã push app context"""
+    from backend.models import db
+
+    app = make_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
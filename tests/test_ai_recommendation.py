@@ -0,0 +1,63 @@
+"""
+Integration tests for /api/recommend-programs: query count and ranking
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from backend.models import db, AdmissionScore, Program
+
+YEAR = datetime.now().year
+NAMES = ['Kỹ thuật phần mềm', 'Quản trị kinh doanh', 'Thiết kế đồ họa', 'Tài chính ngân hàng', 'Luật']
+PAYLOAD = {'total_score': 26.0, 'interests': ['công nghệ', 'kinh doanh'], 'skills': ['lập trình']}
+
+
+def seed(n, start=0):
+    """n ngành, mỗi ngành có điểm chuẩn 3 năm gần nhất"""
+    for i in range(start, start + n):
+        program = Program(name=f'{NAMES[i % len(NAMES)]} {i}', code=f'REC{i:03d}', description='...')
+        db.session.add(program)
+        db.session.flush()
+        for offset in range(3):
+            db.session.add(AdmissionScore(program_id=program.id, program_name=program.name,
+                                          year=YEAR - offset, admission_score=15 + (i * 7 + offset) % 12))
+    db.session.commit()
+
+
+def count_statements(client):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        data = client.post('/api/recommend-programs', json=PAYLOAD).get_json()['data']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements), data
+
+
+@pytest.mark.integration
+class TestRecommendPrograms:
+    """Test that the endpoint issues a constant number of queries"""
+
+    def test_query_count_is_constant(self, isolated_app):
+        client = isolated_app.test_client()
+        seed(4)
+        small, small_data = count_statements(client)
+        seed(60, start=4)
+        large, large_data = count_statements(client)
+        assert small == large == 1
+        assert small_data['total_matches'] < large_data['total_matches']
+        assert len(large_data['recommendations']) == 10
+        assert all(r['program_info']['code'].startswith('REC') for r in large_data['recommendations'])
+
+    def test_ranked_by_match_score(self, isolated_app):
+        seed(20)
+        _, data = count_statements(isolated_app.test_client())
+        scores = [r['match_score'] for r in data['recommendations']]
+        assert scores == sorted(scores, reverse=True)
+        assert all(r['admission_score'] <= PAYLOAD['total_score'] for r in data['recommendations'])
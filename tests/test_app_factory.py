@@ -0,0 +1,40 @@
+"""
+Tests for the application factory, blueprint layout and import-time budget
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend.app import app as flask_app
+
+# Thời gian tối đa (giây) cho `import backend.app`, không tính khởi động interpreter
+IMPORT_BUDGET = float(os.getenv('IMPORT_BUDGET_SECONDS', '1.0'))
+HEAVY_MODULES = ('torch', 'sentence_transformers', 'faiss', 'sklearn', 'nltk', 'numpy', 'requests')
+
+
+@pytest.mark.unit
+def test_routes_live_in_blueprints():
+    endpoints = {rule.endpoint for rule in flask_app.url_map.iter_rules()}
+    assert {'main.index', 'auth.login', 'chat.chat', 'chat.chat_status', 'admin.admin_dashboard',
+            'advisor.advisor_page', 'advisor.suggest_programs'} <= endpoints
+    assert set(flask_app.blueprints) >= {'main', 'auth', 'chat', 'admin', 'advisor'}
+
+
+@pytest.mark.unit
+def test_import_time_budget():
+    code = ("import time, sys; t = time.perf_counter(); import backend.app; "
+            "print(time.perf_counter() - t); "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    # Lần chạy đầu có thể phải ghi .pyc: lấy lần nhanh nhất trong 2 lần
+    timings = []
+    for _ in range(2):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=120,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert out.returncode == 0, out.stderr
+        elapsed, loaded = out.stdout.splitlines()[-2:]
+        timings.append(float(elapsed))
+        assert loaded == '', f"import backend.app pulled in {loaded}"
+    assert min(timings) < IMPORT_BUDGET, f"import backend.app took {min(timings):.2f}s (budget {IMPORT_BUDGET}s)"
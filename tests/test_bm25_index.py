@@ -0,0 +1,57 @@
+"""
+Unit tests for the BM25 sparse index and reciprocal-rank fusion
+"""
+
+import numpy as np
+import pytest
+from backend.bm25_index import BM25Index, bm25_tokenize
+from backend.rag_engine import reciprocal_rank_fusion
+
+DOCS = [
+    'Ngành Khoa học máy tính (Mã: 7480101) - Tổ hợp xét tuyển: A00, A01, D01',
+    'Ngành Thiết kế đồ họa (Mã: 7210403) - Tổ hợp xét tuyển: H00, V00',
+    'Học phí năm 2024: 12.000.000đ mỗi năm',
+    'Ngành Quản trị kinh doanh (Mã: 7340101) - Tổ hợp xét tuyển: A00, D01',
+]
+
+
+@pytest.mark.unit
+class TestBM25Index:
+    """Test sparse retrieval"""
+
+    def test_tokenizer_keeps_codes(self):
+        """Program and combination codes survive tokenisation"""
+        assert bm25_tokenize('Mã 7480201, tổ hợp A00') == ['mã', '7480201', 'tổ', 'hợp', 'a00']
+
+    def test_exact_code_ranks_first(self):
+        """An exact program code finds its chunk"""
+        index = BM25Index.build(DOCS)
+        rows, scores = index.search('ngành 7210403', top_k=2)
+        assert rows[0] == 1
+        assert scores[0] > 0
+
+    def test_unknown_terms_return_nothing(self):
+        """Queries with no known terms return an empty result"""
+        index = BM25Index.build(DOCS)
+        rows, _ = index.search('zzz', top_k=3)
+        assert len(rows) == 0
+
+    def test_allowed_rows_mask(self):
+        """Rows outside the allowed set are never returned"""
+        index = BM25Index.build(DOCS)
+        rows, _ = index.search('a00 d01', top_k=4, allowed_rows=np.array([3]))
+        assert list(rows) == [3]
+
+    def test_save_and_load(self, tmp_path):
+        """Saved postings reload memory-mapped with identical results"""
+        index = BM25Index.build(DOCS)
+        index.save(str(tmp_path))
+        loaded = BM25Index.load(str(tmp_path))
+        assert loaded.n_docs == len(DOCS)
+        assert list(loaded.search('D01 A00', top_k=4)[0]) == list(index.search('D01 A00', top_k=4)[0])
+
+    def test_reciprocal_rank_fusion(self):
+        """Items ranked well by both lists come first"""
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+        assert [row for row, _ in fused][:2] == [1, 3]
+        assert {row for row, _ in fused} == {1, 2, 3, 4}
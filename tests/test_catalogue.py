@@ -0,0 +1,104 @@
+"""
+Unit tests for the in-memory admissions catalogue snapshot
+"""
+
+import os
+
+import pytest
+from sqlalchemy import event
+
+from backend import advisor as advisor_module
+from backend.catalogue import Catalogue
+from backend.models import db, AdmissionQuota, Department, Program
+
+
+@pytest.fixture
+def app(isolated_app):
+    dept = Department(name='Công nghệ thông tin')
+    db.session.add(dept)
+    db.session.flush()
+    it = Program(name='Kỹ thuật phần mềm', code='CAT01', department_id=dept.id, tuition_fee=25.0)
+    biz = Program(name='Kinh doanh', code='CAT02')
+    new = Program(name='Ngành mới', code='CAT03')
+    db.session.add_all([it, biz, new])
+    db.session.flush()
+    db.session.add_all([
+        AdmissionQuota(program_id=it.id, year=2023, quota=100, minimum_score=22.0),
+        AdmissionQuota(program_id=it.id, year=2024, quota=120, minimum_score=23.5),
+        AdmissionQuota(program_id=biz.id, year=2024, quota=80, minimum_score=20.0),
+    ])
+    db.session.commit()
+    return isolated_app
+
+
+@pytest.fixture
+def catalogue(app, tmp_path, monkeypatch):
+    cat = Catalogue(str(tmp_path / '.catalogue_version'))
+    monkeypatch.setattr(advisor_module, 'catalogue', cat)
+    return cat
+
+
+@pytest.fixture
+def queries(app):
+    """Câu SQL thực thi kể từ lúc gọi start()"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def start():
+        statements.clear()
+        if not event.contains(db.engine, 'before_cursor_execute', record):
+            event.listen(db.engine, 'before_cursor_execute', record)
+        return statements
+
+    yield start
+    if event.contains(db.engine, 'before_cursor_execute', record):
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def by_code(snapshot):
+    return {p['code']: p for p in snapshot.programs}
+
+
+@pytest.mark.unit
+class TestCatalogue:
+    """Test the snapshot contents, zero-query reads and invalidation"""
+
+    def test_snapshot_is_one_query_with_latest_quota(self, catalogue, queries):
+        statements = queries()
+        programs = by_code(catalogue.get())
+        assert len(statements) == 1
+        assert programs['CAT01']['department'] == 'Công nghệ thông tin'
+        assert programs['CAT01']['latest_quota'] == {'year': 2024, 'quota': 120, 'minimum_score': 23.5,
+                                                     'actual_intake': None}
+        assert programs['CAT02']['department'] == 'N/A'
+        assert programs['CAT03']['latest_quota'] is None
+
+    def test_suggest_programs_without_db_round_trips(self, app, catalogue, queries):
+        client = app.test_client()
+        payload = {'scores': {'toan': 8, 'ly': 8, 'hoa': 8}, 'method': 'thpt'}
+        first = client.post('/api/suggest-programs', json=payload).get_json()
+        statements = queries()
+        second = client.post('/api/suggest-programs', json=payload).get_json()
+        assert statements == [] and first == second
+        codes = [s['code'] for s in second['suggestions']]
+        assert 'CAT01' in codes and 'CAT03' not in codes
+
+    def test_admin_commit_invalidates(self, catalogue):
+        catalogue.get()
+        quota = AdmissionQuota(program_id=by_code(catalogue.get())['CAT03']['id'], year=2024, quota=10,
+                               minimum_score=18.0)
+        db.session.add(quota)
+        db.session.commit()
+        assert os.path.exists(catalogue.version_path)
+        assert by_code(catalogue.get())['CAT03']['latest_quota']['minimum_score'] == 18.0
+        assert catalogue.builds == 2
+
+    def test_other_worker_bump_triggers_rebuild(self, catalogue):
+        other = Catalogue(catalogue.version_path)
+        catalogue.get()
+        other.invalidate()
+        catalogue.get()
+        catalogue.get()
+        assert catalogue.builds == 2
@@ -0,0 +1,110 @@
+"""
+Tests for token streaming and the /api/chat/stream SSE endpoint
+"""
+
+import json
+import shutil
+
+import pytest
+
+pytest.importorskip('faiss')
+
+from backend import chat as chat_module
+from backend.chatbot_engine_v2 import ChatbotEngine
+from backend.embedding_service import HashingEncoder
+from backend.llm_provider import LLMProvider
+from backend.rag_engine import RAGEngine
+from backend.response_cache import ResponseCache
+from tests.test_rag_engine import KB_SOURCE
+
+
+@pytest.fixture
+def client(isolated_app):
+    return isolated_app.test_client()
+
+
+class FakeStreamingProvider(LLMProvider):
+    available = True
+    tokens = ['Học phí ', 'khoảng ', '12 triệu/năm.']
+
+    def generate(self, prompt, max_tokens=500, temperature=0.7):
+        return ''.join(self.tokens)
+
+    def generate_stream(self, prompt, max_tokens=500, temperature=0.7):
+        yield from self.tokens
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.fixture
+def rag_bot(tmp_path):
+    kb_path = tmp_path / 'kb.json'
+    shutil.copy(KB_SOURCE, kb_path)
+    bot = ChatbotEngine.__new__(ChatbotEngine)
+    bot.use_rag = True
+    bot.knowledge_base_path = str(kb_path)
+    bot.rag_engine = RAGEngine(str(kb_path), encoder=HashingEncoder(dim=64), mmap_index=False)
+    bot.llm_provider = FakeStreamingProvider()
+    bot.semantic_cache = None
+    return bot
+
+
+@pytest.mark.unit
+def test_base_provider_streams_full_answer():
+    """Providers without native streaming yield the whole completion once"""
+    class Plain(LLMProvider):
+        def generate(self, prompt, max_tokens=500, temperature=0.7):
+            return 'xin chào'
+
+    assert list(Plain().generate_stream('hi')) == ['xin chào']
+
+
+@pytest.mark.unit
+def test_engine_emits_sources_before_tokens(rag_bot):
+    events = list(rag_bot.stream_response_with_sources('Học phí của ICTU'))
+    assert events[0][0] == 'sources' and events[0][1]['sources']
+    assert [e for e, _ in events[1:-1]] == ['token'] * 3
+    assert events[-1] == ('done', {'response': 'Học phí khoảng 12 triệu/năm.', 'cached': None, 'ok': True})
+
+
+@pytest.mark.integration
+@pytest.mark.routes
+def test_stream_endpoint(client, rag_bot, monkeypatch):
+    monkeypatch.setattr(chat_module, 'chatbot', rag_bot)
+    monkeypatch.setattr(chat_module, 'response_cache', ResponseCache())
+
+    response = client.post('/api/chat/stream', json={'message': 'Học phí của ICTU'})
+    assert response.mimetype == 'text/event-stream'
+    events = parse_sse(response.get_data(as_text=True))
+    assert events[0][0] == 'sources'
+    assert ''.join(data['text'] for event, data in events if event == 'token') == 'Học phí khoảng 12 triệu/năm.'
+    assert events[-1][0] == 'done'
+
+    # The streamed answer also fills the exact-match cache
+    again = parse_sse(client.get('/api/chat/stream?message=hoc phi cua ictu').get_data(as_text=True))
+    assert again[-1][1]['cached'] == 'exact'
+    assert again[0][1]['sources'] == events[0][1]['sources']
+
+
+@pytest.mark.integration
+@pytest.mark.routes
+def test_stream_error_event_and_logging(client, rag_bot, monkeypatch):
+    """A failing cache lookup still ends the stream with an 'error' event and logs the turn"""
+    class BrokenCache(ResponseCache):
+        def get(self, text, version=None):
+            raise RuntimeError('cache down')
+
+    logged = []
+    monkeypatch.setattr(chat_module, 'chatbot', rag_bot)
+    monkeypatch.setattr(chat_module, 'response_cache', BrokenCache())
+    monkeypatch.setattr(chat_module, '_log_interaction', lambda *args: logged.append(args))
+
+    events = parse_sse(client.post('/api/chat/stream', json={'message': 'Học phí'}).get_data(as_text=True))
+    assert [event for event, _ in events] == ['error']
+    assert logged == [('Học phí', events[0][1]['response'], None)]
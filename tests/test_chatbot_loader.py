@@ -0,0 +1,88 @@
+"""
+Unit tests for lazy chatbot initialisation
+"""
+
+import threading
+import time
+
+import pytest
+
+from backend.chatbot_loader import ChatbotLoader
+
+
+class SlowLoader(ChatbotLoader):
+    """Loader dựng một object giả, chờ tín hiệu để giả lập model nạp chậm"""
+
+    def __init__(self):
+        super().__init__('kb.json')
+        self.release = threading.Event()
+        self.builds = 0
+
+    def _build(self):
+        self.release.wait(5)
+        self.builds += 1
+        return object()
+
+
+@pytest.mark.unit
+class TestChatbotLoader:
+    """Test readiness states and background warm-up"""
+
+    def test_states_during_background_warmup(self):
+        loader = SlowLoader()
+        assert loader.status()['state'] == 'cold' and loader.instance is None
+        loader.warm()
+        assert loader.state == 'warming'
+        assert loader.get(timeout=0.05) is None  # chưa xong: không chặn lâu
+        loader.release.set()
+        bot = loader.get(timeout=5)
+        assert bot is not None and loader.state == 'ready'
+        loader.warm()
+        assert loader.get() is bot and loader.builds == 1
+
+    def test_lazy_get_builds_once(self):
+        loader = SlowLoader()
+        loader.release.set()
+        assert loader.get() is loader.get()
+        assert loader.builds == 1
+
+    def test_failed_state(self):
+        class Broken(ChatbotLoader):
+            def _build(self):
+                raise RuntimeError('no model')
+
+        loader = Broken('kb.json')
+        assert loader.get() is None
+        assert loader.status()['state'] == 'failed' and 'no model' in loader.status()['error']
+
+    def test_failed_state_retries_after_backoff(self):
+        class Flaky(SlowLoader):
+            def _build(self):
+                self.builds += 1
+                if self.builds == 1:
+                    raise RuntimeError('model server down')
+                return object()
+
+        loader = Flaky()
+        loader.retry_after = 0.1
+        loader.warm()
+        assert loader.get(timeout=5) is None and loader.state == 'failed'
+        loader.warm()
+        assert loader.get(timeout=0) is None and loader.builds == 1  # còn trong back-off
+        time.sleep(0.15)
+        assert loader.get(timeout=5) is not None and loader.state == 'ready'
+        assert loader.builds == 2
+
+    def test_lazy_get_wait_is_bounded(self):
+        loader = SlowLoader()
+        builder = threading.Thread(target=loader.get)
+        builder.start()
+        while loader.state != 'warming':
+            time.sleep(0.01)
+        start = time.monotonic()
+        assert loader.get(timeout=0.05) is None  # thread khác đang dựng: không chờ vô hạn
+        assert time.monotonic() - start < 1
+        loader.release.set()
+        builder.join(5)
+        assert loader.get(timeout=0.05) is not None and loader.builds == 1
+
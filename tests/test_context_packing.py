@@ -0,0 +1,74 @@
+"""
+Unit tests for token-budgeted RAG context packing
+"""
+
+import sys
+import types
+
+import pytest
+
+from backend import llm_provider
+from backend.llm_provider import answer_max_tokens, create_rag_prompt, estimate_tokens, pack_context
+
+
+def program_chunk(year, score):
+    doc = (f"Ngành Công nghệ thông tin (Mã: 7480201) - Năm {year}:\n"
+           f"Tổ hợp xét tuyển: A00, D01\nĐiểm chuẩn thi THPT: {score}\nƯu tiên: N/A")
+    return doc, {'type': 'nganh_hoc', 'nam': str(year), 'ma_nganh': '7480201'}, 0.9
+
+
+INTENT = ("Câu hỏi thường gặp về tuition:\nCác cách hỏi: học phí, học phí bao nhiêu, mức học phí\n"
+          "Trả lời:\n" + "\n".join(f"• Khối {i}: {i}.000.000 VNĐ/tháng" for i in range(1, 80)),
+          {'type': 'intent', 'tag': 'tuition'}, 0.8)
+
+
+@pytest.mark.unit
+class TestContextPacking:
+    """Test dedup, compression and the prompt budget"""
+
+    def test_same_program_keeps_latest_year(self):
+        packed = pack_context('điểm chuẩn ngành CNTT', [program_chunk(2023, 19.5), program_chunk(2024, 20.9)])
+        assert len(packed) == 1
+        assert '2024' in packed[0][0]
+
+    def test_asked_year_and_trend_questions(self):
+        docs = [program_chunk(2024, 20.9), program_chunk(2023, 19.5)]
+        assert '2023' in pack_context('điểm chuẩn CNTT năm 2023', docs)[0][0]
+        assert len(pack_context('điểm chuẩn CNTT qua các năm', docs)) == 2
+
+    def test_compression_drops_noise(self):
+        text = pack_context('học phí', [program_chunk(2024, 20.9), INTENT])
+        assert all(': N/A' not in doc for doc, _, _ in text)
+        assert all('Các cách hỏi' not in doc for doc, _, _ in text)
+
+    def test_budget_is_respected(self):
+        packed = pack_context('học phí khối 5', [INTENT, program_chunk(2024, 20.9)], budget=300)
+        assert sum(estimate_tokens(doc) for doc, _, _ in packed) <= 300
+        assert 'Khối 5:' in packed[0][0]
+        assert estimate_tokens(create_rag_prompt('học phí', [INTENT], budget=300)) < \
+            estimate_tokens(create_rag_prompt('học phí', [INTENT], budget=5000))
+
+    def test_answer_length_by_question_type(self, monkeypatch):
+        monkeypatch.delenv('RAG_MAX_TOKENS', raising=False)
+        assert answer_max_tokens('Học phí ngành CNTT bao nhiêu?') == 200
+        assert answer_max_tokens('So sánh ngành CNTT và KHMT') == 500
+        assert answer_max_tokens('Trường có ký túc xá không') == 350
+        # Khớp theo âm tiết: 'hạn' không khớp 'hạnh'
+        assert answer_max_tokens('Hạn nộp hồ sơ là ngày nào?') == 200
+        assert answer_max_tokens('Sinh viên có được hỗ trợ hạnh kiểm không') == 350
+
+    def test_encoder_loads_lazily_and_falls_back(self, monkeypatch):
+        """tiktoken is loaded on the first count; a failing download falls back to the byte estimate"""
+        calls = []
+
+        def get_encoding(name):
+            calls.append(name)
+            raise OSError('network unreachable')
+
+        monkeypatch.setitem(sys.modules, 'tiktoken', types.SimpleNamespace(get_encoding=get_encoding))
+        llm_provider._encoding.cache_clear()
+        try:
+            assert estimate_tokens('học phí') == estimate_tokens('học phí') == (len('học phí'.encode('utf-8')) + 2) // 3
+            assert calls == ['cl100k_base']
+        finally:
+            llm_provider._encoding.cache_clear()
@@ -0,0 +1,64 @@
+"""
+Unit tests for the batching embedding service
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from backend.embedding_service import EmbeddingClient, EmbeddingServer, HashingEncoder, MicroBatcher
+
+
+@pytest.fixture
+def server():
+    """Embedding server backed by the hashing stand-in encoder"""
+    srv = EmbeddingServer(HashingEncoder(dim=32, call_overhead_ms=5), port=0, max_wait_ms=20)
+    srv.start_background()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.mark.unit
+class TestEmbeddingService:
+    """Test micro-batching and the HTTP client"""
+
+    def test_client_matches_direct_encoding(self, server):
+        """Vectors from the service equal in-process encoding"""
+        texts = ['Học phí ICTU', 'Điểm chuẩn 2024']
+        client = EmbeddingClient(server.url)
+        vectors = client.encode(texts)
+        expected = HashingEncoder(dim=32).encode(texts)
+        assert vectors.shape == (2, 32)
+        np.testing.assert_array_equal(vectors, expected)
+
+    def test_concurrent_queries_are_batched(self, server):
+        """Concurrent single queries share one forward pass"""
+        client = EmbeddingClient(server.url)
+        results = {}
+
+        def call(i):
+            results[i] = client.encode([f'query {i}'])
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        encoder = HashingEncoder(dim=32)
+        for i in range(8):
+            np.testing.assert_array_equal(results[i], encoder.encode([f'query {i}']))
+        assert server.batcher.max_seen_batch > 1
+        assert client.health()['items'] == 8
+
+    def test_batcher_propagates_errors(self):
+        """Encoder failures reach every waiting caller"""
+        class Broken:
+            def encode(self, texts, **kwargs):
+                raise RuntimeError('boom')
+
+        batcher = MicroBatcher(Broken(), max_wait_ms=1)
+        with pytest.raises(RuntimeError):
+            batcher.encode(['x'], timeout=5)
+        batcher.close()
@@ -0,0 +1,91 @@
+"""
+Unit tests for the async LLM provider layer and its sync bridge
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.llm_async import AsyncLLMProvider, PooledProvider, pooled
+from backend.llm_provider import FallbackProvider
+
+
+class FakeAsyncProvider(AsyncLLMProvider):
+    name = 'Fake'
+
+    def __init__(self, max_concurrency, delay=0.05, token_delay=0.0):
+        super().__init__(max_concurrency)
+        self.peak = 0
+        self.delay = delay
+        self.token_delay = token_delay
+
+    async def _generate(self, prompt, max_tokens, temperature):
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        return f'answer: {prompt}'
+
+    async def _stream(self, prompt, max_tokens, temperature):
+        for i, token in enumerate(('a', 'b', 'c')):
+            await asyncio.sleep(self.token_delay if i else 0)
+            yield token
+
+
+def wait_until(predicate, timeout=1.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.unit
+class TestAsyncLLMLayer:
+    """Test concurrency limits and the sync adapter"""
+
+    def test_semaphore_bounds_in_flight_calls(self):
+        """Concurrent request threads never exceed the provider limit"""
+        provider = PooledProvider(FakeAsyncProvider(max_concurrency=4))
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(provider.generate(f'q{i}')))
+                   for i in range(20)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 20
+        assert provider.async_provider.peak == 4
+        assert elapsed >= 0.05 * 20 / 4 * 0.9
+        assert provider.stats()['in_flight'] == 0
+
+    def test_stream_through_bridge(self):
+        provider = PooledProvider(FakeAsyncProvider(max_concurrency=2))
+        assert list(provider.generate_stream('q')) == ['a', 'b', 'c']
+
+    def test_timeout_releases_slot(self):
+        """A timed-out call is cancelled on the loop instead of holding its semaphore slot"""
+        provider = PooledProvider(FakeAsyncProvider(max_concurrency=1, delay=5), timeout=0.05)
+        assert provider.generate('slow').startswith('[Error]')
+        assert wait_until(lambda: provider.stats()['in_flight'] == 0)
+        provider.async_provider.delay = 0
+        provider.timeout = 1
+        assert provider.generate('q') == 'answer: q'
+
+    def test_stream_closed_early_releases_slot(self):
+        provider = PooledProvider(FakeAsyncProvider(max_concurrency=1, token_delay=5))
+        stream = provider.generate_stream('q')
+        assert next(stream) == 'a'
+        assert provider.stats()['in_flight'] == 1
+        stream.close()
+        assert wait_until(lambda: provider.stats()['in_flight'] == 0)
+
+    def test_pooled_is_opt_in(self, monkeypatch):
+        """Without LLM_ASYNC (or for unsupported providers) the provider is unchanged"""
+        fallback = FallbackProvider()
+        monkeypatch.delenv('LLM_ASYNC', raising=False)
+        assert pooled(fallback) is fallback
+        monkeypatch.setenv('LLM_ASYNC', 'true')
+        assert pooled(fallback) is fallback
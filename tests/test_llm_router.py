@@ -0,0 +1,118 @@
+"""
+Unit tests for the runtime provider router (failover, circuit breakers, hedging)
+"""
+
+import time
+
+import pytest
+
+from backend.llm_provider import LLMProvider, ProviderRouter
+
+
+class ScriptedProvider(LLMProvider):
+    """Provider that answers after a delay, or returns an [Error] string"""
+    available = True
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=500, temperature=0.7):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            return f"[Error] {self.name} generation failed: 429"
+        return f"{self.name}: ok"
+
+
+class StreamingProvider(ScriptedProvider):
+    """Provider that streams a few chunks and optionally raises partway through"""
+
+    def __init__(self, name, chunks=('a', 'b', 'c'), raise_after=None):
+        super().__init__(name)
+        self.chunks = chunks
+        self.raise_after = raise_after
+        self.closed = False
+
+    def generate_stream(self, prompt, max_tokens=500, temperature=0.7):
+        self.calls += 1
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == self.raise_after:
+                    raise ConnectionError('stream reset')
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.mark.unit
+class TestProviderRouter:
+    """Test runtime provider selection"""
+
+    def test_failover_to_next_provider(self):
+        primary, backup = ScriptedProvider('groq', fail=True), ScriptedProvider('gemini')
+        router = ProviderRouter([('Groq', primary), ('Gemini', backup)], hedge=False)
+        assert router.generate('q') == 'gemini: ok'
+        assert router.stats()['Groq']['error_rate'] == 1.0
+
+    def test_circuit_opens_and_recovers(self):
+        primary, backup = ScriptedProvider('groq', fail=True), ScriptedProvider('gemini')
+        router = ProviderRouter([('Groq', primary), ('Gemini', backup)], hedge=False,
+                                failure_threshold=2, cooldown=0.1)
+        for _ in range(4):
+            router.generate('q')
+        assert primary.calls == 2
+        assert router.stats()['Groq']['state'] == 'open'
+
+        # After the cooldown one trial request goes through and closes the breaker
+        time.sleep(0.12)
+        primary.fail = False
+        assert router.generate('q') == 'groq: ok'
+        assert router.stats()['Groq']['state'] == 'closed'
+
+    def test_all_failing_returns_last_error(self):
+        router = ProviderRouter([('A', ScriptedProvider('a', fail=True)),
+                                 ('B', ScriptedProvider('b', fail=True))], hedge=False)
+        assert router.generate('q').startswith('[Error] b')
+
+    def test_hedge_after_p95(self):
+        """A primary slower than its p95 is raced against the next provider"""
+        primary, backup = ScriptedProvider('groq', delay=0.01), ScriptedProvider('gemini', delay=0.01)
+        router = ProviderRouter([('Groq', primary), ('Gemini', backup)], hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            router.generate('q')
+        primary.delay = 0.5
+        start = time.perf_counter()
+        assert router.generate('q') == 'gemini: ok'
+        assert time.perf_counter() - start < 0.3
+
+    def test_stream_fails_over_before_first_token(self):
+        router = ProviderRouter([('A', ScriptedProvider('a', fail=True)), ('B', ScriptedProvider('b'))])
+        assert list(router.generate_stream('q')) == ['b: ok']
+
+    def test_stream_closed_early_releases_half_open_trial(self):
+        """A client disconnect during the half-open trial must not lock the provider out"""
+        provider = StreamingProvider('a')
+        router = ProviderRouter([('A', provider)], failure_threshold=1, cooldown=0.0)
+        router.stats_by_name['A'].record(False, 0.1)
+        assert router.stats()['A']['state'] == 'half_open'
+
+        stream = router.generate_stream('q')
+        assert next(stream) == 'a'
+        stream.close()
+        assert provider.closed
+        assert not router.stats_by_name['A'].trial_in_flight
+        assert router.stats()['A']['calls'] == 2
+        assert list(router.generate_stream('q')) == ['a', 'b', 'c']
+
+    def test_stream_error_midway_is_recorded(self):
+        provider = StreamingProvider('a', raise_after=1)
+        router = ProviderRouter([('A', provider)], failure_threshold=1, cooldown=30)
+        stream = router.generate_stream('q')
+        assert next(stream) == 'a'
+        with pytest.raises(ConnectionError):
+            next(stream)
+        assert router.stats()['A']['error_rate'] == 1.0
+        assert router.stats()['A']['state'] == 'open'
@@ -0,0 +1,37 @@
+"""
+Unit tests for the vendored NLP resource bundle and the TF-IDF fallback engine
+"""
+
+import json
+import shutil
+import sys
+
+import pytest
+
+from backend.nlp_resources import RESOURCE_PATH, stopwords, tokenize
+from build_nlp_resources import build
+from tests.test_rag_engine import KB_SOURCE
+
+
+@pytest.mark.unit
+class TestNLPResources:
+    """Test the bundle contents and regex tokenizer"""
+
+    def test_bundle_matches_build_script(self):
+        with open(RESOURCE_PATH, 'r', encoding='utf-8') as f:
+            assert json.load(f) == build()
+
+    def test_stopwords_and_tokenizer(self):
+        vi = stopwords(('vi',))
+        assert {'và', 'của', 'được'} <= vi
+        assert not {'gì', 'nào', 'bao'} & vi  # giữ từ để hỏi
+        assert tokenize('Học phí ngành CNTT năm 2024 là bao nhiêu?', vi) == \
+            ['học', 'phí', 'ngành', 'cntt', 'năm', 'bao', 'nhiêu']
+
+    def test_tfidf_engine_starts_offline(self, tmp_path):
+        from backend.chatbot_engine import ChatbotEngine
+
+        bot = ChatbotEngine(shutil.copy(KB_SOURCE, tmp_path / 'kb.json'))
+        assert bot.response_vectors is not None
+        assert isinstance(bot.get_response('Học phí bao nhiêu?'), str)
+        assert 'nltk' not in sys.modules
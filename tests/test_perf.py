@@ -0,0 +1,56 @@
+"""
+Integration tests for the opt-in SQL / route instrumentation
+"""
+
+import pytest
+
+from backend.app import app as default_app
+from backend.extensions import perf
+from backend.models import db, User
+
+
+@pytest.fixture
+def app(make_app):
+    instrumented = make_app(PERF_INSTRUMENTATION=True)
+    perf.reset()
+    yield instrumented
+    perf.reset()
+
+
+@pytest.mark.integration
+class TestPerfInstrumentation:
+    """Test Server-Timing headers, per-endpoint counters and the admin page"""
+
+    def test_server_timing_and_statement_counts(self, app):
+        client = app.test_client()
+        response = client.post('/api/recommend-programs', json={'total_score': 24})
+        timing = response.headers.getlist('Server-Timing')
+        assert timing[0].startswith('db;dur=') and 'desc="1 queries"' in timing[0]
+        assert timing[1].startswith('app;dur=')
+        client.post('/api/recommend-programs', json={'total_score': 20})
+        (row,) = perf.snapshot('ai_recommendation.recommend_programs')
+        assert (row['requests'], row['statements'], row['max_statements']) == (2, 2, 1)
+        assert row['slowest'][0]['sql'].startswith('SELECT admission_score.id')
+
+    def test_admin_page(self, app):
+        client = app.test_client()
+        client.post('/api/recommend-programs', json={'total_score': 24})
+        with app.app_context():
+            admin = User(username='perfadmin', email='perf@example.com', role='admin', email_verified=True)
+            admin.set_password('secret')
+            db.session.add(admin)
+            db.session.commit()
+            admin_id = admin.id
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(admin_id)
+            sess['_fresh'] = True
+        page = client.get('/admin/perf')
+        assert page.status_code == 200
+        assert 'ai_recommendation.recommend_programs' in page.get_data(as_text=True)
+        data = client.get('/admin/perf?format=json').get_json()
+        assert data['enabled'] and any(r['endpoint'] == 'admin.admin_perf' for r in data['endpoints'])
+
+    def test_disabled_by_default(self):
+        assert not default_app.config['PERF_INSTRUMENTATION']
+        response = default_app.test_client().get('/api/version')
+        assert 'Server-Timing' not in response.headers
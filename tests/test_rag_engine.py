@@ -0,0 +1,262 @@
+"""
+Unit tests for RAGEngine indexing, using the hashing stand-in encoder
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip('faiss')
+
+from backend.embedding_service import HashingEncoder
+from backend.rag_engine import RAGEngine
+
+KB_SOURCE = os.path.join(os.path.dirname(__file__), '..', 'data', 'chatbot_knowledge_new.json')
+
+
+class CountingEncoder(HashingEncoder):
+    """Hashing encoder that records how many texts were encoded"""
+
+    def __init__(self):
+        super().__init__(dim=64)
+        self.encoded = 0
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        self.encoded += len(sentences)
+        return super().encode(sentences, convert_to_numpy=convert_to_numpy)
+
+
+@pytest.fixture
+def kb_path(tmp_path):
+    """Copy of the knowledge base in an isolated directory (own .rag_cache)"""
+    path = tmp_path / 'kb.json'
+    shutil.copy(KB_SOURCE, path)
+    return str(path)
+
+
+def edit_kb(kb_path, mutate):
+    with open(kb_path, 'r', encoding='utf-8') as f:
+        knowledge = json.load(f)
+    mutate(knowledge)
+    with open(kb_path, 'w', encoding='utf-8') as f:
+        json.dump(knowledge, f, ensure_ascii=False)
+
+
+@pytest.mark.unit
+class TestRAGEngineIndex:
+    """Test index build, cache reuse and incremental updates"""
+
+    def test_build_and_retrieve(self, kb_path):
+        """Fresh build indexes every chunk and retrieval returns metadata"""
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=False)
+        assert len(rag.documents) > 0
+        assert encoder.encoded == len(rag.documents)
+        results = rag.retrieve('học phí', top_k=3)
+        assert len(results) == 3
+        assert all(isinstance(meta, dict) for _, meta, _ in results)
+
+    def test_reload_from_cache_does_not_encode(self, kb_path):
+        """A second engine loads the cached index without re-embedding"""
+        RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=True)
+        assert encoder.encoded == 0
+        assert rag.retrieve('học phí', top_k=1)
+
+    def test_mmap_index_codes_are_file_backed(self, kb_path):
+        """With mmap_index the flat codes stay in the file mapping instead of each worker's heap"""
+        if not hasattr(faiss, 'IO_FLAG_MMAP_IFC'):
+            pytest.skip('faiss build without IO_FLAG_MMAP_IFC')
+        RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=True)
+        flat = faiss.downcast_index(rag.index.index)
+        assert not flat.codes.is_owned
+        assert rag.retrieve('học phí', top_k=1)
+
+    def test_incremental_update_encodes_only_diff(self, kb_path):
+        """Editing one intent re-embeds only the changed chunk"""
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=False)
+        total = len(rag.documents)
+
+        def change_first_intent(knowledge):
+            knowledge['intents'][0]['responses'].append('Câu trả lời mới cho thí sinh.')
+            knowledge['intents'].pop()
+
+        edit_kb(kb_path, change_first_intent)
+        encoder.encoded = 0
+        rag.rebuild_index()
+
+        assert encoder.encoded == 1
+        assert len(rag.documents) == total - 1
+        assert rag.index.ntotal == total - 1
+        assert any('Câu trả lời mới' in doc for doc in rag.documents)
+
+    def test_full_rebuild_reuses_embedding_cache(self, kb_path):
+        """Deleting the index keeps the embedding cache warm"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        os.remove(rag.index_path)
+        encoder = CountingEncoder()
+        RAGEngine(kb_path, encoder=encoder, mmap_index=False)
+        assert encoder.encoded == 0
+
+    def test_interrupted_cache_write_keeps_previous_file(self, kb_path, monkeypatch):
+        """A crash while saving embeddings leaves the old cache file loadable"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        cache = rag._load_embedding_cache()
+        assert len(cache) == len(rag.documents)
+
+        def crash(file, array, **kwargs):
+            with (open(file, 'wb') if isinstance(file, str) else file) as f:
+                f.write(b'\x93NUMPY')  # truncated header, then the process dies
+            raise OSError('disk full')
+
+        monkeypatch.setattr(np, 'save', crash)
+        rag._save_embedding_cache(cache, np.asarray(sorted(cache), dtype=np.int64)[:1])
+        monkeypatch.undo()
+        assert len(rag._load_embedding_cache()) == len(cache)
+
+
+@pytest.mark.unit
+class TestRAGCacheManifest:
+    """Test stale-cache detection through the cache manifest"""
+
+    def test_unchanged_kb_is_valid(self, kb_path):
+        """Touching the KB without changing content keeps the cache"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        version = rag.index_version
+        os.utime(kb_path, None)
+        os.utime(kb_path, (1, 1))
+
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=False)
+        assert rag._validate_cache() == 'ok'
+        assert encoder.encoded == 0
+        assert rag.index_version == version
+
+    def test_kb_change_detected_at_startup(self, kb_path):
+        """A KB edited offline is patched incrementally on the next start"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        version = rag.index_version
+        edit_kb(kb_path, lambda k: k['intents'][0]['patterns'].append('mẫu câu hỏi mới'))
+
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=True)
+        assert encoder.encoded == 1
+        assert rag.index_version != version
+        assert any('mẫu câu hỏi mới' in doc for doc in rag.documents)
+
+    def test_model_change_forces_reembedding(self, kb_path):
+        """Vectors from another embedding model are never reused"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, model_name='other-model', encoder=encoder, mmap_index=False)
+        assert encoder.encoded == len(rag.documents)
+        assert rag.manifest['model_name'] == 'other-model'
+
+
+@pytest.mark.unit
+class TestRAGIndexFactory:
+    """Test configurable FAISS index types"""
+
+    def test_hnsw_index_with_ef_search(self, kb_path):
+        """HNSW index answers queries with per-query efSearch"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False, index_factory='HNSW16')
+        assert rag.manifest['index_factory'] == 'HNSW16'
+        assert len(rag.retrieve('học phí', top_k=3, ef_search=32)) == 3
+
+    def test_untrainable_factory_falls_back_to_flat(self, kb_path):
+        """Too few chunks to train IVF falls back to an exact index"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False, index_factory='IVF4096,Flat')
+        assert len(rag.retrieve('học phí', top_k=2, nprobe=4)) == 2
+        assert rag.manifest['index_factory'] == 'Flat'
+
+    def test_fallback_index_is_retried_on_next_start(self, kb_path, capsys):
+        """A Flat fallback is not mistaken for a valid cache of the configured factory"""
+        RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False, index_factory='IVF4096,Flat')
+        capsys.readouterr()
+        encoder = CountingEncoder()
+        RAGEngine(kb_path, encoder=encoder, mmap_index=False, index_factory='IVF4096,Flat')
+        out = capsys.readouterr().out
+        assert 'Cache is stale (index)' in out and 'Falling back to Flat' in out
+        assert encoder.encoded == 0
+
+    def test_factory_change_rebuilds_without_encoding(self, kb_path):
+        """Switching index type reuses cached embeddings"""
+        RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=False, index_factory='HNSW16')
+        assert encoder.encoded == 0
+        assert rag.index.ntotal == len(rag.documents)
+
+    def test_hnsw_incremental_update_with_removal(self, kb_path):
+        """Removing chunks from an HNSW index rebuilds from the embedding cache"""
+        encoder = CountingEncoder()
+        rag = RAGEngine(kb_path, encoder=encoder, mmap_index=False, index_factory='HNSW16')
+        total = len(rag.documents)
+        edit_kb(kb_path, lambda k: k['intents'].pop())
+        encoder.encoded = 0
+        rag.rebuild_index()
+        assert encoder.encoded == 0
+        assert rag.index.ntotal == total - 1
+
+    def test_hybrid_finds_exact_program_code(self, kb_path):
+        """BM25 fusion surfaces the chunk carrying an exact program code"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False, hybrid=True)
+        results = rag.retrieve('7210403', top_k=3)
+        assert any(meta.get('ma_nganh') == '7210403' for _, meta, _ in results)
+
+    def test_hybrid_score_stays_cosine(self, kb_path):
+        """score keeps its dense cosine meaning; the fused value is exposed as rrf_score"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False, hybrid=True)
+        query = 'học phí ngành 7480201'
+        results = rag.retrieve(query, top_k=5)
+        rrf = [meta['rrf_score'] for _, meta, _ in results]
+        assert rrf == sorted(rrf, reverse=True) and max(rrf) < 0.05
+        q = rag.encode_query(query)[0]
+        docs = [rag.documents[i] for i in range(len(rag.documents))]
+        for doc, _, score in results:
+            vector = rag.index.reconstruct(int(rag.ids[docs.index(doc)]))
+            assert score == pytest.approx(float(vector @ q), abs=1e-5)
+        assert 'rrf_score' not in rag.metadata[0]
+
+
+@pytest.mark.unit
+class TestRAGMetadataFilter:
+    """Test metadata-filtered retrieval"""
+
+    def test_filter_by_year_and_program(self, kb_path):
+        """Only chunks matching every filter field are returned"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        code = next(m['ma_nganh'] for m in rag.metadata if m.get('ma_nganh'))
+        results = rag.retrieve('điểm chuẩn', top_k=5, filters={'ma_nganh': code, 'type': 'nganh_hoc'})
+        assert results
+        assert all(meta['ma_nganh'] == code and meta['type'] == 'nganh_hoc' for _, meta, _ in results)
+
+    def test_filter_with_selector_on_hnsw(self, kb_path, monkeypatch):
+        """Large filtered sets go through the FAISS IDSelector path"""
+        monkeypatch.setattr('backend.rag_engine.FILTER_EXACT_MAX', 0)
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=True, index_factory='HNSW16')
+        results = rag.retrieve('học phí', top_k=3, filters={'type': 'intent'})
+        assert len(results) == 3
+        assert all(meta['type'] == 'intent' for _, meta, _ in results)
+
+    def test_unknown_value_returns_nothing(self, kb_path):
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        assert rag.retrieve('học phí', top_k=3, filters={'nam': '1999'}) == []
+        with pytest.raises(ValueError):
+            rag.retrieve('học phí', filters={'unknown': 'x'})
+
+    def test_infer_filters_from_query(self, kb_path):
+        """Years and program codes known to the KB become filters"""
+        rag = RAGEngine(kb_path, encoder=CountingEncoder(), mmap_index=False)
+        code = next(m['ma_nganh'] for m in rag.metadata if m.get('ma_nganh'))
+        year = next(m['nam'] for m in rag.metadata if m.get('ma_nganh'))
+        assert rag.infer_filters(f'Điểm chuẩn ngành {code} năm {year}?') == {'nam': year, 'ma_nganh': code}
+        assert rag.infer_filters('Điểm chuẩn năm 1999') == {}
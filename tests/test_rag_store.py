@@ -0,0 +1,36 @@
+"""
+Unit tests for the memory-mapped RAG chunk store
+"""
+
+import pytest
+from backend.rag_store import MmapChunkStore, write_chunk_store, chunk_store_exists
+
+
+@pytest.mark.unit
+class TestMmapChunkStore:
+    """Test chunk store round-trip"""
+
+    def test_round_trip(self, tmp_path):
+        """Documents and metadata read back identically"""
+        docs = ['Ngành Khoa học máy tính (Mã: 7480101)', '', 'Học phí: 12.000.000đ']
+        meta = [{'type': 'nganh_hoc', 'nam': '2024'}, {'type': 'intent', 'tag': 'greeting'}, {}]
+        write_chunk_store(str(tmp_path), docs, meta)
+
+        assert chunk_store_exists(str(tmp_path))
+        store = MmapChunkStore(str(tmp_path))
+        assert len(store) == 3
+        assert list(store.documents) == docs
+        assert list(store.metadata) == meta
+        assert store.documents[-1] == docs[-1]
+        assert store.metadata[0:2] == meta[0:2]
+        with pytest.raises(IndexError):
+            store.documents[3]
+        store.close()
+
+    def test_empty_store(self, tmp_path):
+        """An empty knowledge base produces an empty, loadable store"""
+        write_chunk_store(str(tmp_path), [], [])
+        store = MmapChunkStore(str(tmp_path))
+        assert len(store) == 0
+        assert list(store.documents) == []
+        store.close()
@@ -0,0 +1,100 @@
+"""
+Integration tests for the batch recommendation NDJSON endpoint
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from backend import recommend_batch
+from backend.models import db, AdmissionScore, Program
+from backend.recommend_batch import Candidates, load_candidates, stream_recommendations
+
+YEAR = datetime.now().year
+STUDENTS = [
+    {'student_id': 'HS01', 'total_score': 24.5, 'interests': ['công nghệ', 'AI'], 'skills': ['lập trình']},
+    {'student_id': 'HS02', 'total_score': 19.0, 'interests': ['kinh doanh'], 'skills': []},
+    {'student_id': 'HS03', 'total_score': 27.25, 'interests': ['thiết kế', 'tài chính'], 'skills': ['sáng tạo']},
+]
+
+
+@pytest.fixture
+def app(isolated_app):
+    program = Program(name='Kỹ thuật phần mềm', code='BATCH01', tuition_fee=30.0)
+    db.session.add(program)
+    db.session.flush()
+    names = ['Kỹ thuật phần mềm', 'Quản trị kinh doanh', 'Thiết kế đồ họa', 'Tài chính ngân hàng',
+             'Khoa học máy tính', 'Marketing', 'Kế toán', 'Luật']
+    for i, name in enumerate(names):
+        db.session.add(AdmissionScore(program_id=program.id if i == 0 else None, program_name=name,
+                                      year=YEAR - i % 3, admission_score=18 + i * 1.1))
+    db.session.commit()
+    return isolated_app
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.mark.integration
+class TestRecommendBatch:
+    """Test NDJSON output, CSV parsing and parity with the single-student endpoint"""
+
+    def test_json_batch_matches_single_endpoint(self, app):
+        client = app.test_client()
+        response = client.post('/api/recommend-programs/batch', json={'students': STUDENTS})
+        assert response.mimetype == 'application/x-ndjson'
+        lines = read_ndjson(response)
+        assert lines[-1]['summary']['scored'] == 3 and lines[-1]['summary']['errors'] == 0
+        for student, line in zip(STUDENTS, lines):
+            single = client.post('/api/recommend-programs', json=student).get_json()['data']
+            assert line['student_id'] == student['student_id']
+            assert line['recommendations'] == single['recommendations']
+            assert line['total_matches'] == single['total_matches']
+
+    def test_csv_upload_reports_bad_rows_in_order(self, app):
+        csv_body = ('student_id,name,total_score,interests,skills\n'
+                    'A1,An,22,công nghệ; AI,lập trình\n'
+                    'A2,Bình,,kinh doanh,\n'
+                    'A3,Chi,25.5,thiết kế|tài chính,sáng tạo\n')
+        response = app.test_client().post('/api/recommend-programs/batch', data=csv_body.encode('utf-8'),
+                                          content_type='text/csv')
+        lines = read_ndjson(response)
+        assert [line.get('row') for line in lines[:3]] == [0, 1, 2]
+        assert 'error' in lines[1] and lines[2]['student_id'] == 'A3'
+        assert lines[0]['recommendations'][0]['match_score'] >= lines[0]['recommendations'][-1]['match_score']
+        assert lines[-1]['summary'] == dict(lines[-1]['summary'], students=3, scored=2, errors=1)
+
+    def test_process_pool_matches_inline(self, app):
+        candidates = load_candidates()
+        assert isinstance(candidates, Candidates)
+        students = STUDENTS * 20
+        inline = list(stream_recommendations(candidates, students, workers=1))
+        pooled = list(stream_recommendations(candidates, students, chunk=16, workers=2, pool_min=1))
+        assert pooled[:-1] == inline[:-1]
+        assert json.loads(pooled[-1])['summary']['workers'] == 2
+
+    def test_busy_pool_falls_back_inline(self, app):
+        """Concurrent pooled requests are bounded; extra ones are scored in-thread"""
+        candidates = load_candidates()
+        students = STUDENTS * 4
+        inline = list(stream_recommendations(candidates, students, workers=1))
+        assert recommend_batch._pool_slots.acquire(blocking=False)
+        try:
+            busy = list(stream_recommendations(candidates, students, workers=2, pool_min=1))
+        finally:
+            recommend_batch._pool_slots.release()
+        assert busy[:-1] == inline[:-1]
+        assert json.loads(busy[-1])['summary']['workers'] == 1
+        # The slot is returned even when the client stops reading early
+        stream = stream_recommendations(candidates, students, chunk=4, workers=2, pool_min=1)
+        next(stream)
+        stream.close()
+        assert recommend_batch._pool_slots.acquire(blocking=False)
+        recommend_batch._pool_slots.release()
+
+    def test_invalid_k_is_rejected(self, app):
+        response = app.test_client().post('/api/recommend-programs/batch', json={'students': STUDENTS, 'k': 'ten'})
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
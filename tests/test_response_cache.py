@@ -0,0 +1,138 @@
+"""
+Unit and route tests for the exact-match chat response cache
+"""
+
+import sqlite3
+
+import pytest
+
+from backend import chat as chat_module
+from backend.response_cache import ResponseCache, normalize_query
+
+
+@pytest.fixture
+def client(isolated_app):
+    return isolated_app.test_client()
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Test normalisation, LRU and the shared SQLite tier"""
+
+    def test_normalize_query(self):
+        """Case, diacritics (including đ), punctuation and spacing are ignored"""
+        assert normalize_query('  Học phí   ĐẠI HỌC ICTU? ') == 'hoc phi dai hoc ictu'
+        assert normalize_query('hoc phi dai hoc ictu') == normalize_query('Học phí Đại học ICTU!')
+
+    def test_lru_and_version(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put('học phí', {'response': 'a'}, 'v1')
+        assert cache.get('Hoc phi?', 'v1') == {'response': 'a'}
+        assert cache.get('học phí', 'v2') is None
+        cache.put('địa chỉ', {'response': 'b'}, 'v1')
+        cache.put('hotline', {'response': 'c'}, 'v1')
+        assert cache.get('địa chỉ', 'v1') is not None
+        assert cache.get('học phí', 'v1') is None
+        assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 2
+
+    def test_shared_tier_between_workers(self, tmp_path):
+        """An answer stored by one worker is served to another"""
+        db_path = str(tmp_path / 'chat_cache.db')
+        worker_a = ResponseCache(db_path=db_path)
+        worker_b = ResponseCache(db_path=db_path)
+        worker_a.put('Học phí', {'response': 'a'}, 'v1')
+        assert worker_b.get('hoc phi', 'v1') == {'response': 'a'}
+        assert worker_b.stats()['hits_shared'] == 1
+
+    def test_purge_reaches_other_workers(self, tmp_path):
+        db_path = str(tmp_path / 'chat_cache.db')
+        worker_a = ResponseCache(db_path=db_path)
+        worker_b = ResponseCache(db_path=db_path)
+        worker_a.put('học phí', {'response': 'a'}, 'v1')
+        assert worker_b.get('học phí', 'v1') is not None  # now in b's LRU too
+        assert worker_a.purge('Hoc phi') == 1
+        assert worker_b.get('học phí', 'v1') is None
+
+
+    def test_sqlite_io_runs_outside_lock(self, tmp_path, monkeypatch):
+        """Shared-tier queries never hold the in-process LRU lock"""
+        cache = ResponseCache(db_path=str(tmp_path / 'chat_cache.db'))
+        conn = cache._conn()
+
+        class Guarded:
+            def execute(self, *args):
+                assert not cache._lock.locked()
+                return conn.execute(*args)
+
+            def __enter__(self):
+                return conn.__enter__()
+
+            def __exit__(self, *exc):
+                return conn.__exit__(*exc)
+
+        monkeypatch.setattr(cache, '_conn', Guarded)
+        cache.put('học phí', {'response': 'a'}, 'v1')
+        assert cache.get('hoc phi', 'v1') == {'response': 'a'}
+        assert cache.get('địa chỉ', 'v1') is None
+
+    def test_sqlite_errors_degrade_to_memory(self, tmp_path, monkeypatch):
+        """'database is locked' is a miss on read and a skipped write, never an exception"""
+        cache = ResponseCache(db_path=str(tmp_path / 'chat_cache.db'))
+
+        def locked():
+            raise sqlite3.OperationalError('database is locked')
+
+        monkeypatch.setattr(cache, '_conn', locked)
+        assert cache.get('học phí', 'v1') is None
+        cache.put('học phí', {'response': 'a'}, 'v1')
+        assert cache.get('học phí', 'v1') == {'response': 'a'}
+        assert cache.stats()['misses'] == 1
+
+
+class FakeChatbot:
+    """Chatbot returning a fixed structured answer with its success flag"""
+
+    def __init__(self, response='Học phí khoảng 12 triệu/năm.', ok=True):
+        self.response = response
+        self.ok = ok
+        self.calls = 0
+
+    def get_response_with_sources(self, user_input):
+        self.calls += 1
+        return {'response': self.response, 'sources': [], 'rag': True, 'provider': 'Fake', 'ok': self.ok}
+
+
+@pytest.mark.integration
+@pytest.mark.routes
+class TestChatCacheRoutes:
+    """Test the cache in front of /api/chat"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(chat_module, 'response_cache', ResponseCache())
+        monkeypatch.setattr(chat_module, 'chatbot', FakeChatbot())
+
+    def test_repeated_question_is_cached(self, client):
+        first = client.post('/api/chat', json={'message': 'Học phí bao nhiêu?'}).get_json()
+        second = client.post('/api/chat', json={'message': 'hoc phi bao nhieu'}).get_json()
+        assert 'cached' not in first
+        assert second['cached'] == 'exact'
+        assert second['response'] == first['response']
+
+        status = client.get('/api/chat/status').get_json()
+        assert status['response_cache']['hits'] == 1
+        assert status['response_cache']['misses'] == 1
+
+    def test_purge_requires_admin(self, client):
+        client.post('/api/chat', json={'message': 'Học phí bao nhiêu?'})
+        response = client.post('/admin/chat-cache/purge', json={})
+        assert response.status_code == 302
+        assert chat_module.response_cache.stats()['entries'] == 1
+
+    def test_fallback_answer_is_not_cached(self, client, monkeypatch):
+        bot = FakeChatbot('Xin lỗi, tôi chưa tìm được thông tin liên quan trong cơ sở tri thức.', ok=False)
+        monkeypatch.setattr(chat_module, 'chatbot', bot)
+        for _ in range(2):
+            assert 'cached' not in client.post('/api/chat', json={'message': 'Học phí bao nhiêu?'}).get_json()
+        assert bot.calls == 2
+        assert chat_module.response_cache.stats()['entries'] == 0
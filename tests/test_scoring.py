@@ -0,0 +1,136 @@
+"""
+Unit tests for the vectorised programme scoring engine
+"""
+
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.scoring import (
+    COMBINATIONS, CutoffScorer, INTEREST_KEYWORDS, MatchScorer, SKILL_KEYWORDS, SUBJECTS, best_combinations,
+    combination_scores, preference_counts, top_k
+)
+
+NAMES = ['Công nghệ thông tin', 'Kỹ thuật phần mềm', 'Quản trị kinh doanh', 'Thiết kế đồ họa',
+         'Tài chính ngân hàng', 'Khoa học dữ liệu', 'Kỹ thuật điện tử', 'Marketing', 'Luật', 'Ngôn ngữ Anh']
+
+
+def legacy_match_score(name, cutoff, total, interests, skills):
+    """Vòng lặp cũ của calculate_match_score (tham chiếu)"""
+    diff = total - cutoff
+    points = 40 if diff >= 3 else 35 if diff >= 1.5 else 30 if diff >= 0.5 else 25 if diff >= 0 else 10
+    for values, table in ((interests, INTEREST_KEYWORDS), (skills, SKILL_KEYWORDS)):
+        hits = sum(10 for v in values if v.lower() in table and any(k in name.lower() for k in table[v.lower()]))
+        points += min(hits, 30)
+    return points
+
+
+def legacy_cutoff_probability(best, min_score):
+    """So sánh của vòng lặp cũ trong /api/suggest-programs (tham chiếu)"""
+    if best >= min_score + 2:
+        return 95
+    if best >= min_score + 1:
+        return 85
+    if best >= min_score:
+        return 70
+    if best >= min_score - 0.5:
+        return 50
+    return 20
+
+
+def quota_programs(cutoffs):
+    return [{'id': i, 'name': f'P{i}', 'code': f'P{i}', 'department': 'N/A', 'tuition_fee': None,
+             'duration': None, 'latest_quota': {'year': 2024, 'quota': 10, 'minimum_score': cutoff}}
+            for i, cutoff in enumerate(cutoffs)]
+
+
+@pytest.fixture
+def candidates():
+    rng = random.Random(7)
+    names = [rng.choice(NAMES) for _ in range(60)]
+    cutoffs = [round(rng.uniform(15, 28), 2) for _ in names]
+    return names, cutoffs
+
+
+def random_student(rng):
+    return (round(rng.uniform(14, 30), 2),
+            rng.sample(list(INTEREST_KEYWORDS) + ['AI', 'Công Nghệ', 'du lịch'], rng.randint(0, 4)),
+            rng.sample(list(SKILL_KEYWORDS) + ['LOGIC'], rng.randint(0, 3)))
+
+
+@pytest.mark.unit
+class TestScoring:
+    """Test parity with the old loops, stable top-k and batch mode"""
+
+    def test_match_scores_and_ranking_match_legacy(self, candidates):
+        names, cutoffs = candidates
+        scorer = MatchScorer(names, cutoffs)
+        rng = random.Random(1)
+        for _ in range(50):
+            total, interests, skills = random_student(rng)
+            expected = [legacy_match_score(n, c, total, interests, skills) for n, c in zip(names, cutoffs)]
+            got = scorer.score(total, interests, skills)
+            assert got.tolist() == expected
+            ranked = sorted(range(len(names)), key=lambda i: expected[i], reverse=True)[:10]
+            assert top_k(got, 10).tolist() == ranked
+
+    def test_batch_matches_single(self, candidates):
+        names, cutoffs = candidates
+        scorer = MatchScorer(names, cutoffs)
+        rng = random.Random(2)
+        students = [random_student(rng) for _ in range(200)]
+        totals = np.array([s[0] for s in students])
+        interest_counts = np.stack([preference_counts(s[1], INTEREST_KEYWORDS) for s in students])
+        skill_counts = np.stack([preference_counts(s[2], SKILL_KEYWORDS) for s in students])
+        ranked, picked, eligible = scorer.recommend_batch(totals, interest_counts, skill_counts, k=5)
+        for row, (total, interests, skills) in enumerate(students):
+            mask = np.flatnonzero(scorer.cutoffs <= total)
+            single = scorer.score(total, interests, skills)[mask]
+            expected = mask[top_k(single, 5)].tolist()
+            assert [i for i in ranked[row] if i >= 0] == expected
+            assert eligible[row] == len(mask)
+
+    def test_combinations_and_cutoff_probabilities(self):
+        columns, totals = combination_scores([{'toan': 9, 'ly': 8, 'hoa': 7, 'van': 6}, {'toan': 5}], 'thpt')
+        assert columns == ['A00', 'A01', 'B00', 'D01']
+        assert totals[0, 0] == 24 and np.isnan(totals[0, 1]) and np.isnan(totals[1]).all()
+        best, names = best_combinations(columns, totals)
+        assert best.tolist() == [24, 0] and names == ['A00', None]
+
+        scorer = CutoffScorer(quota_programs([26, 22, 23.5, 24, 0]))
+        assert len(scorer) == 4  # điểm chuẩn 0 / None bị bỏ qua như trước
+        suggestions = scorer.suggest(24.0, 'A00', k=3)
+        assert [(s['id'], s['probability'], s['status']) for s in suggestions] == \
+            [(1, 95, 'very_high'), (2, 70, 'medium'), (3, 70, 'medium')]
+
+    def test_cutoff_tiers_match_legacy_at_boundaries(self):
+        """total >= cutoff + t and total - cutoff >= t disagree for some float scores"""
+        cutoffs = [15.15, 15.65, 22.35, 15.4]
+        scores = [17.15, 16.15, 24.35, 16.4, 17.4, 14.65, 15.15]
+        assert 17.15 - 15.15 < 2 <= 17.15 - 15.15 + 1e-9  # the boundary case this guards
+        got = CutoffScorer(quota_programs(cutoffs)).probabilities(np.array(scores))
+        assert got.tolist() == [[legacy_cutoff_probability(s, c) for c in cutoffs] for s in scores]
+        assert got[0, 0] == 95
+
+    def test_combination_sums_match_legacy(self):
+        """Combination totals are summed in the old order, bit for bit"""
+        rng = random.Random(3)
+        rows = [{s: round(rng.uniform(0, 10), 2) for s in rng.sample(SUBJECTS, rng.randint(2, 6))}
+                for _ in range(300)]
+        columns, totals = combination_scores(rows, 'thpt')
+        for row, got in zip(rows, totals):
+            for name, value in zip(columns, got):
+                a, b, c = COMBINATIONS[name]
+                if all(s in row for s in (a, b, c)):
+                    assert value == row[a] + row[b] + row[c]
+                else:
+                    assert np.isnan(value)
+
+    def test_calculate_match_score_wrapper(self):
+        from backend.ai_recommendation import calculate_match_score, get_admission_probability
+
+        row = SimpleNamespace(program_name='Kỹ thuật phần mềm', admission_score=20.0)
+        assert calculate_match_score(row, 24.0, ['công nghệ'], ['lập trình']) == 60.0
+        assert get_admission_probability(24.0, 20.0) == 'Rất cao (95-100%)'
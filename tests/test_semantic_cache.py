@@ -0,0 +1,91 @@
+"""
+Unit tests for the semantic answer cache
+"""
+
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+
+from backend.chatbot_engine_v2 import ChatbotEngine
+from backend.embedding_service import HashingEncoder
+from backend.rag_engine import RAGEngine
+from backend.semantic_cache import SemanticCache
+from tests.test_rag_engine import KB_SOURCE
+
+
+def vec(*values):
+    return np.array(values, dtype=np.float32)
+
+
+class FakeProvider:
+    available = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=500, temperature=0.7):
+        self.calls += 1
+        return f'answer {self.calls}'
+
+
+@pytest.mark.unit
+class TestSemanticCache:
+    """Test lookup, expiry and invalidation"""
+
+    def test_similar_vector_hits(self):
+        cache = SemanticCache(dim=3, threshold=0.9)
+        cache.store(vec(1, 0, 0), 'v1', 'học phí 12 triệu', [{'index': 1}])
+        hit = cache.lookup(vec(1, 0.1, 0), 'v1')
+        assert hit['response'] == 'học phí 12 triệu'
+        assert cache.lookup(vec(0, 1, 0), 'v1') is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    def test_key_must_match(self):
+        """Same wording but a different inferred year is a miss"""
+        cache = SemanticCache(dim=3)
+        cache.store(vec(1, 0, 0), 'v1', 'điểm 2024', [], key='{"nam": "2024"}')
+        assert cache.lookup(vec(1, 0, 0), 'v1', key='{"nam": "2023"}') is None
+        assert cache.lookup(vec(1, 0, 0), 'v1', key='{"nam": "2024"}') is not None
+
+    def test_version_change_clears(self):
+        cache = SemanticCache(dim=3)
+        cache.store(vec(1, 0, 0), 'v1', 'old', [])
+        assert cache.lookup(vec(1, 0, 0), 'v2') is None
+        assert len(cache) == 0
+
+    def test_ttl_and_lru(self, monkeypatch):
+        cache = SemanticCache(dim=3, ttl=10, max_entries=2)
+        cache.store(vec(1, 0, 0), 'v1', 'a', [])
+        cache.store(vec(0, 1, 0), 'v1', 'b', [])
+        cache.lookup(vec(1, 0, 0), 'v1')  # 'a' becomes most recently used
+        cache.store(vec(0, 0, 1), 'v1', 'c', [])
+        assert cache.lookup(vec(0, 1, 0), 'v1') is None
+        assert cache.lookup(vec(1, 0, 0), 'v1')['response'] == 'a'
+
+        now = time.time()
+        monkeypatch.setattr('backend.semantic_cache.time.time', lambda: now + 60)
+        assert cache.lookup(vec(1, 0, 0), 'v1') is None
+        assert len(cache) == 1
+
+
+@pytest.mark.unit
+def test_chatbot_reuses_answer_for_repeated_question(tmp_path):
+    """A repeated question is answered without calling the LLM again"""
+    kb_path = tmp_path / 'kb.json'
+    shutil.copy(KB_SOURCE, kb_path)
+    bot = ChatbotEngine.__new__(ChatbotEngine)
+    bot.use_rag = True
+    bot.rag_engine = RAGEngine(str(kb_path), encoder=HashingEncoder(dim=64), mmap_index=False)
+    bot.llm_provider = FakeProvider()
+    bot.semantic_cache = SemanticCache(dim=64)
+
+    first = bot.get_response_with_sources('Học phí của ICTU')
+    second = bot.get_response_with_sources('học phí của ictu')
+    assert bot.llm_provider.calls == 1
+    assert second['response'] == first['response']
+    assert second['cached'] == 'semantic'
+    assert second['sources'] == first['sources']
@@ -0,0 +1,74 @@
+"""
+Unit tests for the persisted TF-IDF fallback index
+"""
+
+import json
+import re
+
+import numpy as np
+import pytest
+
+from backend.tfidf_store import TfidfIndex
+from tests.test_rag_engine import KB_SOURCE
+
+QUERIES = ['học phí bao nhiêu', 'điểm chuẩn CNTT 2024', 'ký túc xá', 'xin chào', 'không liên quan']
+
+
+def analyzer(text):
+    return re.findall(r'(?u)\b\w\w+\b', text.lower())
+
+
+@pytest.fixture(scope='module')
+def intents():
+    with open(KB_SOURCE, 'r', encoding='utf-8') as f:
+        return json.load(f)['intents']
+
+
+@pytest.mark.unit
+class TestTfidfIndex:
+    """Test parity with scikit-learn, persistence and incremental append"""
+
+    def test_scores_match_sklearn(self, intents, tmp_path):
+        sklearn_text = pytest.importorskip('sklearn.feature_extraction.text')
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        corpus = [p for intent in intents for p in intent['patterns']]
+        vectorizer = sklearn_text.TfidfVectorizer(lowercase=True, max_features=5000)
+        matrix = vectorizer.fit_transform(corpus)
+        index = TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        for query in QUERIES:
+            expected = cosine_similarity(vectorizer.transform([query]), matrix).ravel()
+            assert np.allclose(index.scores(query), expected, atol=1e-6)
+
+    def test_reload_uses_mmap_artifact(self, intents, tmp_path):
+        fitted = TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        loaded = TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        assert (fitted.source, loaded.source) == ('fitted', 'loaded')
+        assert isinstance(loaded.rows, np.memmap)
+        assert np.allclose(loaded.scores('học phí'), fitted.scores('học phí'))
+
+    def test_append_matches_full_fit(self, intents, tmp_path):
+        TfidfIndex(str(tmp_path / 'inc'), analyzer).load_or_build(intents[:-2])
+        appended = TfidfIndex(str(tmp_path / 'inc'), analyzer).load_or_build(intents)
+        full = TfidfIndex(None, analyzer).load_or_build(intents)
+        assert appended.source == 'appended'
+        assert list(appended.rows) == list(full.rows)
+        for query in QUERIES:
+            assert np.allclose(appended.scores(query), full.scores(query))
+
+    def test_changed_intent_refits(self, intents, tmp_path):
+        TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        edited = [dict(intents[0], patterns=['câu hỏi mới hoàn toàn'])] + intents[1:]
+        index = TfidfIndex(str(tmp_path), analyzer).load_or_build(edited)
+        assert index.source == 'fitted'
+        assert 'hoàn' in index.vocab
+
+    @pytest.mark.parametrize('name', ['data', 'indices'])
+    def test_truncated_artifact_refits(self, intents, tmp_path, name):
+        """data / indices not matching indptr[-1] fall back to a fresh fit"""
+        TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        path = tmp_path / f'{name}.npy'
+        np.save(path, np.load(path)[:-3])
+        index = TfidfIndex(str(tmp_path), analyzer).load_or_build(intents)
+        assert index.source == 'fitted'
+        assert TfidfIndex(str(tmp_path), analyzer).load_or_build(intents).source == 'loaded'
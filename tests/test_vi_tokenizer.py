@@ -0,0 +1,36 @@
+"""
+Unit tests for the Vietnamese compound-aware tokenizer
+"""
+
+import unicodedata
+
+import pytest
+
+from backend.nlp_resources import stopwords
+from backend.vi_tokenizer import ViTokenizer
+
+
+@pytest.mark.unit
+class TestViTokenizer:
+    """Test compounding, stopwords, normalisation and the LRU cache"""
+
+    def test_longest_compound_wins(self):
+        tok = ViTokenizer(compounds=['công nghệ', 'công nghệ thông tin', 'học phí'], keep_syllables=False)
+        assert tok('Học phí ngành Công nghệ thông tin?') == ['học_phí', 'ngành', 'công_nghệ_thông_tin']
+        assert tok('công nghệ mới') == ['công_nghệ', 'mới']
+
+    def test_keeps_syllables_and_filters_stopwords(self):
+        tok = ViTokenizer(compounds=['gợi ý', 'học phí'], stop_words=stopwords(('vi',)))
+        assert tok('gợi ý học phí của ngành') == ['gợi_ý', 'gợi', 'học_phí', 'học', 'phí', 'ngành']
+
+    def test_nfd_input_and_cache(self):
+        tok = ViTokenizer(compounds=['điểm chuẩn'])
+        nfd = unicodedata.normalize('NFD', 'Điểm chuẩn')
+        assert tok(nfd) == tok('Điểm chuẩn') == ['điểm_chuẩn', 'điểm', 'chuẩn']
+        tok(nfd)
+        assert tok.cache_info().hits == 1
+
+    def test_bundle_dictionary_in_signature(self):
+        bundled = ViTokenizer()
+        assert bundled('ký túc xá')[0] == 'ký_túc_xá'
+        assert bundled.signature != ViTokenizer(compounds=['ký túc xá']).signature
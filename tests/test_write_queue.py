@@ -0,0 +1,70 @@
+"""
+Unit tests for the write-behind queue used for chat interaction logging
+"""
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from backend.write_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Flask app + SQLite file riêng (thread nền cần cùng một file DB)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'log.db'}"
+    db = SQLAlchemy(app)
+
+    class Log(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        text = db.Column(db.String(50))
+
+    with app.app_context():
+        db.create_all()
+    return app, db, Log
+
+
+def count_rows(app, db, model):
+    with app.app_context():
+        return db.session.query(model).count()
+
+
+@pytest.mark.unit
+class TestWriteBehindQueue:
+    """Test batching, drain and backpressure"""
+
+    def test_rows_are_written_in_batches(self, store):
+        app, db, Log = store
+        wq = WriteBehindQueue(app, db, max_batch=50, flush_ms=200)
+        for i in range(120):
+            wq.enqueue(Log, text=f'msg {i}')
+        assert wq.flush()
+        stats = wq.stats()
+        assert count_rows(app, db, Log) == 120
+        assert stats['written'] == 120 and stats['depth'] == 0
+        assert stats['batches'] < 120
+
+    def test_close_drains_pending_writes(self, store):
+        app, db, Log = store
+        wq = WriteBehindQueue(app, db, flush_ms=10000)
+        wq.enqueue(Log, text='pending')
+        wq.close()
+        assert count_rows(app, db, Log) == 1
+
+    def test_full_queue_writes_synchronously(self, store):
+        app, db, Log = store
+        wq = WriteBehindQueue(app, db, max_size=1, flush_ms=10000)
+        wq._ensure_worker = lambda: None  # không có thread nền tiêu thụ -> hàng đợi giữ nguyên
+        wq._queue.put((Log, {'text': 'blocker'}))
+        wq.enqueue(Log, text='overflow')
+        assert wq.stats()['overflow'] == 1
+        assert count_rows(app, db, Log) == 1
+
+    def test_failed_batch_is_counted(self, store):
+        app, db, Log = store
+        wq = WriteBehindQueue(app, db)
+        wq.enqueue(Log, id=1, text='a')
+        wq.enqueue(Log, id=1, text='duplicate')
+        assert wq.flush()
+        assert wq.stats()['failed'] >= 1